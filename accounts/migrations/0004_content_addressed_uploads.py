@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:45
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.upload_storage, upload_to='profile_pictures/'),
+        ),
+    ]
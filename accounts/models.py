@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from core.storage import upload_storage
+
 class StudentProfile(models.Model):
     ROLE_CHOICES = [
         ('student', 'Student'),
@@ -14,7 +16,9 @@ class StudentProfile(models.Model):
     interests = models.TextField(blank=True)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='student')
     bio = models.TextField(blank=True)
-    profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='profile_pictures/', storage=upload_storage, blank=True, null=True)
+    # Resized WebP copies of profile_picture, written by core.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -0,0 +1,142 @@
+"""
+Maintenance and lookups for the Conversation summary table.
+
+Each DirectMessage write updates its pair's Conversation row in the same
+transaction, so the inbox and the unread badge are read from a handful of
+indexed rows instead of scanning message history.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.dispatch import Signal
+
+from .models import Conversation, DirectMessage
+
+PREVIEW_LENGTH = 255
+
+# Sent by mark_read() with user_id and other_user_id; read counts are
+# cleared with a bulk update, so no model signal announces them
+conversation_read = Signal()
+
+
+def ordered_pair(a_id, b_id):
+    return (a_id, b_id) if a_id < b_id else (b_id, a_id)
+
+
+def _get_or_create_locked(low_id, high_id):
+    """Fetch the pair's row for update, creating it on first message"""
+    try:
+        return Conversation.objects.select_for_update().get(user_low_id=low_id, user_high_id=high_id)
+    except Conversation.DoesNotExist:
+        pass
+    try:
+        with transaction.atomic():
+            return Conversation.objects.create(user_low_id=low_id, user_high_id=high_id)
+    except IntegrityError:
+        # Another request created it first
+        return Conversation.objects.select_for_update().get(user_low_id=low_id, user_high_id=high_id)
+
+
+def record_message(message):
+    """Fold a newly created DirectMessage into its Conversation row"""
+    sender_id, receiver_id = message.sender_id, message.receiver_id
+    low_id, high_id = ordered_pair(sender_id, receiver_id)
+    with transaction.atomic():
+        conversation = _get_or_create_locked(low_id, high_id)
+        receiver_side = conversation.side(receiver_id)
+        sender_side = conversation.side(sender_id)
+        updates = {
+            'last_message_id': message.id,
+            'last_message_preview': message.content[:PREVIEW_LENGTH],
+            'last_message_at': message.created_at,
+            # Sending implies the sender has read everything up to here
+            f'{sender_side}_last_read_id': message.id,
+            f'{sender_side}_unread_count': 0,
+        }
+        if sender_id != receiver_id:
+            updates[f'{receiver_side}_unread_count'] = F(f'{receiver_side}_unread_count') + 1
+        Conversation.objects.filter(pk=conversation.pk).update(**updates)
+
+
+def forget_message(message):
+    """Take a deleted DirectMessage back out of its Conversation row"""
+    sender_id, receiver_id = message.sender_id, message.receiver_id
+    low_id, high_id = ordered_pair(sender_id, receiver_id)
+    with transaction.atomic():
+        conversation = Conversation.objects.select_for_update().filter(
+            user_low_id=low_id, user_high_id=high_id
+        ).first()
+        if conversation is None:
+            return
+        latest = DirectMessage.objects.filter(
+            Q(sender_id=low_id, receiver_id=high_id) | Q(sender_id=high_id, receiver_id=low_id)
+        ).order_by('-created_at', '-id').first()
+        if latest is None:
+            conversation.delete()
+            return
+        updates = {
+            'last_message_id': latest.id,
+            'last_message_preview': latest.content[:PREVIEW_LENGTH],
+            'last_message_at': latest.created_at,
+        }
+        receiver_side = conversation.side(receiver_id)
+        if sender_id != receiver_id and message.id > getattr(conversation, f'{receiver_side}_last_read_id'):
+            updates[f'{receiver_side}_unread_count'] = Greatest(F(f'{receiver_side}_unread_count') - 1, Value(0))
+        Conversation.objects.filter(pk=conversation.pk).update(**updates)
+
+
+def mark_read(user, other_user):
+    """Clear user's unread count for the conversation with other_user"""
+    low_id, high_id = ordered_pair(user.id, other_user.id)
+    side = 'low' if user.id == low_id else 'high'
+    Conversation.objects.filter(user_low_id=low_id, user_high_id=high_id).update(**{
+        f'{side}_unread_count': 0,
+        f'{side}_last_read_id': Coalesce(F('last_message_id'), Value(0)),
+    })
+    conversation_read.send(sender=Conversation, user_id=user.id, other_user_id=other_user.id)
+
+
+def inbox_for(user):
+    """User's conversations, most recent first, with both participants loaded"""
+    return Conversation.objects.filter(
+        Q(user_low=user) | Q(user_high=user)
+    ).select_related('user_low', 'user_high').order_by('-last_message_at')
+
+
+def unread_total(user):
+    """Total unread messages across all of user's conversations"""
+    total = Conversation.objects.filter(Q(user_low=user) | Q(user_high=user)).aggregate(
+        unread=Sum(Case(
+            When(user_low=user, then=F('low_unread_count')),
+            default=F('high_unread_count'),
+            output_field=IntegerField(),
+        ))
+    )['unread']
+    return total or 0
+
+
+def rebuild_conversations():
+    """Recreate every Conversation row from message history, marked as read"""
+    latest = {}
+    history = DirectMessage.objects.order_by('id').values_list('id', 'sender_id', 'receiver_id')
+    for pk, sender_id, receiver_id in history.iterator():
+        latest[ordered_pair(sender_id, receiver_id)] = pk
+
+    last_messages = DirectMessage.objects.in_bulk(list(latest.values()))
+    rows = []
+    for (low_id, high_id), pk in latest.items():
+        message = last_messages[pk]
+        rows.append(Conversation(
+            user_low_id=low_id,
+            user_high_id=high_id,
+            last_message=message,
+            last_message_preview=message.content[:PREVIEW_LENGTH],
+            last_message_at=message.created_at,
+            low_last_read_id=pk,
+            high_last_read_id=pk,
+        ))
+
+    with transaction.atomic():
+        Conversation.objects.all().delete()
+        Conversation.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from chat.conversations import rebuild_conversations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Conversation inbox summaries from DirectMessage history'
+
+    def handle(self, *args, **options):
+        count = rebuild_conversations()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} conversations'))
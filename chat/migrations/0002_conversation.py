@@ -0,0 +1,60 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_conversations(apps, schema_editor):
+    # Existing history is treated as already read
+    DirectMessage = apps.get_model('chat', 'DirectMessage')
+    Conversation = apps.get_model('chat', 'Conversation')
+    latest = {}
+    history = DirectMessage.objects.order_by('id').values_list('id', 'sender_id', 'receiver_id')
+    for pk, sender_id, receiver_id in history.iterator():
+        latest[(min(sender_id, receiver_id), max(sender_id, receiver_id))] = pk
+    last_messages = DirectMessage.objects.in_bulk(list(latest.values()))
+    Conversation.objects.bulk_create([
+        Conversation(
+            user_low_id=low_id,
+            user_high_id=high_id,
+            last_message_id=pk,
+            last_message_preview=last_messages[pk].content[:255],
+            last_message_at=last_messages[pk].created_at,
+            low_last_read_id=pk,
+            high_last_read_id=pk,
+        )
+        for (low_id, high_id), pk in latest.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_preview', models.CharField(blank=True, max_length=255)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('low_unread_count', models.PositiveIntegerField(default=0)),
+                ('high_unread_count', models.PositiveIntegerField(default=0)),
+                ('low_last_read_id', models.PositiveBigIntegerField(default=0)),
+                ('high_last_read_id', models.PositiveBigIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.directmessage')),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_high', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_low', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-last_message_at'],
+                'indexes': [models.Index(fields=['user_low', '-last_message_at'], name='conversation_low_inbox_idx'), models.Index(fields=['user_high', '-last_message_at'], name='conversation_high_inbox_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user_low', 'user_high'), name='unique_conversation_pair')],
+            },
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_conversation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='directmessage',
+            index=models.Index(fields=['sender', 'receiver', 'created_at'], name='dm_thread_idx'),
+        ),
+    ]
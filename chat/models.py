@@ -18,6 +18,65 @@ class DirectMessage(models.Model):
     class Meta:
         db_table = 'chat_directmessage'
         ordering = ['created_at']
+        indexes = [
+            # Thread history: one direction of a pair, in time order
+            models.Index(fields=['sender', 'receiver', 'created_at'], name='dm_thread_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender} -> {self.receiver}"
+
+
+class Conversation(models.Model):
+    """
+    Inbox summary for one pair of users, updated on every DirectMessage write.
+
+    The pair is stored ordered (user_low.id < user_high.id) so each pair has
+    exactly one row; unread counts and last-read markers are kept per side.
+    """
+    user_low = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="conversations_low"
+    )
+    user_high = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="conversations_high"
+    )
+    last_message = models.ForeignKey(
+        DirectMessage,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+"
+    )
+    last_message_preview = models.CharField(max_length=255, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    low_unread_count = models.PositiveIntegerField(default=0)
+    high_unread_count = models.PositiveIntegerField(default=0)
+    low_last_read_id = models.PositiveBigIntegerField(default=0)
+    high_last_read_id = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-last_message_at']
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high'], name='unique_conversation_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['user_low', '-last_message_at'], name='conversation_low_inbox_idx'),
+            models.Index(fields=['user_high', '-last_message_at'], name='conversation_high_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_low} <-> {self.user_high}"
+
+    def side(self, user_id):
+        """'low' or 'high' depending on which participant user_id is"""
+        return 'low' if user_id == self.user_low_id else 'high'
+
+    def other_user(self, user_id):
+        return self.user_high if user_id == self.user_low_id else self.user_low
+
+    def unread_for(self, user_id):
+        return getattr(self, f'{self.side(user_id)}_unread_count')
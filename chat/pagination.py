@@ -0,0 +1,68 @@
+"""
+Cursor pagination for two-person message history.
+
+Threads are read newest first in bounded pages ("latest N, then older
+than message X") or as a delta of everything after message X. Rows are
+keyed on (created_at, id), matching the (sender, receiver, created_at)
+index on DirectMessage, and every page is returned oldest to newest.
+"""
+from django.db.models import Q
+
+from .models import DirectMessage
+
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+
+
+def thread_between(user, other_user):
+    """All messages exchanged between two users"""
+    return DirectMessage.objects.filter(
+        Q(sender=user, receiver=other_user) |
+        Q(sender=other_user, receiver=user)
+    )
+
+
+def parse_limit(value):
+    """Clamp a user supplied page size, falling back to the default"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return HISTORY_PAGE_SIZE
+    return max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+
+
+def history_page(thread, before=None, since=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Return (messages, has_more) for one page of ``thread``.
+
+    ``before``: messages older than this message id (latest page if None).
+    ``since``: messages newer than this message id, oldest first.
+    ``has_more`` says whether another page exists in the same direction.
+    Unknown anchor ids yield an empty page.
+    """
+    if since is not None:
+        anchor = thread.filter(id=since).values('created_at', 'id').first()
+        if anchor is None:
+            return [], False
+        rows = list(
+            thread.filter(
+                Q(created_at__gt=anchor['created_at']) |
+                Q(created_at=anchor['created_at'], id__gt=anchor['id'])
+            ).order_by('created_at', 'id')[:limit + 1]
+        )
+        return rows[:limit], len(rows) > limit
+
+    page = thread
+    if before is not None:
+        anchor = thread.filter(id=before).values('created_at', 'id').first()
+        if anchor is None:
+            return [], False
+        page = thread.filter(
+            Q(created_at__lt=anchor['created_at']) |
+            Q(created_at=anchor['created_at'], id__lt=anchor['id'])
+        )
+    rows = list(page.order_by('-created_at', '-id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return rows, has_more
@@ -0,0 +1,208 @@
+"""
+Real-time delivery of direct messages over server-sent events.
+
+A process-local broker fans newly committed DirectMessage rows out to the
+queues of every open stream belonging to the sender or receiver. Under
+ASGI a stream is an async generator waiting on an asyncio queue, which
+publish() feeds through the event loop, so an open stream holds neither
+a thread nor a database connection. Under WSGI (``runserver``, gunicorn
+threads) it is a plain generator holding one worker thread; it gives its
+database connection back while it waits.
+
+Both replay anything they missed from the database (``since`` /
+``Last-Event-ID``) before switching to live events, and check the
+database again at every heartbeat, so a reconnect, a dropped event or a
+message sent through another worker process arrives within a heartbeat
+instead of being lost.
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Max, Q
+
+from .models import DirectMessage
+from .serializers import DirectMessageSerializer
+
+STREAM_HEARTBEAT_SECONDS = 15
+# Close streams periodically so worker threads are recycled; EventSource reconnects
+STREAM_MAX_SECONDS = 300
+SUBSCRIBER_QUEUE_SIZE = 100
+REPLAY_LIMIT = 200
+
+
+class Subscription:
+    """
+    One open stream's queue of pending events: an asyncio queue owned by
+    ``loop`` for ASGI streams, a thread-safe queue otherwise.
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        if loop is None:
+            self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        else:
+            self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event):
+        """Called from the publishing thread; flags the stream for resync when full"""
+        if self.loop is None:
+            self._put(event)
+            return
+        try:
+            # asyncio queues are not thread-safe; hand the event to their loop
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop is closed, so the stream is gone
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except (queue.Full, asyncio.QueueFull):
+            self.overflowed = True
+
+
+class MessageBroker:
+    """In-process pub/sub keyed by user id; safe to publish from any thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id, loop=None):
+        subscription = Subscription(loop)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    def subscriber_count(self, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+broker = MessageBroker()
+
+
+def message_event(message):
+    """Serialize a DirectMessage into the payload sent to streams"""
+    return {
+        'id': message.id,
+        'data': DirectMessageSerializer(message).data,
+    }
+
+
+def publish_message(message):
+    """Push a committed DirectMessage to both participants' open streams"""
+    event = message_event(message)
+    for user_id in {message.sender_id, message.receiver_id}:
+        broker.publish(user_id, event)
+
+
+def format_sse(event):
+    """Encode an event dict as a text/event-stream frame"""
+    payload = json.dumps(event['data'], default=str)
+    return f"id: {event['id']}\nevent: message\ndata: {payload}\n\n"
+
+
+def _replay(user_id, since):
+    """Events for messages the user has not seen yet, oldest first"""
+    missed = DirectMessage.objects.filter(
+        Q(sender_id=user_id) | Q(receiver_id=user_id), id__gt=since
+    ).select_related('sender', 'receiver').order_by('id')[:REPLAY_LIMIT]
+    return [message_event(message) for message in missed]
+
+
+def _newest_id(user_id):
+    newest = DirectMessage.objects.filter(Q(sender_id=user_id) | Q(receiver_id=user_id)).aggregate(newest=Max('id'))
+    return newest['newest'] or 0
+
+
+def _release_connection():
+    """Close the stream's connection while it waits; the next query reopens one"""
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+def event_stream(user_id, since=None):
+    """Iterator of SSE frames for ``user_id``, starting after ``since`` (default: now)"""
+    subscription = broker.subscribe(user_id)
+    deadline = time.monotonic() + STREAM_MAX_SECONDS
+    last_id = _newest_id(user_id) if since is None else since
+    try:
+        yield 'retry: 3000\n\n'
+        events = _replay(user_id, last_id) if since is not None else []
+        while True:
+            _release_connection()
+            for event in events:
+                if event['id'] <= last_id:
+                    continue
+                last_id = event['id']
+                yield format_sse(event)
+
+            # A subscriber that overflowed ends its stream; the client reconnects
+            # with Last-Event-ID and replays the gap from the database
+            remaining = deadline - time.monotonic()
+            if subscription.overflowed or remaining <= 0:
+                break
+            try:
+                events = [subscription.queue.get(timeout=min(STREAM_HEARTBEAT_SECONDS, remaining))]
+            except queue.Empty:
+                # Messages sent through other processes never reach this broker
+                events = _replay(user_id, last_id)
+                if not events:
+                    yield ': keepalive\n\n'
+    finally:
+        broker.unsubscribe(user_id, subscription)
+
+
+async def async_event_stream(user_id, since=None):
+    """event_stream() for ASGI: an async iterator that waits on the event loop"""
+    subscription = broker.subscribe(user_id, loop=asyncio.get_running_loop())
+    deadline = time.monotonic() + STREAM_MAX_SECONDS
+    try:
+        last_id = await sync_to_async(_newest_id)(user_id) if since is None else since
+        yield 'retry: 3000\n\n'
+        events = await sync_to_async(_replay)(user_id, last_id) if since is not None else []
+        while True:
+            for event in events:
+                if event['id'] <= last_id:
+                    continue
+                last_id = event['id']
+                yield format_sse(event)
+
+            remaining = deadline - time.monotonic()
+            if subscription.overflowed or remaining <= 0:
+                break
+            try:
+                events = [await asyncio.wait_for(
+                    subscription.queue.get(), timeout=min(STREAM_HEARTBEAT_SECONDS, remaining),
+                )]
+            except asyncio.TimeoutError:
+                events = await sync_to_async(_replay)(user_id, last_id)
+                if not events:
+                    yield ': keepalive\n\n'
+    finally:
+        broker.unsubscribe(user_id, subscription)
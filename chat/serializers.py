@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import DirectMessage
+from .models import Conversation, DirectMessage
 from django.contrib.auth.models import User
 
 
@@ -17,3 +17,19 @@ class DirectMessageSerializer(serializers.ModelSerializer):
         model = DirectMessage
         fields = ['id', 'sender', 'receiver', 'content', 'created_at']
         read_only_fields = ['created_at']
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """Inbox entry as seen by the requesting user"""
+    user = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
+
+    def get_user(self, obj):
+        return UserMinimalSerializer(obj.other_user(self.context['request'].user.id)).data
+
+    def get_unread_count(self, obj):
+        return obj.unread_for(self.context['request'].user.id)
+
+    class Meta:
+        model = Conversation
+        fields = ['id', 'user', 'last_message_id', 'last_message_preview', 'last_message_at', 'unread_count']
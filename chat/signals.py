@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .conversations import forget_message, record_message
+from .realtime import publish_message
+from .models import DirectMessage
+
+
+@receiver(post_save, sender=DirectMessage)
+def direct_message_created(sender, instance, created, **kwargs):
+    """Keep the pair's Conversation summary current on every send"""
+    if created:
+        record_message(instance)
+        transaction.on_commit(lambda: publish_message(instance))
+
+
+@receiver(post_delete, sender=DirectMessage)
+def direct_message_deleted(sender, instance, **kwargs):
+    """Move the pair's summary back to the previous message"""
+    forget_message(instance)
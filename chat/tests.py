@@ -1,3 +1,280 @@
+import asyncio
+import json
+from datetime import timedelta
+from importlib import import_module
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .conversations import inbox_for, mark_read, rebuild_conversations, unread_total
+from .models import Conversation, DirectMessage
+from .pagination import history_page, thread_between
+from .realtime import broker, publish_message
+
+
+def summaries():
+    """Every Conversation as comparable tuples"""
+    return sorted(Conversation.objects.values_list(
+        'user_low_id', 'user_high_id', 'last_message_id', 'last_message_preview',
+        'low_unread_count', 'high_unread_count', 'low_last_read_id', 'high_last_read_id',
+    ))
+
+
+class ConversationSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', None)
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', None)
+        cls.carol = User.objects.create_user('carol', 'carol@example.com', None)
+
+    def send(self, sender, receiver, content):
+        return DirectMessage.objects.create(sender=sender, receiver=receiver, content=content)
+
+    def conversation(self, a, b):
+        return Conversation.objects.get(user_low_id=min(a.id, b.id), user_high_id=max(a.id, b.id))
+
+    def test_sending_updates_the_pair_summary(self):
+        self.send(self.alice, self.bob, 'Hi Bob')
+        last = self.send(self.alice, self.bob, 'Are you there?')
+        conversation = self.conversation(self.alice, self.bob)
+        self.assertEqual(conversation.last_message_id, last.id)
+        self.assertEqual(conversation.last_message_preview, 'Are you there?')
+        self.assertEqual(conversation.unread_for(self.bob.id), 2)
+        self.assertEqual(conversation.unread_for(self.alice.id), 0)
+        self.assertEqual(unread_total(self.bob), 2)
+
+        # Replying reads the thread and leaves the other side one unread
+        self.send(self.bob, self.alice, 'Yes')
+        conversation = self.conversation(self.alice, self.bob)
+        self.assertEqual((conversation.unread_for(self.bob.id), conversation.unread_for(self.alice.id)), (0, 1))
+
+    def test_reading_clears_the_unread_count(self):
+        self.send(self.alice, self.bob, 'One')
+        self.send(self.carol, self.bob, 'Two')
+        self.assertEqual(unread_total(self.bob), 2)
+        mark_read(self.bob, self.alice)
+        self.assertEqual(unread_total(self.bob), 1)
+        conversation = self.conversation(self.alice, self.bob)
+        self.assertEqual(getattr(conversation, f'{conversation.side(self.bob.id)}_last_read_id'), conversation.last_message_id)
+        self.assertEqual([c.other_user(self.bob.id) for c in inbox_for(self.bob)], [self.carol, self.alice])
+
+    def test_deleting_messages_rolls_the_summary_back(self):
+        first = self.send(self.alice, self.bob, 'Kept')
+        unread = self.send(self.alice, self.bob, 'Deleted')
+        unread.delete()
+        conversation = self.conversation(self.alice, self.bob)
+        self.assertEqual((conversation.last_message_id, conversation.last_message_preview), (first.id, 'Kept'))
+        self.assertEqual(conversation.unread_for(self.bob.id), 1)
+
+        first.delete()
+        self.assertFalse(Conversation.objects.exists())
+
+    def test_backfill_and_rebuild_match_the_history(self):
+        self.send(self.alice, self.bob, 'First')
+        self.send(self.bob, self.alice, 'Reply')
+        latest = self.send(self.carol, self.alice, 'Hello')
+        rebuild_conversations()
+        rebuilt = summaries()
+        self.assertEqual(len(rebuilt), 2)
+        # History is treated as read
+        self.assertIn(
+            (self.alice.id, self.carol.id, latest.id, 'Hello', 0, 0, latest.id, latest.id), rebuilt,
+        )
+
+        Conversation.objects.all().delete()
+        migration = import_module('chat.migrations.0002_conversation')
+        migration.backfill_conversations(apps, None)
+        self.assertEqual(summaries(), rebuilt)
+
+
+class ConversationEndpointTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', None)
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', None)
+        cls.carol = User.objects.create_user('carol', 'carol@example.com', None)
+        DirectMessage.objects.create(sender=cls.bob, receiver=cls.alice, content='Older')
+        DirectMessage.objects.create(sender=cls.alice, receiver=cls.carol, content='Newer')
+
+    def setUp(self):
+        self.client.force_authenticate(self.alice)
+
+    def test_conversations_keep_listing_users(self):
+        response = self.client.get('/chat/api/messages/conversations/')
+        self.assertEqual(response.data, [
+            {'id': self.carol.id, 'username': 'carol', 'first_name': '', 'last_name': ''},
+            {'id': self.bob.id, 'username': 'bob', 'first_name': '', 'last_name': ''},
+        ])
+
+        response = self.client.get('/chat/api/messages/inbox/')
+        self.assertEqual(
+            [(entry['user']['id'], entry['last_message_preview'], entry['unread_count']) for entry in response.data],
+            [(self.carol.id, 'Newer', 0), (self.bob.id, 'Older', 1)],
+        )
+
+    def test_sending_to_an_unknown_user_is_rejected(self):
+        self.client.force_login(self.alice)
+        xhr = {'x-requested-with': 'XMLHttpRequest'}
+        for receiver in ('999999', 'abc'):
+            response = self.client.post('/chat/send/', {'receiver': receiver, 'content': 'Hi'}, headers=xhr)
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/chat/send/', {'receiver': '999999', 'content': 'Hi'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(DirectMessage.objects.count(), 2)
+
+        response = self.client.post('/chat/send/', {'receiver': str(self.bob.id), 'content': 'Hi'}, headers=xhr)
+        self.assertEqual(response.status_code, 201)
+
+
+class HistoryPaginationTests(APITestCase):
+    MESSAGES = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', None)
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', None)
+        outsider = User.objects.create_user('mallory', 'mallory@example.com', None)
+        for i in range(cls.MESSAGES):
+            sender, receiver = (cls.alice, cls.bob) if i % 2 else (cls.bob, cls.alice)
+            DirectMessage.objects.create(sender=sender, receiver=receiver, content=f'Message {i}')
+        DirectMessage.objects.create(sender=outsider, receiver=cls.alice, content='Other thread')
+        # Messages 2-4 share a timestamp; the id orders them
+        thread = thread_between(cls.alice, cls.bob)
+        ids = list(thread.order_by('id').values_list('id', flat=True))
+        DirectMessage.objects.filter(id__in=ids[2:5]).update(created_at=timezone.now() - timedelta(minutes=5))
+        DirectMessage.objects.filter(id__in=ids[:2]).update(created_at=timezone.now() - timedelta(minutes=10))
+        cls.ids = ids
+
+    def setUp(self):
+        self.client.force_authenticate(self.alice)
+        self.thread = thread_between(self.alice, self.bob)
+
+    def ids_of(self, messages):
+        return [message.id for message in messages]
+
+    def test_paging_back_crosses_equal_timestamps_without_gaps(self):
+        seen, before, has_more = [], None, True
+        while has_more:
+            page, has_more = history_page(self.thread, before=before, limit=2)
+            seen[:0] = self.ids_of(page)
+            before = page[0].id
+        self.assertEqual(seen, self.ids)
+
+        page, has_more = history_page(self.thread, since=self.ids[2], limit=3)
+        self.assertEqual((self.ids_of(page), has_more), (self.ids[3:6], True))
+        page, has_more = history_page(self.thread, since=self.ids[-1])
+        self.assertEqual((page, has_more), ([], False))
+
+    def test_unknown_anchor_yields_an_empty_page(self):
+        other = DirectMessage.objects.get(content='Other thread')
+        self.assertEqual(history_page(self.thread, before=other.id), ([], False))
+        self.assertEqual(history_page(self.thread, since=10 ** 9), ([], False))
+
+    def test_paginated_response(self):
+        url = '/chat/api/messages/with_user/'
+        response = self.client.get(url, {'user_id': self.bob.id, 'limit': 3})
+        self.assertEqual([message['id'] for message in response.data['results']], self.ids[-3:])
+        self.assertEqual(
+            (response.data['has_more'], response.data['oldest_id'], response.data['newest_id']),
+            (True, self.ids[-3], self.ids[-1]),
+        )
+        response = self.client.get(url, {'user_id': self.bob.id, 'before': self.ids[-3]})
+        self.assertEqual([message['id'] for message in response.data['results']], self.ids[:-3])
+        self.assertFalse(response.data['has_more'])
+        self.assertEqual(self.client.get(url, {'user_id': self.bob.id, 'before': 'abc'}).status_code, 400)
+
+    def test_default_response_is_the_latest_page(self):
+        with patch('chat.pagination.HISTORY_PAGE_SIZE', 2):
+            response = self.client.get('/chat/api/messages/with_user/', {'user_id': self.bob.id})
+        self.assertEqual([message['id'] for message in response.data['results']], self.ids[-2:])
+        self.assertTrue(response.data['has_more'])
+        self.assertFalse(response.has_header('Deprecation'))
+
+    def test_full_thread_is_behind_a_deprecated_flag(self):
+        response = self.client.get('/chat/api/messages/with_user/', {'user_id': self.bob.id, 'all': 1})
+        self.assertEqual([message['id'] for message in response.data], self.ids)
+        self.assertEqual(response['Deprecation'], 'true')
+
+
+class MessageStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', None)
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', None)
+
+    def setUp(self):
+        self.client.force_login(self.alice)
+
+    def open_stream(self, **params):
+        response = self.client.get('/chat/stream/', params)
+        self.addCleanup(response.close)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = iter(response.streaming_content)
+        self.assertEqual(next(frames), b'retry: 3000\n\n')
+        return response, frames
+
+    def event(self, frame):
+        lines = frame.decode().splitlines()
+        self.assertEqual(lines[1], 'event: message')
+        return int(lines[0].removeprefix('id: ')), json.loads(lines[2].removeprefix('data: '))
+
+    def test_published_message_reaches_the_open_stream(self):
+        response, frames = self.open_stream()
+        self.assertEqual(broker.subscriber_count(self.alice.id), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            message = DirectMessage.objects.create(sender=self.bob, receiver=self.alice, content='Live!')
+        event_id, data = self.event(next(frames))
+        self.assertEqual((event_id, data['content'], data['sender']['id']), (message.id, 'Live!', self.bob.id))
+        response.close()
+        self.assertEqual(broker.subscriber_count(self.alice.id), 0)
+
+    def test_stream_replays_messages_after_since(self):
+        seen = DirectMessage.objects.create(sender=self.bob, receiver=self.alice, content='Seen')
+        missed = DirectMessage.objects.create(sender=self.alice, receiver=self.bob, content='Missed')
+        _, frames = self.open_stream(since=seen.id)
+        self.assertEqual(self.event(next(frames))[0], missed.id)
+
+    @patch('chat.realtime.STREAM_HEARTBEAT_SECONDS', 0.01)
+    def test_messages_from_other_processes_arrive_at_the_heartbeat(self):
+        _, frames = self.open_stream()
+        # Not published to this process's broker: on_commit never runs here
+        message = DirectMessage.objects.create(sender=self.bob, receiver=self.alice, content='Elsewhere')
+        self.assertEqual(self.event(next(frames))[0], message.id)
+
+    def test_sending_from_the_page_returns_the_message(self):
+        response = self.client.post(
+            '/chat/send/', {'receiver': self.bob.id, 'content': 'Hello'}, headers={'x-requested-with': 'XMLHttpRequest'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            (response.json()['content'], response.json()['receiver']['id']), ('Hello', self.bob.id),
+        )
+
+    @patch('chat.realtime.STREAM_HEARTBEAT_SECONDS', 0.05)
+    async def test_asgi_stream_delivers_frames_as_they_happen(self):
+        await self.async_client.aforce_login(self.alice)
+        response = await self.async_client.get('/chat/stream/')
+        self.assertTrue(response.is_async)
+        frames = aiter(response.streaming_content)
+        # Each frame arrives long before STREAM_MAX_SECONDS ends the stream
+        self.assertEqual(await asyncio.wait_for(anext(frames), 1), b'retry: 3000\n\n')
+        self.assertEqual(await asyncio.wait_for(anext(frames), 1), b': keepalive\n\n')
+        self.assertEqual(broker.subscriber_count(self.alice.id), 1)
+
+        message = await DirectMessage.objects.acreate(sender=self.bob, receiver=self.alice, content='Async')
+        # Published from a worker thread, as the on_commit hook of a sync view would
+        await sync_to_async(publish_message, thread_sensitive=False)(message)
+        self.assertEqual(self.event(await asyncio.wait_for(anext(frames), 1))[0], message.id)
 
-# Create your tests here.
+        # A client disconnect cancels the task reading the stream
+        reader = asyncio.ensure_future(anext(frames))
+        await asyncio.sleep(0.01)
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+        self.assertEqual(broker.subscriber_count(self.alice.id), 0)
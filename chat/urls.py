@@ -3,6 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     messages_page, 
     send_message, 
+    message_stream,
+    mark_thread_read,
     DirectMessageViewSet,
     send_message_api,
     get_users,
@@ -16,6 +18,8 @@ urlpatterns = [
     # Web views
     path("", messages_page, name="messages"),
     path("send/", send_message, name="send_message"),
+    path("stream/", message_stream, name="message_stream"),
+    path("read/", mark_thread_read, name="mark_thread_read"),
     
     # API endpoints
     path("api/", include(router.urls)),
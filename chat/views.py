@@ -1,35 +1,53 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.db.models import Q
+from django.views.decorators.http import require_POST
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from .conversations import inbox_for, mark_read, unread_total
 from .models import DirectMessage
-from .serializers import DirectMessageSerializer, UserMinimalSerializer
+from .pagination import history_page, parse_limit, thread_between
+from .realtime import async_event_stream, event_stream
+from .serializers import ConversationSerializer, DirectMessageSerializer, UserMinimalSerializer
+
+# Deprecated: with_user?...&all=1 returns the whole thread as a plain list
+HISTORY_ALL_PARAM = 'all'
 
 @login_required
 def messages_page(request):
     to_id = request.GET.get("to")
+    before = request.GET.get("before")
     chat_user = None
     messages = []
+    has_older = False
 
     if to_id:
         chat_user = get_object_or_404(User, id=to_id)
-        messages = DirectMessage.objects.filter(
-            Q(sender=request.user, receiver=chat_user) |
-            Q(sender=chat_user, receiver=request.user)
-        ).order_by("created_at")
-
-    # Get only users with whom current user has conversations (privacy fix)
-    users_with_conversations = User.objects.filter(
-        Q(dm_sent__receiver=request.user) | Q(dm_received__sender=request.user)
-    ).distinct().order_by('username')
+        thread = thread_between(request.user, chat_user).select_related("sender")
+        before = int(before) if before and before.isdigit() else None
+        messages, has_older = history_page(thread, before=before)
+        if before is None:
+            mark_read(request.user, chat_user)
+
+    # Only users with whom current user has conversations (privacy fix),
+    # read from the Conversation summaries, most recent first
+    users_with_conversations = []
+    for conversation in inbox_for(request.user):
+        other = conversation.other_user(request.user.id)
+        other.unread_count = 0 if other == chat_user else conversation.unread_for(request.user.id)
+        users_with_conversations.append(other)
 
     return render(request, "messages.html", {
         "chat_user": chat_user,
         "messages": messages,
+        "has_older": has_older,
+        "oldest_id": messages[0].id if messages else None,
+        "newest_id": messages[-1].id if messages else 0,
         "mentors": users_with_conversations,  # Only users with existing conversations
     })
 
@@ -37,20 +55,56 @@ def messages_page(request):
 @login_required
 def send_message(request):
     if request.method == "POST":
-        receiver_id = request.POST.get("receiver")
+        receiver_id = request.POST.get("receiver", "")
         content = request.POST.get("content")
-
-        if receiver_id and content:
-            DirectMessage.objects.create(
+        is_xhr = request.headers.get("x-requested-with") == "XMLHttpRequest"
+        receiver = User.objects.filter(id=receiver_id).first() if receiver_id.isdigit() else None
+
+        if receiver_id and receiver is None:
+            if is_xhr:
+                return JsonResponse({"error": "Unknown receiver"}, status=400)
+            return HttpResponseBadRequest("Unknown receiver")
+        if receiver and content:
+            message = DirectMessage.objects.create(
                 sender=request.user,
-                receiver_id=receiver_id,
+                receiver=receiver,
                 content=content
             )
+            # The chat page sends via fetch() and shows the returned message
+            # right away; the event stream skips it by id
+            if is_xhr:
+                return JsonResponse(DirectMessageSerializer(message).data, status=201)
+        elif is_xhr:
+            return JsonResponse({"error": "receiver and content are required"}, status=400)
 
         return redirect(f"/chat/?to={receiver_id}")
     return redirect("/chat/")
 
 
+@login_required
+def message_stream(request):
+    """Server-sent events stream of new direct messages for the current user"""
+    since = request.GET.get("since") or request.headers.get("Last-Event-ID")
+    since = int(since) if since and since.isdigit() else None
+
+    # Under ASGI the stream must be an async iterator; Django would buffer a
+    # sync one to the end before sending anything
+    stream = async_event_stream if isinstance(request, ASGIRequest) else event_stream
+    response = StreamingHttpResponse(stream(request.user.id, since), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+@require_POST
+def mark_thread_read(request):
+    """Clear the unread count for a thread the user is viewing live"""
+    chat_user = get_object_or_404(User, id=request.POST.get("to"))
+    mark_read(request.user, chat_user)
+    return JsonResponse({"status": "read"})
+
+
 # API Views
 class DirectMessageViewSet(viewsets.ModelViewSet):
     serializer_class = DirectMessageSerializer
@@ -68,20 +122,36 @@ class DirectMessageViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def conversations(self, request):
-        """Get list of users with whom current user has conversations"""
-        user = request.user
-        
-        # Get all users who have sent or received messages from current user
-        message_users = User.objects.filter(
-            Q(dm_sent__receiver=user) | Q(dm_received__sender=user)
-        ).distinct()
-        
-        serializer = UserMinimalSerializer(message_users, many=True)
+        """Get list of users with whom current user has conversations, most recent first"""
+        users = [conversation.other_user(request.user.id) for conversation in inbox_for(request.user)]
+        return Response(UserMinimalSerializer(users, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        """Get the current user's conversations with previews and unread counts"""
+        serializer = ConversationSerializer(
+            inbox_for(request.user), many=True, context={'request': request}
+        )
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def unread(self, request):
+        """Get the total unread message count for the badge"""
+        return Response({'unread_count': unread_total(request.user)})
+
     @action(detail=False, methods=['get'])
     def with_user(self, request):
-        """Get conversation with a specific user"""
+        """
+        Get the conversation with a specific user.
+
+        Returns ``{results, has_more, oldest_id, newest_id}`` with the
+        latest ``limit`` messages; pass ``before=<id>`` for older pages or
+        ``since=<id>`` for messages newer than one already shown.
+
+        Deprecated: ``all=1`` returns the whole thread as a plain list, the
+        original response shape, with a ``Deprecation`` header. It will be
+        removed once clients page.
+        """
         user_id = request.query_params.get('user_id')
         if not user_id:
             return Response(
@@ -97,13 +167,37 @@ class DirectMessageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        messages = DirectMessage.objects.filter(
-            Q(sender=request.user, receiver=other_user) |
-            Q(sender=other_user, receiver=request.user)
-        ).order_by('created_at')
+        try:
+            before = request.query_params.get('before')
+            before = int(before) if before else None
+            since = request.query_params.get('since')
+            since = int(since) if since else None
+        except ValueError:
+            return Response(
+                {'error': 'before and since must be message ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        thread = thread_between(request.user, other_user).select_related('sender', 'receiver')
+        if request.query_params.get(HISTORY_ALL_PARAM) in ('1', 'true'):
+            mark_read(request.user, other_user)
+            serializer = self.get_serializer(thread.order_by('created_at', 'id'), many=True)
+            return Response(serializer.data, headers={'Deprecation': 'true'})
+
+        messages, has_more = history_page(
+            thread, before=before, since=since,
+            limit=parse_limit(request.query_params.get('limit'))
+        )
+        if before is None:
+            mark_read(request.user, other_user)
         
         serializer = self.get_serializer(messages, many=True)
-        return Response(serializer.data)
+        return Response({
+            'results': serializer.data,
+            'has_more': has_more,
+            'oldest_id': messages[0].id if messages else None,
+            'newest_id': messages[-1].id if messages else None,
+        })
 
 
 @api_view(['POST'])
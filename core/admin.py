@@ -16,7 +16,3 @@ class CommunityAdmin(admin.ModelAdmin):
     
     def get_changelist(self, request, **kwargs):
         return CommunityChangeList
-    
-    def members_count(self, obj):
-        return obj.members.count()
-    members_count.short_description = 'Members'
@@ -0,0 +1,286 @@
+"""
+Benchmark support for the bench and bench_writes management commands.
+
+scratch_database() runs a block against a throwaway copy of the configured
+database, so benchmarks never touch real data. seed() fills it with a
+reproducible data set of a given Scale (bulk inserts, then the same
+rebuild jobs the management commands run for counters, conversations and
+the search and recommendation indexes). run_journeys() drives the main
+user journey through the Django test client from several threads and
+collects per-endpoint latencies; summarize() in core.instrumentation turns
+them into percentiles.
+"""
+import random
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+
+from accounts.models import StudentProfile
+from chat.conversations import rebuild_conversations
+from chat.models import DirectMessage
+from core.counters import recount_all
+from core.models import Community, Meeting, Post, PostComment
+from core.recommendations import recompute_all as recompute_communities
+from mentorship.models import MentorProfile, normalize_field
+from mentorship.recommendations import recompute_all as recompute_mentors
+from mentorship.tokens import rebuild_mentor_index, rebuild_student_index
+from search.indexing import rebuild_index
+
+BENCH_PASSWORD = 'bench-password'
+
+WORDS = [
+    'python', 'django', 'design', 'startups', 'marketing', 'biology', 'chemistry', 'music',
+    'painting', 'finance', 'nutrition', 'fitness', 'robotics', 'data', 'writing', 'physics',
+]
+FIELDS = ['Software Engineering', 'Data Science', 'Product Design', 'Finance', 'Medicine', 'Music']
+
+
+@dataclass
+class Scale:
+    users: int = 200
+    communities: int = 20
+    posts: int = 10  # per community
+    comments: int = 5  # per post
+    messages: int = 2000
+    meetings: int = 50
+    mentor_ratio: float = 0.1
+
+    def as_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class SeededData:
+    # user id -> username
+    usernames: dict
+    # user id -> ids of the communities they belong to
+    memberships: dict
+    # community id -> ids of its posts
+    posts: dict
+    # user id -> id of a user they already chat with
+    peers: dict
+
+
+BENCH_DATABASE_PREFIX = 'bench_'
+
+
+@contextmanager
+def scratch_database(interactive=True):
+    """
+    Run the block against a freshly migrated, throwaway database.
+
+    It is named ``bench_<NAME>`` so it never collides with the test
+    runner's ``test_<NAME>``. If it already exists (a crashed run), the
+    user is asked before it is dropped, unless ``interactive`` is False.
+    On SQLite it is a file in a temporary directory, not the in-memory
+    test default, so concurrent clients contend for the same lock a
+    deployed SQLite database would.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    saved_name = test_settings.get('NAME')
+    scratch_dir = None
+    if connection.vendor == 'sqlite':
+        scratch_dir = tempfile.mkdtemp(prefix='unity-circles-bench-')
+        test_settings['NAME'] = f'{scratch_dir}/bench.sqlite3'
+    else:
+        test_settings['NAME'] = BENCH_DATABASE_PREFIX + connection.settings_dict['NAME']
+    try:
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=not interactive, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        test_settings['NAME'] = saved_name
+        if scratch_dir is not None:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def _words(rng, count):
+    return ' '.join(rng.sample(WORDS, count))
+
+
+def seed(scale, random_seed=0):
+    """Fill the database with ``scale`` worth of data; same seed, same data"""
+    rng = random.Random(random_seed)
+    password = make_password(BENCH_PASSWORD)
+    User.objects.bulk_create([
+        User(username=f'bench{i}', email=f'bench{i}@example.com', password=password)
+        for i in range(scale.users)
+    ])
+    usernames = dict(User.objects.filter(username__startswith='bench').values_list('id', 'username'))
+    user_ids = sorted(usernames)
+
+    mentor_ids = user_ids[:max(1, int(len(user_ids) * scale.mentor_ratio))]
+    StudentProfile.objects.bulk_create([
+        StudentProfile(user_id=pk, interests=_words(rng, 3), role='mentor' if index < len(mentor_ids) else 'student')
+        for index, pk in enumerate(user_ids)
+    ])
+    mentor_fields = [rng.choice(FIELDS) for _ in mentor_ids]
+    MentorProfile.objects.bulk_create([
+        MentorProfile(user_id=pk, field=field, field_key=normalize_field(field), expertise=_words(rng, 4))
+        for pk, field in zip(mentor_ids, mentor_fields)
+    ])
+
+    Community.objects.bulk_create([
+        Community(
+            name=f'Bench circle {i}', description=_words(rng, 6),
+            category=rng.choice(Community.CATEGORY_CHOICES)[0], creator_id=rng.choice(user_ids),
+        )
+        for i in range(scale.communities)
+    ])
+    community_ids = list(Community.objects.order_by('id').values_list('id', flat=True))
+    memberships = {pk: rng.sample(community_ids, min(len(community_ids), rng.randint(1, 4))) for pk in user_ids}
+    Membership = Community.members.through
+    Membership.objects.bulk_create([
+        Membership(community_id=community_id, user_id=user_id)
+        for user_id, joined in memberships.items() for community_id in joined
+    ])
+    members = {}
+    for user_id, joined in memberships.items():
+        for community_id in joined:
+            members.setdefault(community_id, []).append(user_id)
+
+    Post.objects.bulk_create([
+        Post(
+            community_id=community_id, author_id=rng.choice(members.get(community_id, user_ids)),
+            title=f'Bench post {i} about {_words(rng, 2)}', content=_words(rng, 12),
+        )
+        for community_id in community_ids for i in range(scale.posts)
+    ])
+    posts = {}
+    for pk, community_id in Post.objects.order_by('id').values_list('id', 'community_id'):
+        posts.setdefault(community_id, []).append(pk)
+    PostComment.objects.bulk_create([
+        PostComment(post_id=post_id, author_id=rng.choice(user_ids), content=_words(rng, 8))
+        for post_ids in posts.values() for post_id in post_ids for _ in range(scale.comments)
+    ])
+
+    # Pair each user with the next one in a shuffled ring, so nobody is their own peer
+    ring = rng.sample(user_ids, len(user_ids))
+    peers = {pk: ring[(index + 1) % len(ring)] for index, pk in enumerate(ring)}
+    senders = [rng.choice(user_ids) for _ in range(scale.messages)]
+    DirectMessage.objects.bulk_create([
+        DirectMessage(sender_id=sender, receiver_id=peers[sender], content=_words(rng, 6))
+        for sender in senders
+    ])
+
+    Meeting.objects.bulk_create([
+        Meeting(
+            title=f'Bench meeting {i}', mentor_id=rng.choice(mentor_ids), community_id=rng.choice(community_ids),
+            scheduled_time=timezone.now() + timedelta(hours=i),
+        )
+        for i in range(scale.meetings)
+    ])
+    Attendance = Meeting.attendees.through
+    Attendance.objects.bulk_create([
+        Attendance(meeting_id=meeting_id, user_id=user_id)
+        for meeting_id in Meeting.objects.values_list('id', flat=True)
+        for user_id in rng.sample(user_ids, min(len(user_ids), 5))
+    ])
+
+    # Derived state normally kept up to date by signals
+    recount_all()
+    rebuild_conversations()
+    rebuild_index()
+    rebuild_mentor_index()
+    rebuild_student_index()
+    recompute_mentors()
+    recompute_communities()
+    return SeededData(usernames=usernames, memberships=memberships, posts=posts, peers=peers)
+
+
+def journey(client, data, user_id, rng):
+    """
+    One visit: log in, open the dashboard, browse to a community and one of
+    its posts, comment on it, then open a conversation and send a message.
+    Yields (endpoint, response, expected status) after each request.
+    """
+    community_id = rng.choice(data.memberships[user_id])
+    post_ids = data.posts.get(community_id)
+    peer_id = data.peers[user_id]
+
+    yield 'login', client.post('/login/', {'username': data.usernames[user_id], 'password': BENCH_PASSWORD}), 302
+    yield 'dashboard', client.get('/dashboard/'), 200
+    yield 'communities', client.get('/communities/'), 200
+    yield 'community_detail', client.get(f'/communities/{community_id}/'), 200
+    if post_ids:
+        post_id = rng.choice(post_ids)
+        yield 'post_detail', client.get(f'/posts/{post_id}/'), 200
+        yield 'add_comment', client.post(f'/posts/{post_id}/comment/', {'content': 'Benchmark comment'}), 302
+    yield 'messages', client.get('/chat/', {'to': peer_id}), 200
+    yield 'send_message', client.post(
+        '/chat/send/', {'receiver': peer_id, 'content': 'Benchmark message'},
+        headers={'X-Requested-With': 'XMLHttpRequest'},
+    ), 201
+    client.get('/logout/')
+
+
+def run_journeys(data, clients, journeys, warmup=1, random_seed=0):
+    """
+    Run ``journeys`` visits on each of ``clients`` threads after ``warmup``
+    unrecorded ones. Returns (latencies, errors, elapsed seconds), with
+    latencies as {endpoint: [seconds]} and errors as {endpoint: count} of
+    responses with an unexpected status.
+    """
+    latencies = {}
+    errors = {}
+    lock = threading.Lock()
+    start_line = threading.Barrier(clients + 1)
+
+    def visitor(index):
+        rng = random.Random(random_seed + index)
+        user_ids = sorted(data.usernames)
+        local_latencies, local_errors = {}, {}
+        try:
+            try:
+                for _ in range(warmup):
+                    _consume(journey(Client(raise_request_exception=False), data, rng.choice(user_ids), rng))
+            except BaseException:
+                # Release the other threads instead of leaving them waiting
+                start_line.abort()
+                raise
+            start_line.wait()
+            for _ in range(journeys):
+                client = Client(raise_request_exception=False)
+                steps = journey(client, data, rng.choice(user_ids), rng)
+                while True:
+                    began = time.perf_counter()
+                    try:
+                        endpoint, response, expected = next(steps)
+                    except StopIteration:
+                        break
+                    local_latencies.setdefault(endpoint, []).append(time.perf_counter() - began)
+                    if response.status_code != expected:
+                        local_errors[endpoint] = local_errors.get(endpoint, 0) + 1
+        finally:
+            connection.close()
+        with lock:
+            for endpoint, values in local_latencies.items():
+                latencies.setdefault(endpoint, []).extend(values)
+            for endpoint, count in local_errors.items():
+                errors[endpoint] = errors.get(endpoint, 0) + count
+
+    threads = [threading.Thread(target=visitor, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    start_line.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - began
+
+
+def _consume(steps):
+    for _ in steps:
+        pass
@@ -0,0 +1,178 @@
+"""
+Project cache helpers on top of Django's cache framework.
+
+Keys are built by make_key() as ``namespace:part:part``. Anything derived
+from model data goes through versioned_key(), which folds in a version
+counter for its namespace and for each model it depends on; bumping a
+counter (invalidate_namespace(), invalidate_model()) retires every key
+built on it at once without having to know those keys. get_or_compute()
+adds single-flight recomputation so a popular key expiring does not send
+every concurrent request to the database.
+
+The backend is configured in settings.CACHES: bounded LRU local memory by
+default, Redis when REDIS_URL is set.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+
+DEFAULT_TIMEOUT = 300
+# How long a recompute may hold the cross-process lock
+LOCK_TIMEOUT = 30
+# How long other processes wait for that recompute before doing their own
+LOCK_WAIT_SECONDS = 5
+LOCK_POLL_SECONDS = 0.05
+MAX_KEY_LENGTH = 200
+
+_MISSING = object()
+
+
+def make_key(namespace, *parts):
+    """``namespace:part:...``, hashing the parts when the key gets too long"""
+    key = ':'.join([namespace, *(str(part) for part in parts)])
+    if len(key) > MAX_KEY_LENGTH:
+        digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+        key = f'{namespace}:{digest}'
+    return key
+
+
+def model_namespace(model):
+    return f'model.{model._meta.label_lower}'
+
+
+def _version_key(name):
+    return make_key('version', name)
+
+
+def _initial_version():
+    # Time-based so a counter that was evicted never restarts at a value
+    # whose keys may still be cached
+    return int(time.time() * 1000)
+
+
+def get_versions(names):
+    """Current version counter of each name"""
+    keys = {name: _version_key(name) for name in names}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for name, key in keys.items():
+        if key not in found:
+            cache.add(key, _initial_version(), None)
+            found[key] = cache.get(key)
+        versions[name] = found[key]
+    return versions
+
+
+def bump_version(name):
+    key = _version_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+
+
+def invalidate_namespace(namespace):
+    """Retire every versioned key of ``namespace``"""
+    bump_version(namespace)
+
+
+def invalidate_model(model):
+    """Retire every versioned key that depends on ``model``"""
+    bump_version(model_namespace(model))
+
+
+def invalidate_model_on_commit(model):
+    transaction.on_commit(lambda: invalidate_model(model))
+
+
+def versioned_key(namespace, *parts, models=()):
+    """Key that changes whenever ``namespace`` or one of ``models`` is invalidated"""
+    names = [namespace, *(model_namespace(model) for model in models)]
+    versions = get_versions(names)
+    stamp = '.'.join(str(versions[name]) for name in names)
+    return make_key(namespace, stamp, *parts)
+
+
+class _KeyLocks:
+    """Per-key threading locks, dropped again once nobody holds them"""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    @contextmanager
+    def hold(self, key):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+_key_locks = _KeyLocks()
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT):
+    """
+    Cached value of ``key``, calling ``compute()`` at most once per miss.
+
+    Threads of this process queue on a local lock; other processes see a
+    lock key in the cache and poll for the winner's result for up to
+    LOCK_WAIT_SECONDS before computing it themselves.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    with _key_locks.hold(key):
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        lock_key = make_key('lock', key)
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, LOCK_TIMEOUT):
+            try:
+                value = compute()
+                cache.set(key, value, timeout)
+            finally:
+                if cache.get(lock_key) == token:
+                    cache.delete(lock_key)
+            return value
+
+        deadline = time.monotonic() + LOCK_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        return compute()
+
+
+def cached(namespace, models=(), timeout=DEFAULT_TIMEOUT):
+    """
+    Cache a function's result per positional arguments.
+
+    The entry is retired when any of ``models`` is invalidated or when the
+    wrapped function's ``invalidate()`` is called.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            key = versioned_key(namespace, *args, models=models)
+            return get_or_compute(key, lambda: func(*args), timeout)
+        wrapper.invalidate = lambda: invalidate_namespace(namespace)
+        return wrapper
+    return decorator
@@ -0,0 +1,103 @@
+"""
+Conditional GET (ETag / Last-Modified) for list endpoints.
+
+Bounded lists (a user's meetings or onboarding steps) derive their version
+from one aggregate query over the same queryset the list would serialize:
+row count plus the newest value of each version field. When the client's
+validator still matches, the view answers 304 without fetching or
+serializing any rows.
+
+Paginated lists never aggregate the whole queryset, which would bring back
+the scan the pagination avoids. Their ETag hashes the ids and versions of
+the rows on the page actually served, so a 304 costs the page query but
+skips serialization.
+
+A newest-timestamp Last-Modified cannot tell that a row was deleted, so
+If-Modified-Since is only honoured when the request carries no
+If-None-Match, and paginated lists send no Last-Modified at all.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalListMixin:
+    """
+    Add ETag/Last-Modified validators to a viewset's list action.
+
+    ``version_fields`` name the columns that between them move whenever
+    a row's serialized form changes, e.g. updated_at for edits plus
+    counters_updated_at for the denormalized counts (see core.counters).
+    The newest of them supplies Last-Modified. Only use it on bounded or
+    paginated lists.
+    """
+    version_fields = ('updated_at',)
+
+    def get_list_version(self, queryset):
+        """Return (count, newest value of each version field) for the queryset in one query"""
+        version = queryset.order_by().aggregate(
+            rows=Count('pk', distinct=True),
+            **{f'newest_{field}': Max(field) for field in self.version_fields}
+        )
+        return version.pop('rows'), tuple(version[f'newest_{field}'] for field in self.version_fields)
+
+    def get_page_version(self, page):
+        """The served page's (pk, versions) rows plus whether another page follows"""
+        rows = [(row.pk, *(getattr(row, field) for field in self.version_fields)) for row in page]
+        return rows, self.paginator.get_next_link()
+
+    def get_list_etag(self, request, version):
+        # Querysets are per user and per query string, so both are part of the key
+        raw = f'{request.user.pk}:{request.get_full_path()}:{version}'
+        return quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return self._conditional_page(request)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows, newest = self.get_list_version(queryset)
+        etag = self.get_list_etag(request, (rows, newest))
+        newest = max((value for value in newest if value is not None), default=None)
+        last_modified = newest.timestamp() if hasattr(newest, 'timestamp') else None
+
+        if self._not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return self._with_validator(response, etag)
+
+    def _conditional_page(self, request):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        etag = self.get_list_etag(request, self.get_page_version(page))
+        if self._not_modified(request, etag, None):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return self._with_validator(response, etag)
+
+    @staticmethod
+    def _with_validator(response, etag):
+        response['ETag'] = etag
+        # Allow caching but force revalidation on every poll
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @staticmethod
+    def _not_modified(request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags
+        # Only without an ETag: a timestamp misses rows deleted since
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return (
+            if_modified_since is not None
+            and last_modified is not None
+            and int(last_modified) <= if_modified_since
+        )
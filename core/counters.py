@@ -0,0 +1,70 @@
+"""
+Denormalized counters on Community, Post and Meeting.
+
+Counts are stored on the row so list pages and serializers can read them
+without a COUNT query per object. Writes go through F() expressions or a
+correlated subquery so concurrent updates never lose increments.
+
+Counter writes move counters_updated_at, never updated_at: a new member or
+comment is not an edit of the community or post.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Now
+
+from core.models import Community, Meeting, Post, PostComment
+
+
+def _count_subquery(model, fk_name):
+    """Correlated COUNT(*) of ``model`` rows pointing at the outer row"""
+    counts = (
+        model.objects.filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def bump(model, pk, field, delta):
+    """Atomically add ``delta`` to a counter column, never going below zero"""
+    model.objects.filter(pk=pk).update(
+        counters_updated_at=Now(), **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+def sync_members_count(community_ids):
+    """Recompute members_count for the given communities from the M2M table"""
+    through = Community.members.through
+    Community.objects.filter(pk__in=community_ids).update(
+        members_count=_count_subquery(through, 'community_id'),
+        counters_updated_at=Now(),
+    )
+
+
+def sync_attendees_count(meeting_ids):
+    """Recompute attendees_count for the given meetings from the M2M table"""
+    through = Meeting.attendees.through
+    Meeting.objects.filter(pk__in=meeting_ids).update(
+        attendees_count=_count_subquery(through, 'meeting_id'),
+        counters_updated_at=Now(),
+    )
+
+
+def recount_all():
+    """Rebuild every stored counter from scratch; returns rows touched per model"""
+    return {
+        'communities': Community.objects.update(
+            members_count=_count_subquery(Community.members.through, 'community_id'),
+            posts_count=_count_subquery(Post, 'community_id'),
+            counters_updated_at=Now(),
+        ),
+        'posts': Post.objects.update(
+            comments_count=_count_subquery(PostComment, 'post_id'),
+            counters_updated_at=Now(),
+        ),
+        'meetings': Meeting.objects.update(
+            attendees_count=_count_subquery(Meeting.attendees.through, 'meeting_id'),
+            counters_updated_at=Now(),
+        ),
+    }
@@ -0,0 +1,127 @@
+"""
+Per-user dashboard snapshot.
+
+The dashboard's counters are computed in a single query of scalar
+subqueries (conditional aggregation for the unread total), the user's
+communities in a second one, and the precomputed recommendations in one
+each. The result is cached per user and dropped by the signal handlers of
+the writes that change it; batch jobs retire every snapshot at once through
+the namespace version (see core.cache). Hits and misses are counted in the
+cache for cache_stats().
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Case, F, IntegerField, Q, Subquery, When
+
+from core.cache import get_or_compute, invalidate_namespace, make_key, versioned_key
+from core.models import Community, Meeting
+
+DASHBOARD_CACHE_SECONDS = 300
+MENTOR_SUGGESTIONS = 3
+COMMUNITY_SUGGESTIONS = 3
+
+NAMESPACE = 'dashboard'
+HITS_KEY = make_key(NAMESPACE, 'hits')
+MISSES_KEY = make_key(NAMESPACE, 'misses')
+
+
+class SubqueryCount(Subquery):
+    """COUNT(*) of a subquery's rows, without a GROUP BY"""
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = IntegerField()
+
+
+class SubquerySum(Subquery):
+    """SUM of a subquery's single column, 0 when it has no rows"""
+    template = '(SELECT COALESCE(SUM(_sum.value), 0) FROM (%(subquery)s) _sum)'
+    output_field = IntegerField()
+
+
+def _snapshot_key(user_id):
+    # Every dashboard shows the mentor count, so mentor writes retire them all
+    from mentorship.models import MentorProfile
+    return versioned_key(NAMESPACE, user_id, models=[MentorProfile])
+
+
+def _count_event(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+class DashboardSnapshot:
+    def __init__(self, stats, communities, recommended_mentors, suggested_communities):
+        self.stats = stats
+        self.communities = communities
+        self.recommended_mentors = recommended_mentors
+        self.suggested_communities = suggested_communities
+
+    @classmethod
+    def for_user(cls, user):
+        """Cached snapshot for ``user``, computed on a miss"""
+        missed = []
+
+        def compute():
+            missed.append(True)
+            return cls.compute(user)
+
+        snapshot = get_or_compute(_snapshot_key(user.pk), compute, DASHBOARD_CACHE_SECONDS)
+        _count_event(MISSES_KEY if missed else HITS_KEY)
+        return snapshot
+
+    @classmethod
+    def compute(cls, user):
+        from chat.models import Conversation
+        from core.recommendations import recommended_communities
+        from mentorship.models import MentorProfile, MentorRecommendation
+
+        through = Community.members.through
+        unread = Conversation.objects.filter(
+            Q(user_low=user) | Q(user_high=user)
+        ).order_by().values(value=Case(
+            When(user_low=user, then=F('low_unread_count')),
+            default=F('high_unread_count'),
+            output_field=IntegerField(),
+        ))
+        stats = User.objects.filter(pk=user.pk).values(
+            mentors_count=SubqueryCount(MentorProfile.objects.values('pk')),
+            communities_count=SubqueryCount(through.objects.filter(user_id=user.pk).values('pk')),
+            messages_count=SubquerySum(unread),
+            meetings_count=SubqueryCount(
+                Meeting.objects.filter(
+                    Q(mentor=user) | Q(attendees=user), status='scheduled'
+                ).values('pk').distinct()
+            ),
+        ).get()
+
+        communities = list(Community.objects.filter(members=user).order_by('-created_at'))
+        recommended_mentors = list(
+            MentorRecommendation.objects.filter(student=user)
+            .select_related('mentor__user').order_by('rank')[:MENTOR_SUGGESTIONS]
+        )
+        suggested_communities = list(recommended_communities(user, COMMUNITY_SUGGESTIONS))
+        return cls(stats, communities, recommended_mentors, suggested_communities)
+
+    @staticmethod
+    def invalidate(*user_ids):
+        """Drop the cached snapshots of the given users"""
+        cache.delete_many([_snapshot_key(user_id) for user_id in set(user_ids)])
+
+    @staticmethod
+    def invalidate_all():
+        """Retire every snapshot at once"""
+        invalidate_namespace(NAMESPACE)
+
+    @staticmethod
+    def cache_stats():
+        """Hit/miss counters since the cache was last cleared"""
+        hits = cache.get(HITS_KEY, 0)
+        misses = cache.get(MISSES_KEY, 0)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,130 @@
+"""
+Resized WebP variants of uploaded images.
+
+Uploads are stored as-is; once the saving transaction commits, a
+background task (core.tasks) decodes each new upload and writes WebP
+copies at the VARIANT_WIDTHS that fit it. Variants are named by the SHA-256 of the
+source file, so re-uploading the same photo reuses the existing files.
+The result is recorded on the object's ``image_variants``:
+
+    {"source": <upload name>, "hash": <sha256>,
+     "variants": {"160": <storage name>, "320": ..., ...}}
+
+and the responsive_image template tag (core.templatetags.images) turns it
+into an ``<img srcset>``. Until the variants exist, or when an upload
+cannot be decoded, pages fall back to the original file. ``manage.py
+gc_media`` removes the variants of hashes no object refers to any more.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from core.tasks import enqueue, task
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (160, 320, 640, 1280)
+WEBP_QUALITY = 80
+VARIANT_ROOT = 'image_variants'
+HASH_CHUNK_SIZE = 64 * 1024
+EXIF_ORIENTATION = 0x0112
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+# Model label -> name of its uploaded image field
+IMAGE_FIELDS = {
+    'core.community': 'image',
+    'core.post': 'image',
+    'accounts.studentprofile': 'profile_picture',
+}
+
+
+def content_hash(file):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variant_name(digest, width):
+    return f'{VARIANT_ROOT}/{digest[:2]}/{digest}/{width}.webp'
+
+
+def target_widths(source_width):
+    """VARIANT_WIDTHS capped at the source width, so nothing is upscaled"""
+    return sorted({min(width, source_width) for width in VARIANT_WIDTHS})
+
+
+def _decode(file, largest):
+    image = Image.open(file)
+    width, height = image.size
+    if image.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+        width, height = height, width
+    # JPEG can decode at a reduced scale, much faster than full resolution
+    image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image, width
+
+
+def build_variants(fieldfile):
+    """Write the WebP variants of an uploaded file; returns the image_variants map"""
+    with fieldfile.open('rb') as file:
+        digest = content_hash(file)
+        file.seek(0)
+        image, source_width = _decode(file, max(VARIANT_WIDTHS))
+
+        variants = {}
+        for width in target_widths(source_width):
+            name = variant_name(digest, width)
+            if not default_storage.exists(name):
+                resized = image.copy()
+                resized.thumbnail((width, resized.height), Image.Resampling.LANCZOS)
+                buffer = BytesIO()
+                resized.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+                name = default_storage.save(name, ContentFile(buffer.getvalue()))
+            variants[str(width)] = name
+    return {'source': fieldfile.name, 'hash': digest, 'variants': variants}
+
+
+@task()
+def process_image(label, pk):
+    """Bring the image_variants of one object up to date with its upload"""
+    model = apps.get_model(label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    fieldfile = getattr(instance, IMAGE_FIELDS[label])
+    if not fieldfile:
+        info = {}
+    else:
+        try:
+            info = build_variants(fieldfile)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            logger.warning('Could not build image variants for %s %s', label, pk, exc_info=True)
+            # Remember the source so it is not retried until it changes
+            info = {'source': fieldfile.name}
+    if instance.image_variants == info:
+        return
+    instance.image_variants = info
+    # updated_at versions the cached cards that show the image
+    instance.save(update_fields=['image_variants', 'updated_at'])
+
+
+def needs_processing(instance):
+    fieldfile = getattr(instance, IMAGE_FIELDS[instance._meta.label_lower])
+    source = fieldfile.name if fieldfile else None
+    return source != (instance.image_variants.get('source') or None)
+
+
+def schedule_variants(instance):
+    """Queue variant generation for ``instance`` once the current transaction commits"""
+    enqueue(process_image, instance._meta.label_lower, instance.pk)
@@ -0,0 +1,175 @@
+"""
+Per-request query count and latency instrumentation.
+
+RequestMetricsMiddleware records, for every request, the resolved view,
+the number of SQL queries and the time spent running them, the time spent
+serializing (in DRF views using SerializerTimingMixin), the total time and
+the response size. Records go into an in-memory ring buffer (the last
+REQUEST_METRICS_BUFFER_SIZE requests of this process) that report()
+aggregates into per-view percentiles. With
+REQUEST_METRICS_SERVER_TIMING enabled each response also carries a
+Server-Timing header that browser dev tools display next to the request.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+DEFAULT_BUFFER_SIZE = 5000
+PERCENTILES = (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))
+MEASURES = ('duration_ms', 'queries', 'sql_ms', 'serializer_ms', 'response_bytes')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list, None when empty"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(values):
+    """p50/p95/p99/max of ``values``"""
+    values = sorted(value for value in values if value is not None)
+    summary = {name: percentile(values, fraction) for name, fraction in PERCENTILES}
+    summary['max'] = values[-1] if values else None
+    return summary
+
+
+class RequestLog:
+    """Thread-safe ring buffer of the most recent request records"""
+
+    def __init__(self, size):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=size)
+
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+request_log = RequestLog(getattr(settings, 'REQUEST_METRICS_BUFFER_SIZE', DEFAULT_BUFFER_SIZE))
+
+
+def report(view=None):
+    """Per-view request counts and percentiles of every recorded measure"""
+    by_view = {}
+    for record in request_log.records():
+        if view is None or record['view'] == view:
+            by_view.setdefault(record['view'], []).append(record)
+    views = {}
+    for name, records in by_view.items():
+        views[name] = {'requests': len(records)}
+        for measure in MEASURES:
+            views[name][measure] = summarize(record[measure] for record in records)
+    # Slowest first
+    ordered = sorted(views.items(), key=lambda item: item[1]['duration_ms']['p95'] or 0, reverse=True)
+    return {'requests': sum(len(records) for records in by_view.values()), 'views': dict(ordered)}
+
+
+class SerializerTimingMixin:
+    """
+    Record a DRF view's serializer time into the current request's record.
+
+    The span runs from the end of initial() (authentication, permission
+    checks) to finalize_response(), i.e. the handler building and
+    serializing its response, less the SQL run inside it: queries fired by
+    lazy querysets during to_representation() already count towards
+    sql_ms, so the two figures do not overlap. Views without the mixin
+    record no serializer time.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        metrics = _current.get()
+        if metrics is not None:
+            self._serializer_timing = (time.perf_counter(), metrics['sql_ms'])
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        metrics = _current.get()
+        timing = getattr(self, '_serializer_timing', None)
+        if metrics is not None and timing is not None:
+            started, sql_ms = timing
+            elapsed = (time.perf_counter() - started) * 1000 - (metrics['sql_ms'] - sql_ms)
+            metrics['serializer_ms'] = (metrics['serializer_ms'] or 0.0) + max(elapsed, 0.0)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+def _response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+def _server_timing(record):
+    timings = [f'db;dur={record["sql_ms"]:.1f};desc="{record["queries"]} queries"']
+    if record['serializer_ms'] is not None:
+        timings.append(f'ser;dur={record["serializer_ms"]:.1f};desc="serializers"')
+    timings.append(f'total;dur={record["duration_ms"]:.1f}')
+    return ', '.join(timings)
+
+
+class RequestMetricsMiddleware:
+    """Record query count, SQL time, serializer time and size of each request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', False)
+
+    def __call__(self, request):
+        metrics = {'queries': 0, 'sql_ms': 0.0, 'serializer_ms': None}
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                metrics['queries'] += 1
+                metrics['sql_ms'] += (time.perf_counter() - started) * 1000
+
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(count_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        record = {
+            'view': _view_name(request),
+            'method': request.method,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'queries': metrics['queries'],
+            'sql_ms': round(metrics['sql_ms'], 2),
+            'serializer_ms': None if metrics['serializer_ms'] is None else round(metrics['serializer_ms'], 2),
+            'response_bytes': _response_size(response),
+        }
+        request_log.add(record)
+        if self.server_timing:
+            response['Server-Timing'] = _server_timing(record)
+        return response
@@ -0,0 +1,123 @@
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.benchmarks import Scale, run_journeys, scratch_database, seed
+from core.instrumentation import report, request_log, summarize
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def _change(before, after):
+    if not before or after is None:
+        return 'n/a'
+    return f'{(after - before) / before:+.1%}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a scratch database and drive the login, dashboard, community, post and chat '
+        'journeys; report throughput and per-endpoint latency percentiles as JSON'
+    )
+
+    def add_arguments(self, parser):
+        defaults = Scale()
+        parser.add_argument('--users', type=int, default=defaults.users)
+        parser.add_argument('--communities', type=int, default=defaults.communities)
+        parser.add_argument('--posts', type=int, default=defaults.posts, help='Posts per community')
+        parser.add_argument('--comments', type=int, default=defaults.comments, help='Comments per post')
+        parser.add_argument('--messages', type=int, default=defaults.messages)
+        parser.add_argument('--meetings', type=int, default=defaults.meetings)
+        parser.add_argument('--clients', type=int, default=4, help='Concurrent simulated users')
+        parser.add_argument('--journeys', type=int, default=10, help='Recorded journeys per client')
+        parser.add_argument('--warmup', type=int, default=1, help='Unrecorded journeys per client')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for data and journeys')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+        parser.add_argument('--compare', help='Earlier JSON report to compare against (printed to stderr)')
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false', dest='interactive',
+            help='Drop a leftover scratch database from an earlier run without asking',
+        )
+
+    def handle(self, *args, **options):
+        scale = Scale(
+            users=options['users'], communities=options['communities'], posts=options['posts'],
+            comments=options['comments'], messages=options['messages'], meetings=options['meetings'],
+        )
+        if scale.users < 2 or scale.communities < 1:
+            raise CommandError('The journeys need at least 2 users and 1 community')
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+
+        # Production-like: no per-query logging in connection.queries
+        with override_settings(DEBUG=False), scratch_database(interactive=options['interactive']):
+            data = seed(scale, options['seed'])
+            request_log.clear()
+            latencies, errors, elapsed = run_journeys(
+                data, options['clients'], options['journeys'], options['warmup'], options['seed'],
+            )
+            server = report()['views']
+            vendor = connection.vendor
+
+        requests = sum(len(values) for values in latencies.values())
+        result = {
+            'commit': _git_commit(),
+            'database': vendor,
+            'scale': scale.as_dict(),
+            'clients': options['clients'],
+            'journeys': options['journeys'],
+            'seconds': round(elapsed, 3),
+            'requests': requests,
+            'errors': sum(errors.values()),
+            'requests_per_second': round(requests / elapsed, 1) if elapsed else None,
+            'endpoints': {},
+        }
+        for endpoint, values in latencies.items():
+            latency = summarize(value * 1000 for value in values)
+            result['endpoints'][endpoint] = {
+                'requests': len(values),
+                'errors': errors.get(endpoint, 0),
+                'latency_ms': {name: round(value, 2) for name, value in latency.items()},
+                # Server-side measures from core.instrumentation (include warmup)
+                'queries': server.get(endpoint, {}).get('queries'),
+                'sql_ms': server.get(endpoint, {}).get('sql_ms'),
+            }
+
+        output = json.dumps(result, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        if baseline:
+            self.write_comparison(baseline, result)
+
+    def write_comparison(self, baseline, result):
+        self.stderr.write(
+            f'Compared with {baseline.get("commit") or "baseline"}: '
+            f'{baseline["requests_per_second"]} -> {result["requests_per_second"]} req/s '
+            f'({_change(baseline["requests_per_second"], result["requests_per_second"])})'
+        )
+        for endpoint, current in result['endpoints'].items():
+            before = baseline['endpoints'].get(endpoint)
+            if before is None:
+                continue
+            parts = []
+            for name in ('p50', 'p95'):
+                old, new = before['latency_ms'][name], current['latency_ms'][name]
+                parts.append(f'{name} {old} -> {new} ms ({_change(old, new)})')
+            self.stderr.write(f'  {endpoint:<18} ' + ', '.join(parts))
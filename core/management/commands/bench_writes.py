@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from chat.models import DirectMessage
+from core.benchmarks import scratch_database
+from core.instrumentation import percentile
+from core.models import Community, Post, PostComment
+from core.votes import DOWN, UP, cast_vote
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure concurrent write throughput (messages, votes, comments) on a scratch copy '
+        'of the configured database; run once per DATABASE_URL profile to compare'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers')
+        parser.add_argument('--writes', type=int, default=200, help='Writes per writer')
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false', dest='interactive',
+            help='Drop a leftover scratch database from an earlier run without asking',
+        )
+
+    def handle(self, *args, **options):
+        threads, writes = options['threads'], options['writes']
+        with scratch_database(interactive=options['interactive']):
+            writers, peer, post = self.seed(threads)
+            result = self.run(writers, peer, post, writes)
+        self.stdout.write(json.dumps(result, indent=2))
+
+    def seed(self, threads):
+        User.objects.bulk_create([User(username=f'bench-writer-{i}') for i in range(threads + 1)])
+        users = list(User.objects.filter(username__startswith='bench-writer-').order_by('id'))
+        peer, writers = users[0], users[1:]
+        community = Community.objects.create(
+            name='Write benchmark', description='Scratch data', category='other', creator=peer
+        )
+        community.members.add(*users)
+        post = Post.objects.create(community=community, author=peer, title='Benchmark', content='Scratch post')
+        return writers, peer, post
+
+    def run(self, writers, peer, post, writes):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        start_line = threading.Barrier(len(writers) + 1)
+
+        def write(user, i):
+            # Rotate through the hot write paths, each in its own transaction
+            kind = i % 3
+            if kind == 0:
+                DirectMessage.objects.create(sender=user, receiver=peer, content=f'Benchmark message {i}')
+            elif kind == 1:
+                cast_vote(user, post, UP if i % 2 else DOWN)
+            else:
+                PostComment.objects.create(post=post, author=user, content=f'Benchmark comment {i}')
+
+        def writer(user):
+            local_latencies, local_errors = [], []
+            start_line.wait()
+            try:
+                for i in range(writes):
+                    began = time.perf_counter()
+                    try:
+                        write(user, i)
+                    except DatabaseError as exc:
+                        local_errors.append(str(exc))
+                        continue
+                    local_latencies.append(time.perf_counter() - began)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(local_latencies)
+                errors.extend(local_errors)
+
+        workers = [threading.Thread(target=writer, args=(user,)) for user in writers]
+        for worker in workers:
+            worker.start()
+        start_line.wait()
+        began = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - began
+
+        latencies.sort()
+        return {
+            'vendor': connection.vendor,
+            'threads': len(writers),
+            'writes': len(latencies),
+            'errors': len(errors),
+            'first_error': errors[0] if errors else None,
+            'seconds': round(elapsed, 3),
+            'writes_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+            'latency_ms': {
+                name: round(percentile(latencies, fraction) * 1000, 2) if latencies else None
+                for name, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+            },
+        }
@@ -0,0 +1,87 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from chat.models import Conversation, DirectMessage
+from chat.pagination import HISTORY_PAGE_SIZE, thread_between
+from core.models import Community, CommunityRecommendation, Meeting, Post, PostComment
+from mentorship.models import MentorProfile, MentorRecommendation
+
+# Plan lines that read a whole table rather than seeking an index
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (?!CONSTANT ROW)(\w+)(?!.*\bUSING\b)'),
+    'postgresql': re.compile(r'\bSeq Scan on (\w+)'),
+}
+SORT_PATTERNS = {
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+    'postgresql': re.compile(r'\bSort\b'),
+}
+
+
+def _sample(model, offset=0):
+    """An existing row to bind the query parameters to, or a placeholder"""
+    return model.objects.order_by('pk')[offset:offset + 1].first() or model(pk=0)
+
+
+def hot_queries():
+    """(name, queryset) for the queries behind the busiest pages"""
+    user = _sample(User)
+    other = _sample(User, 1)
+    community = _sample(Community)
+    post = _sample(Post)
+    field_key = MentorProfile.objects.values_list('field_key', flat=True).first() or ''
+    return [
+        ('community directory', Community.objects.order_by('-created_at', 'id')[:24]),
+        ('my communities', Community.objects.filter(members=user).order_by('-created_at')),
+        ('community feed', Post.objects.filter(community=community).order_by('-created_at', 'id')[:20]),
+        ('post comments', PostComment.objects.filter(post=post).order_by('created_at', 'id')[:50]),
+        ('message thread', thread_between(user, other).order_by('-created_at', '-id')[:HISTORY_PAGE_SIZE]),
+        ('message inbox', DirectMessage.objects.filter(
+            Q(sender=user) | Q(receiver=user)
+        ).order_by('-created_at')[:HISTORY_PAGE_SIZE]),
+        ('conversation list', Conversation.objects.filter(user_low=user).order_by('-last_message_at')),
+        ('hosted meetings', Meeting.objects.filter(mentor=user, status='scheduled').order_by('scheduled_time')),
+        ('community meetings', Meeting.objects.filter(community=community).order_by('-scheduled_time')),
+        ('mentor directory', MentorProfile.objects.filter(field_key=field_key).order_by('id')[:24]),
+        ('mentor recommendations', MentorRecommendation.objects.filter(student=user).order_by('rank')[:3]),
+        ('community recommendations', CommunityRecommendation.objects.filter(user=user).order_by('rank')[:3]),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the hot query paths and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan', action='store_true',
+            help='Exit with an error when any hot query does a full table scan',
+        )
+
+    def handle(self, *args, **options):
+        scan_pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        sort_pattern = SORT_PATTERNS.get(connection.vendor)
+        if scan_pattern is None:
+            self.stdout.write(self.style.WARNING(
+                f'No scan detection for {connection.vendor}; printing plans only'
+            ))
+
+        scanning = []
+        for name, queryset in hot_queries():
+            plan = queryset.explain()
+            scans = sorted(set(scan_pattern.findall(plan))) if scan_pattern else []
+            if scans:
+                scanning.append(name)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {name}: {", ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok         {name}'))
+            if sort_pattern and sort_pattern.search(plan):
+                self.stdout.write(self.style.WARNING('           sorts its rows instead of reading them in index order'))
+            if options['verbosity'] > 1 or scans or scan_pattern is None:
+                for line in plan.splitlines():
+                    self.stdout.write(f'           {line}')
+
+        if scanning and options['fail_on_scan']:
+            raise CommandError(f'{len(scanning)} hot queries do full table scans')
@@ -0,0 +1,114 @@
+import os
+import shutil
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+from core.images import IMAGE_FIELDS, VARIANT_ROOT
+from core.models import MediaBlob
+from core.storage import BLOB_ROOT, ContentAddressedStorage, upload_storage
+
+
+def content_addressed_fields():
+    """(model, field) for every file field stored in a ContentAddressedStorage"""
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage):
+                yield model, field
+
+
+class Command(BaseCommand):
+    help = 'Recount media blob references and delete the blobs and image variants nothing refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='Keep unreferenced blobs touched more recently than this (uploads in flight)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report without deleting anything')
+
+    def handle(self, *args, **options):
+        storage = upload_storage()
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        dry_run = options['dry_run']
+
+        references = Counter()
+        for model, field in content_addressed_fields():
+            names = model.objects.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+            references.update(names.values_list(field.name, flat=True).iterator(chunk_size=2000))
+
+        recounted = 0
+        for blob in MediaBlob.objects.iterator(chunk_size=2000):
+            actual = references.get(blob.name, 0)
+            if blob.ref_count != actual:
+                recounted += 1
+                if not dry_run:
+                    MediaBlob.objects.filter(pk=blob.pk).update(ref_count=actual)
+
+        removed = freed = 0
+        for blob in MediaBlob.objects.filter(ref_count=0, referenced_at__lt=cutoff).iterator(chunk_size=2000):
+            if references.get(blob.name):
+                continue
+            removed += 1
+            freed += blob.size
+            # Only delete the file if no upload re-referenced the blob meanwhile
+            if not dry_run and MediaBlob.objects.filter(pk=blob.pk, ref_count=0).delete()[0]:
+                storage.remove_blob(blob.name)
+
+        orphans = self.remove_orphans(storage, cutoff, dry_run)
+        variant_sets = self.remove_unused_variants(cutoff, dry_run)
+        prefix = 'Would remove' if dry_run else 'Removed'
+        self.stdout.write(f'{recounted} blob reference counts corrected')
+        self.stdout.write(f'{prefix} {removed} unreferenced blobs ({freed} bytes) and {orphans} orphaned files')
+        self.stdout.write(f'{prefix} {variant_sets} unused image variant sets')
+        self.stdout.write(self.style.SUCCESS('Media garbage collection finished'))
+
+    def remove_orphans(self, storage, cutoff, dry_run):
+        """Blob files without a MediaBlob row, and stale temporary files, e.g. from interrupted uploads"""
+        root = storage.path(BLOB_ROOT)
+        if not os.path.isdir(root):
+            return 0
+        known = set(MediaBlob.objects.values_list('name', flat=True))
+        oldest = cutoff.timestamp()
+        count = 0
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                if name in known or os.path.getmtime(path) >= oldest:
+                    continue
+                count += 1
+                if not dry_run:
+                    os.remove(path)
+        return count
+
+    def remove_unused_variants(self, cutoff, dry_run):
+        """Variant directories (one per source hash) no image_variants refers to, e.g. of replaced uploads"""
+        root = default_storage.path(VARIANT_ROOT)
+        if not os.path.isdir(root):
+            return 0
+        used = set()
+        for label in IMAGE_FIELDS:
+            variants = apps.get_model(label).objects.exclude(image_variants={}).values_list('image_variants', flat=True)
+            used.update(info.get('hash') for info in variants.iterator(chunk_size=2000))
+        oldest = cutoff.timestamp()
+        count = 0
+        for prefix in os.listdir(root):
+            if not os.path.isdir(os.path.join(root, prefix)):
+                continue
+            for digest in os.listdir(os.path.join(root, prefix)):
+                path = os.path.join(root, prefix, digest)
+                if digest in used or not os.path.isdir(path):
+                    continue
+                # Variants written by a task that has not recorded them yet
+                if any(entry.stat().st_mtime >= oldest for entry in os.scandir(path)):
+                    continue
+                count += 1
+                if not dry_run:
+                    shutil.rmtree(path)
+        return count
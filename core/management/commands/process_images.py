@@ -0,0 +1,26 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core.images import IMAGE_FIELDS, needs_processing, process_image
+
+
+class Command(BaseCommand):
+    help = 'Build resized WebP variants for uploads that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Rebuild every upload, e.g. after changing the variant widths',
+        )
+
+    def handle(self, *args, **options):
+        for label, field_name in IMAGE_FIELDS.items():
+            model = apps.get_model(label)
+            uploads = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            processed = 0
+            for instance in uploads.iterator(chunk_size=500):
+                if options['all'] or needs_processing(instance):
+                    process_image(label, instance.pk)
+                    processed += 1
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {processed} uploads processed')
+        self.stdout.write(self.style.SUCCESS('Image variants up to date'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.recommendations import recompute_all
+
+
+class Command(BaseCommand):
+    help = 'Recompute "communities you may like" for every member'
+
+    def handle(self, *args, **options):
+        count = recompute_all()
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} community recommendations'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized member, post, comment and attendee counters'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            touched = recount_all()
+        for model, rows in touched.items():
+            self.stdout.write(f'{model}: {rows} rows recounted')
+        self.stdout.write(self.style.SUCCESS('Counters rebuilt'))
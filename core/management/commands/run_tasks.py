@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.models import Task
+from core.tasks import claim, execute_in_worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (see core.tasks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASK_QUEUE_WORKERS,
+            help='Tasks run concurrently, each on its own thread and database connection',
+        )
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once no task is due instead of polling')
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Queue the failed tasks again, with fresh attempts, before starting',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        if options['retry_failed']:
+            retried = Task.objects.filter(status='failed').update(
+                status='queued', attempts=0, last_error='', run_at=timezone.now(),
+            )
+            self.stdout.write(f'{retried} failed tasks queued again')
+
+        succeeded = failed = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tasks') as pool:
+            try:
+                while True:
+                    close_old_connections()
+                    # One batch per round, so claimed tasks wait for at most one slow batch
+                    ids = claim(workers * 2)
+                    if not ids:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll'])
+                        continue
+                    for ok in pool.map(execute_in_worker, ids):
+                        if ok:
+                            succeeded += 1
+                        else:
+                            failed += 1
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(f'{succeeded} tasks succeeded, {failed} failed')
+        self.stdout.write(self.style.SUCCESS('Task worker stopped'))
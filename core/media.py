@@ -0,0 +1,210 @@
+"""
+File serving for uploads and collected static files.
+
+Replaces django.views.static.serve, which reads whole files into memory
+and sends no caching headers. Files are streamed with FileResponse, which
+WSGI servers offering ``wsgi.file_wrapper`` (gunicorn, uWSGI) hand to
+sendfile(); behind nginx, MEDIA_ACCEL_REDIRECT passes media to the proxy
+via X-Accel-Redirect instead. Responses carry an ETag and Last-Modified
+for conditional requests and honour single byte-range requests, so video
+seeking and resumed downloads work. Content-addressed names (upload blobs,
+image variants, hashed static files) never change content and are sent
+as immutable for a year; anything else must be revalidated.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from core.images import VARIANT_ROOT
+from core.storage import BLOB_ROOT
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+# ManifestStaticFilesStorage inserts a 12 character content hash: app.3f2a1b4c5d6e.css
+HASHED_STATIC_PATTERN = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+
+CONTENT_ADDRESSED_MEDIA = (f'{BLOB_ROOT}/', f'{VARIANT_ROOT}/')
+# Precompressed static copies, best compression first
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class Unsatisfiable(ValueError):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Inclusive (start, end) of a single ``bytes=`` range, or None to send
+    the whole file (no, malformed or multiple ranges). Raises Unsatisfiable
+    when the range starts past the end of the file.
+    """
+    match = RANGE_PATTERN.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise Unsatisfiable(header)
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise Unsatisfiable(header)
+    return start, end
+
+
+class RangeFile:
+    """Read-only view of ``length`` bytes of a file starting at ``start``"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.headers.get('If-Range')
+    if value is None:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    return parse_http_date_safe(value) == int(last_modified)
+
+
+def accepted_encodings(request):
+    """Content codings the client accepts (q > 0)"""
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _precompressed(request, fullpath, encodings):
+    """(path, coding) of the first precompressed copy the client accepts, if any"""
+    if not encodings or 'Range' in request.headers:
+        return fullpath, None
+    accepted = accepted_encodings(request)
+    for coding, suffix in encodings:
+        if (coding in accepted or '*' in accepted) and os.path.isfile(fullpath + suffix):
+            return fullpath + suffix, coding
+    return fullpath, None
+
+
+def serve_file(request, path, document_root, immutable=False, accel_redirect=None, encodings=()):
+    """
+    Stream ``path`` under ``document_root`` with caching and Range support.
+
+    ``encodings``: (content coding, file suffix) pairs, best first, of
+    precompressed copies to send instead when the client accepts them.
+    """
+    try:
+        fullpath = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404('File not found')
+    try:
+        stats = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404('File not found')
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404('File not found')
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+    sendpath, coding = _precompressed(request, fullpath, encodings)
+    if coding:
+        stats = os.stat(sendpath)
+        encoding = coding
+
+    etag = f'"{stats.st_size:x}-{stats.st_mtime_ns:x}"'
+    last_modified = int(stats.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, sendpath, stats.st_size, content_type, etag, last_modified, accel_redirect, path)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    if encodings:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['Cache-Control'] = IMMUTABLE if immutable else REVALIDATE
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _file_response(request, fullpath, size, content_type, etag, last_modified, accel_redirect, path):
+    if accel_redirect:
+        # The proxy serves the bytes, ranges included
+        response = HttpResponse(content_type=content_type)
+        response.headers['X-Accel-Redirect'] = accel_redirect + quote(path)
+        return response
+
+    byte_range = None
+    if 'Range' in request.headers and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except Unsatisfiable:
+            response = HttpResponse(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(fullpath, 'rb')
+    if byte_range is None:
+        return FileResponse(file, content_type=content_type)
+    start, end = byte_range
+    response = FileResponse(RangeFile(file, start, end - start + 1), status=206, content_type=content_type)
+    response.headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response.headers['Content-Length'] = str(end - start + 1)
+    return response
+
+
+def serve_media(request, path):
+    """Uploaded files; content-addressed names are cached forever"""
+    return serve_file(
+        request, path, settings.MEDIA_ROOT,
+        immutable=path.startswith(CONTENT_ADDRESSED_MEDIA),
+        accel_redirect=getattr(settings, 'MEDIA_ACCEL_REDIRECT', None),
+    )
+
+
+def serve_static(request, path):
+    """
+    Collected static files; manifest-hashed names are cached forever and
+    precompressed copies (see core.staticfiles) sent when accepted.
+    """
+    return serve_file(
+        request, path, settings.STATIC_ROOT,
+        immutable=bool(HASHED_STATIC_PATTERN.search(path)),
+        encodings=PRECOMPRESSED_ENCODINGS,
+    )
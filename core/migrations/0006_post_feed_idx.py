@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_meeting_community'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['community', '-created_at', 'id'], name='post_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:07
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(model, fk_name):
+    counts = (
+        model.objects.filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    Community = apps.get_model('core', 'Community')
+    Post = apps.get_model('core', 'Post')
+    PostComment = apps.get_model('core', 'PostComment')
+    Meeting = apps.get_model('core', 'Meeting')
+    Community.objects.update(
+        members_count=_count(Community.members.through, 'community_id'),
+        posts_count=_count(Post, 'community_id'),
+    )
+    Post.objects.update(comments_count=_count(PostComment, 'post_id'))
+    Meeting.objects.update(attendees_count=_count(Meeting.attendees.through, 'meeting_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_post_feed_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='members_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='community',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='attendees_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_vote_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommunityRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('community', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_to', to='core.community')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='community_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'rank'],
+                'indexes': [models.Index(fields=['user', 'rank'], name='community_rec_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'community'), name='unique_community_recommendation')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_community_recommendations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='community',
+            index=models.Index(fields=['-created_at', 'id'], name='community_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['mentor', 'status', 'scheduled_time'], name='meeting_mentor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['community', 'scheduled_time'], name='meeting_community_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(fields=['post', 'created_at', 'id'], name='comment_thread_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:45
+
+import core.storage
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('referenced_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='community',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.upload_storage, upload_to='community_images/'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.upload_storage, upload_to='post_images/'),
+        ),
+    ]
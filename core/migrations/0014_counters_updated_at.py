@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_task_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='community',
+            name='counters_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='counters_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='counters_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
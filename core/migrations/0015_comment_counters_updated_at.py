@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_counters_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postcomment',
+            name='counters_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -1,6 +1,14 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+from core.storage import upload_storage
+
+VOTE_CHOICES = [
+    (1, 'Upvote'),
+    (-1, 'Downvote'),
+]
+
 class Community(models.Model):
     CATEGORY_CHOICES = [
         ('tech', 'Technology'),
@@ -16,7 +24,15 @@ class Community(models.Model):
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     members = models.ManyToManyField(User, related_name='communities')
     creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_communities')
-    image = models.ImageField(upload_to='community_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='community_images/', storage=upload_storage, blank=True, null=True)
+    # Resized WebP copies of image, written by core.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Denormalized counters, maintained by core.signals (see core.counters)
+    members_count = models.PositiveIntegerField(default=0, editable=False)
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+    # Moves with the counters above, so caches keyed on it see new counts
+    # without counter writes touching updated_at (the user-visible edit time)
+    counters_updated_at = models.DateTimeField(default=timezone.now, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -26,6 +42,10 @@ class Community(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Communities'
+        indexes = [
+            # Directory listing, newest first
+            models.Index(fields=['-created_at', 'id'], name='community_created_idx'),
+        ]
 
 
 class Post(models.Model):
@@ -33,9 +53,14 @@ class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='community_posts')
     title = models.CharField(max_length=500)
     content = models.TextField()
-    image = models.ImageField(upload_to='post_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='post_images/', storage=upload_storage, blank=True, null=True)
+    # Resized WebP copies of image, written by core.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     upvotes = models.IntegerField(default=0)
     downvotes = models.IntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # See Community.counters_updated_at
+    counters_updated_at = models.DateTimeField(default=timezone.now, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -44,6 +69,10 @@ class Post(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset feed: community posts, newest first, id tie-break
+            models.Index(fields=['community', '-created_at', 'id'], name='post_feed_idx'),
+        ]
 
 
 class PostComment(models.Model):
@@ -51,6 +80,9 @@ class PostComment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='post_comments')
     content = models.TextField()
     upvotes = models.IntegerField(default=0)
+    downvotes = models.IntegerField(default=0)
+    # See Community.counters_updated_at
+    counters_updated_at = models.DateTimeField(default=timezone.now, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -59,6 +91,42 @@ class PostComment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # A post's thread, oldest first
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_thread_idx'),
+        ]
+
+
+class PostVote(models.Model):
+    """One row per (user, post); the Post counters mirror this ledger"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='post_votes')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='votes')
+    value = models.SmallIntegerField(choices=VOTE_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.user.username} {self.get_value_display()} on {self.post_id}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_post_vote'),
+        ]
+
+
+class CommentVote(models.Model):
+    """One row per (user, comment); the PostComment counters mirror this ledger"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comment_votes')
+    comment = models.ForeignKey(PostComment, on_delete=models.CASCADE, related_name='votes')
+    value = models.SmallIntegerField(choices=VOTE_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.user.username} {self.get_value_display()} on comment {self.comment_id}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'comment'], name='unique_comment_vote'),
+        ]
 
 
 class Meeting(models.Model):
@@ -78,6 +146,9 @@ class Meeting(models.Model):
     duration_minutes = models.IntegerField(default=60)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
     zoom_link = models.URLField(blank=True, null=True)
+    attendees_count = models.PositiveIntegerField(default=0, editable=False)
+    # See Community.counters_updated_at
+    counters_updated_at = models.DateTimeField(default=timezone.now, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -86,3 +157,81 @@ class Meeting(models.Model):
     
     class Meta:
         ordering = ['-scheduled_time']
+        indexes = [
+            # A host's meetings by status (dashboard count, meetings page)
+            models.Index(fields=['mentor', 'status', 'scheduled_time'], name='meeting_mentor_idx'),
+            # A community's meeting list
+            models.Index(fields=['community', 'scheduled_time'], name='meeting_community_idx'),
+        ]
+
+
+class CommunityRecommendation(models.Model):
+    """
+    A precomputed "communities you may like" entry, written by
+    core.recommendations; ``rank`` 1 is the strongest suggestion.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='community_recommendations')
+    community = models.ForeignKey(Community, on_delete=models.CASCADE, related_name='recommended_to')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.username} -> {self.community.name} ({self.score:.3f})"
+    
+    class Meta:
+        ordering = ['user', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'community'], name='unique_community_recommendation'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'rank'], name='community_rec_user_idx'),
+        ]
+
+
+class MediaBlob(models.Model):
+    """
+    One content-addressed upload file (see core.storage). ``ref_count``
+    counts the file fields naming it; gc_media deletes blobs left at zero.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    referenced_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class Task(models.Model):
+    """
+    A queued background call (see core.tasks). Rows are written in the
+    enqueuing transaction, deleted once the task succeeds and kept as
+    ``failed`` after the last retry.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.status}, attempt {self.attempts}/{self.max_attempts})"
+    
+    class Meta:
+        indexes = [
+            # The worker's poll: due queued tasks, oldest first
+            models.Index(fields=['status', 'run_at'], name='task_due_idx'),
+        ]
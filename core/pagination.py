@@ -0,0 +1,124 @@
+"""
+Keyset (cursor) pagination for community feeds.
+
+Rows are ordered newest first on (created_at, id) and each page starts
+strictly after the last row of the previous one, so fetching page N costs
+the same index range scan as page 1 instead of an ever-growing OFFSET.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+FEED_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Members/comments nested in detail payloads and their paginated endpoints
+NESTED_PAGE_SIZE = 20
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded"""
+
+
+def encode_cursor(created_at, pk):
+    """Build an opaque cursor token pointing just after (created_at, pk)"""
+    raw = f'{created_at.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, pk) pair stored in a cursor token"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if created_at is None:
+        raise InvalidCursor(cursor)
+    return created_at, pk
+
+
+def keyset_page(queryset, cursor=None, page_size=FEED_PAGE_SIZE):
+    """
+    Return (rows, next_cursor) for one page of ``queryset``.
+
+    ``next_cursor`` is None on the last page. Raises InvalidCursor for a
+    malformed token.
+    """
+    queryset = queryset.order_by('-created_at', 'id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=pk)
+        )
+
+    # Fetch one extra row to learn whether another page exists
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].pk)
+    return rows, next_cursor
+
+
+class KeysetPagination(BasePagination):
+    """DRF paginator backed by keyset_page()"""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = FEED_PAGE_SIZE
+    max_page_size = MAX_PAGE_SIZE
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        cursor = request.query_params.get(self.cursor_query_param)
+        try:
+            rows, self.next_cursor = keyset_page(queryset, cursor, self.get_page_size(request))
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class NestedPagePagination(PageNumberPagination):
+    """Page numbers for bounded child lists such as members and comments"""
+    page_size = NESTED_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
@@ -0,0 +1,105 @@
+"""
+"Communities you may like" from the co-membership graph.
+
+Each community is a sparse binary vector over its members. Item-item
+cosine similarity, |A ∩ B| / sqrt(|A| * |B|), is computed in one pass over
+the membership table by counting co-memberships per user (the sparse
+product MᵀM), keeping only the strongest neighbours of every community.
+A user's candidates are the summed similarities of the communities they
+already belong to; the best ones are stored in CommunityRecommendation.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import combinations
+
+from django.db import transaction
+
+from .dashboard import DashboardSnapshot
+from .models import Community, CommunityRecommendation
+
+RECOMMENDATIONS_PER_USER = 10
+NEIGHBOURS_PER_COMMUNITY = 50
+# Members of very many communities say little about any pair of them and
+# cost O(n²) co-membership updates, so they are left out of the similarity
+MAX_MEMBERSHIPS_PER_USER = 200
+
+
+def load_memberships():
+    """{user_id: sorted community ids} from the Community.members table"""
+    memberships = defaultdict(list)
+    rows = Community.members.through.objects.order_by('user_id', 'community_id').values_list(
+        'user_id', 'community_id'
+    )
+    for user_id, community_id in rows.iterator(chunk_size=5000):
+        memberships[user_id].append(community_id)
+    return memberships
+
+
+def community_neighbours(memberships, k=NEIGHBOURS_PER_COMMUNITY):
+    """{community_id: [(similarity, neighbour_id)]}, strongest first"""
+    sizes = Counter()
+    co_members = defaultdict(Counter)
+    for communities in memberships.values():
+        sizes.update(communities)
+        if len(communities) > MAX_MEMBERSHIPS_PER_USER:
+            continue
+        for a, b in combinations(communities, 2):
+            co_members[a][b] += 1
+            co_members[b][a] += 1
+
+    neighbours = {}
+    for community_id, counts in co_members.items():
+        size = sizes[community_id]
+        similarities = (
+            (shared / math.sqrt(size * sizes[other]), other)
+            for other, shared in counts.items()
+        )
+        # Ties go to the older community (lower id)
+        neighbours[community_id] = heapq.nlargest(k, similarities, key=lambda item: (item[0], -item[1]))
+    return neighbours
+
+
+def recommend_for(communities, neighbours, n=RECOMMENDATIONS_PER_USER):
+    """[(community_id, score)] for a member of ``communities``, best first"""
+    joined = set(communities)
+    scores = defaultdict(float)
+    for community_id in joined:
+        for similarity, other in neighbours.get(community_id, ()):
+            if other not in joined:
+                scores[other] += similarity
+    return heapq.nlargest(n, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def recompute_all(batch_size=1000):
+    """Offline job: rebuild every user's recommendations; returns the row count"""
+    memberships = load_memberships()
+    neighbours = community_neighbours(memberships)
+    count = 0
+    with transaction.atomic():
+        CommunityRecommendation.objects.all().delete()
+        batch = []
+        for user_id, communities in memberships.items():
+            batch.extend(
+                CommunityRecommendation(user_id=user_id, community_id=community_id, score=score, rank=rank)
+                for rank, (community_id, score) in enumerate(recommend_for(communities, neighbours), start=1)
+            )
+            if len(batch) >= batch_size:
+                CommunityRecommendation.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        CommunityRecommendation.objects.bulk_create(batch)
+        count += len(batch)
+        transaction.on_commit(DashboardSnapshot.invalidate_all)
+    return count
+
+
+def recommended_communities(user, limit=RECOMMENDATIONS_PER_USER):
+    """
+    The stored suggestions for ``user`` in rank order, as one query.
+
+    Communities joined since the last run are skipped.
+    """
+    return CommunityRecommendation.objects.filter(user=user).exclude(
+        community__members=user
+    ).select_related('community__creator').order_by('rank')[:limit]
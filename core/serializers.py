@@ -1,7 +1,13 @@
 from rest_framework import serializers
-from .models import Community, Post, PostComment, Meeting
+from django.utils.text import Truncator
+from .models import Community, CommunityRecommendation, Post, PostComment, Meeting
+from .pagination import NESTED_PAGE_SIZE
+from .votes import post_votes_for
 from django.contrib.auth.models import User
 
+POST_EXCERPT_LENGTH = 280
+COMMUNITY_DESCRIPTION_PREVIEW_LENGTH = 200
+
 
 class UserMinimalSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,52 +20,93 @@ class PostCommentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = PostComment
-        fields = ['id', 'author', 'content', 'upvotes', 'created_at', 'updated_at']
+        fields = ['id', 'author', 'content', 'upvotes', 'downvotes', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostListSerializer(serializers.ModelSerializer):
+    """Feed entry: counts and a content preview, no nested comments"""
     author = UserMinimalSerializer(read_only=True)
-    comments = PostCommentSerializer(many=True, read_only=True)
-    comments_count = serializers.SerializerMethodField()
+    excerpt = serializers.SerializerMethodField()
+    my_vote = serializers.SerializerMethodField()
+    
+    def get_excerpt(self, obj):
+        return Truncator(obj.content).chars(POST_EXCERPT_LENGTH)
     
-    def get_comments_count(self, obj):
-        return obj.comments.count()
+    def get_my_vote(self, obj):
+        # Filled in bulk by the view for list pages; see core.votes.post_votes_for
+        my_votes = self.context.get('my_votes')
+        if my_votes is None:
+            request = self.context.get('request')
+            my_votes = post_votes_for(request.user, [obj]) if request else {}
+        return my_votes.get(obj.id, 0)
     
     class Meta:
         model = Post
-        fields = ['id', 'community', 'author', 'title', 'content', 'upvotes', 'downvotes', 'comments_count', 'comments', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'community', 'author', 'title', 'excerpt', 'image', 'upvotes', 'downvotes', 'my_vote', 'comments_count', 'created_at', 'updated_at']
+        read_only_fields = ['upvotes', 'downvotes', 'comments_count', 'created_at', 'updated_at']
 
 
-class CommunitySerializer(serializers.ModelSerializer):
-    members = UserMinimalSerializer(many=True, read_only=True)
-    creator = UserMinimalSerializer(read_only=True)
-    members_count = serializers.SerializerMethodField()
-    posts_count = serializers.SerializerMethodField()
+class PostDetailSerializer(PostListSerializer):
+    """Full post with the first page of comments; see PostViewSet.comments for more"""
+    comments = serializers.SerializerMethodField()
     
-    def get_members_count(self, obj):
-        return obj.members.count()
+    def get_comments(self, obj):
+        comments = obj.comments.select_related('author').order_by('created_at', 'id')[:NESTED_PAGE_SIZE]
+        return PostCommentSerializer(comments, many=True, context=self.context).data
     
-    def get_posts_count(self, obj):
-        return obj.posts.count()
+    class Meta(PostListSerializer.Meta):
+        fields = ['id', 'community', 'author', 'title', 'content', 'image', 'upvotes', 'downvotes', 'my_vote', 'comments_count', 'comments', 'created_at', 'updated_at']
+
+
+class CommunityListSerializer(serializers.ModelSerializer):
+    """Directory entry: counts, creator and a description preview"""
+    creator = UserMinimalSerializer(read_only=True)
+    description = serializers.SerializerMethodField()
+    
+    def get_description(self, obj):
+        return Truncator(obj.description).chars(COMMUNITY_DESCRIPTION_PREVIEW_LENGTH)
     
     class Meta:
         model = Community
+        fields = ['id', 'name', 'description', 'category', 'members_count', 'creator', 'image', 'posts_count', 'created_at', 'updated_at']
+        read_only_fields = ['members_count', 'posts_count', 'created_at', 'updated_at']
+
+
+class CommunityDetailSerializer(CommunityListSerializer):
+    """
+    Full community with the first page of members; see
+    CommunityViewSet.members for more. ``members`` is null for viewers who
+    are not members, as the roster is members-only.
+    """
+    description = serializers.CharField(read_only=True)
+    members = serializers.SerializerMethodField()
+    
+    def get_members(self, obj):
+        user = self.context['request'].user
+        if not obj.members.filter(id=user.id).exists():
+            return None
+        members = obj.members.order_by('id')[:NESTED_PAGE_SIZE]
+        return UserMinimalSerializer(members, many=True).data
+    
+    class Meta(CommunityListSerializer.Meta):
         fields = ['id', 'name', 'description', 'category', 'members', 'members_count', 'creator', 'image', 'posts_count', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+
+
+class CommunityRecommendationSerializer(serializers.ModelSerializer):
+    community = CommunityListSerializer(read_only=True)
+    
+    class Meta:
+        model = CommunityRecommendation
+        fields = ['community', 'score', 'rank', 'computed_at']
 
 
 class MeetingSerializer(serializers.ModelSerializer):
     mentor = UserMinimalSerializer(read_only=True)
     attendees = UserMinimalSerializer(many=True, read_only=True)
-    attendees_count = serializers.SerializerMethodField()
     community_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     
-    def get_attendees_count(self, obj):
-        return obj.attendees.count()
-    
     class Meta:
         model = Meeting
         fields = ['id', 'title', 'description', 'mentor', 'community', 'attendees', 'attendees_count', 'scheduled_time', 'duration_minutes', 'status', 'zoom_link', 'community_id', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at', 'community']
+        read_only_fields = ['attendees_count', 'created_at', 'updated_at', 'community']
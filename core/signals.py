@@ -0,0 +1,181 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import StudentProfile
+from chat.conversations import conversation_read
+from chat.models import DirectMessage
+from core.cache import invalidate_model_on_commit
+from core.counters import bump, sync_attendees_count, sync_members_count
+from core.dashboard import DashboardSnapshot
+from core.images import IMAGE_FIELDS, needs_processing, schedule_variants
+from core.models import Community, Meeting, Post, PostComment
+from core.storage import release_on_commit
+
+
+def _affected_ids(instance, reverse, pk_set, action):
+    """Ids of the side of an M2M relation that owns the counter"""
+    if not reverse:
+        return [instance.pk]
+    if action == 'post_clear':
+        return getattr(instance, '_cleared_counter_ids', [])
+    return list(pk_set or [])
+
+
+@receiver(m2m_changed, sender=Community.members.through)
+def community_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Community.members_count in step with join/leave"""
+    if action == 'pre_clear' and reverse:
+        instance._cleared_counter_ids = list(instance.communities.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        sync_members_count(_affected_ids(instance, reverse, pk_set, action))
+
+
+@receiver(m2m_changed, sender=Meeting.attendees.through)
+def meeting_attendees_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Meeting.attendees_count in step with join/leave"""
+    if action == 'pre_clear' and reverse:
+        instance._cleared_counter_ids = list(instance.attended_meetings.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        sync_attendees_count(_affected_ids(instance, reverse, pk_set, action))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Deleting a user removes their M2M rows without sending m2m_changed
+    instance._cleared_counter_ids = (
+        list(instance.communities.values_list('pk', flat=True)),
+        list(instance.attended_meetings.values_list('pk', flat=True)),
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    """Recount the communities and meetings the user was part of"""
+    community_ids, meeting_ids = getattr(instance, '_cleared_counter_ids', ([], []))
+    if community_ids:
+        sync_members_count(community_ids)
+        invalidate_model_on_commit(Community)
+    if meeting_ids:
+        sync_attendees_count(meeting_ids)
+        invalidate_model_on_commit(Meeting)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        bump(Community, instance.community_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump(Community, instance.community_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=PostComment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        bump(Post, instance.post_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=PostComment)
+def comment_deleted(sender, instance, **kwargs):
+    bump(Post, instance.post_id, 'comments_count', -1)
+
+
+def _invalidate_dashboards(user_ids):
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: DashboardSnapshot.invalidate(*user_ids))
+
+
+def _m2m_user_ids(instance, action, reverse, pk_set):
+    """Users on the User side of a join/leave"""
+    if reverse:
+        return [instance.pk]
+    if action == 'post_clear':
+        return getattr(instance, '_cleared_dashboard_ids', [])
+    return list(pk_set or [])
+
+
+@receiver(m2m_changed, sender=Community.members.through)
+@receiver(m2m_changed, sender=Meeting.attendees.through)
+def user_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Joining or leaving a community or meeting changes the user's dashboard"""
+    related = 'members' if sender is Community.members.through else 'attendees'
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_dashboard_ids = list(getattr(instance, related).values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate_dashboards(_m2m_user_ids(instance, action, reverse, pk_set))
+
+
+@receiver(post_save, sender=DirectMessage)
+@receiver(post_delete, sender=DirectMessage)
+def direct_message_changed(sender, instance, created=True, **kwargs):
+    """Sending or deleting a message moves both users' unread totals"""
+    if created:
+        _invalidate_dashboards({instance.sender_id, instance.receiver_id})
+
+
+@receiver(conversation_read)
+def conversation_marked_read(sender, user_id, **kwargs):
+    _invalidate_dashboards([user_id])
+
+
+@receiver(post_save, sender=Meeting)
+@receiver(pre_delete, sender=Meeting)
+def meeting_changed(sender, instance, **kwargs):
+    """Status changes and cancellations move the host's and attendees' meeting counts"""
+    attendee_ids = instance.attendees.values_list('pk', flat=True) if instance.pk else []
+    _invalidate_dashboards([instance.mentor_id, *attendee_ids])
+
+
+@receiver(post_save, sender=Community)
+@receiver(post_delete, sender=Community)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Meeting)
+@receiver(post_delete, sender=Meeting)
+def model_changed(sender, **kwargs):
+    """Retire cached values built on this model (see core.cache.versioned_key)"""
+    invalidate_model_on_commit(sender)
+
+
+@receiver(m2m_changed, sender=Community.members.through)
+@receiver(m2m_changed, sender=Meeting.attendees.through)
+def membership_changed(sender, action, **kwargs):
+    # Member and attendee counts are part of the cached community and meeting data
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_model_on_commit(Community if sender is Community.members.through else Meeting)
+
+
+@receiver(post_save, sender=Community)
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=StudentProfile)
+def image_saved(sender, instance, **kwargs):
+    # Resizing happens off the request, after the upload is committed
+    if needs_processing(instance):
+        schedule_variants(instance)
+
+
+@receiver(pre_save, sender=Community)
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=StudentProfile)
+def upload_replaced(sender, instance, update_fields=None, **kwargs):
+    """Release the reference to an upload the save replaces or clears"""
+    field_name = IMAGE_FIELDS[sender._meta.label_lower]
+    if instance.pk is None or (update_fields is not None and field_name not in update_fields):
+        return
+    fieldfile = getattr(instance, field_name)
+    previous = sender.objects.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+    if previous and previous != fieldfile.name:
+        release_on_commit(fieldfile.storage, previous)
+
+
+@receiver(post_delete, sender=Community)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=StudentProfile)
+def upload_deleted(sender, instance, **kwargs):
+    fieldfile = getattr(instance, IMAGE_FIELDS[sender._meta.label_lower])
+    release_on_commit(fieldfile.storage, fieldfile.name)
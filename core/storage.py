@@ -0,0 +1,102 @@
+"""
+Content-addressed, deduplicating storage for user uploads.
+
+ContentAddressedStorage names every file after the SHA-256 of its content
+(``blobs/ab/cd/<sha256>.<ext>``), so the same photo uploaded twice is kept
+on disk once. The digest is computed while the upload is streamed, chunk
+by chunk, into a temporary file next to the blob store, which is then
+moved into place (or dropped if the blob already exists).
+
+Each blob has a MediaBlob row whose ref_count counts the file fields that
+name it: saving a file adds a reference and delete() drops one instead of
+removing the file. Unreferenced blobs are removed by
+``manage.py gc_media``, which also recounts the references from the
+database the way ``recount`` rebuilds the other denormalized counters.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+BLOB_ROOT = 'blobs'
+TMP_DIR = 'tmp'
+MAX_EXTENSION_LENGTH = 10
+BLOB_PERMISSIONS = 0o644
+
+
+def blob_name(digest, extension=''):
+    return f'{BLOB_ROOT}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def _extension(name):
+    extension = os.path.splitext(name)[1].lower()
+    return extension if len(extension) <= MAX_EXTENSION_LENGTH else ''
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct content once, by hash"""
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content, see _save()
+        return name
+
+    def _save(self, name, content):
+        tmp_dir = self.path(f'{BLOB_ROOT}/{TMP_DIR}')
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            name = blob_name(digest.hexdigest(), _extension(name))
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(tmp_path, self.file_permissions_mode or BLOB_PERMISSIONS)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.add_reference(name, digest.hexdigest(), size)
+        return name
+
+    def add_reference(self, name, digest, size):
+        from core.models import MediaBlob
+        MediaBlob.objects.get_or_create(name=name, defaults={'digest': digest, 'size': size})
+        MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1, referenced_at=timezone.now())
+
+    def delete(self, name):
+        """Drop one reference; gc_media removes the file once none are left"""
+        from core.models import MediaBlob
+        MediaBlob.objects.filter(name=name, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1, referenced_at=timezone.now(),
+        )
+
+    def remove_blob(self, name):
+        """Delete the file itself (garbage collection only)"""
+        super().delete(name)
+
+
+_upload_storage = ContentAddressedStorage()
+
+
+def upload_storage():
+    """Storage of the uploaded image fields; a callable, so migrations refer to it by path"""
+    return _upload_storage
+
+
+def release_on_commit(fieldfile_storage, name):
+    """Drop the reference to a replaced or deleted upload once the change commits"""
+    if name and isinstance(fieldfile_storage, ContentAddressedStorage):
+        transaction.on_commit(lambda: fieldfile_storage.delete(name))
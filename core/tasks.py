@@ -0,0 +1,154 @@
+"""
+Database-backed background tasks.
+
+Side effects that do not have to finish before the response (image
+variants, recommendation recomputes) are registered with @task and queued
+with enqueue(). The Task row is written in the caller's transaction, so a
+task only becomes visible to workers if the change that caused it
+commits, and is never lost in between.
+
+``manage.py run_tasks`` claims due tasks and runs them on a thread pool.
+A task that raises is retried with exponential backoff until it has had
+``max_attempts`` tries, then left as ``failed`` with its traceback. A
+worker that dies mid-task leaves its claim behind; claims older than
+TASK_LEASE_SECONDS are handed out again. A task still running when its
+lease ends is therefore run a second time, so tasks must be idempotent;
+the original worker notices its claim was taken over and leaves the
+outcome to the new one.
+
+With TASK_QUEUE_INLINE (the default while DEBUG is on, and in tests) no
+row is written: the task runs in-process right after the commit, so
+development needs no separate worker.
+
+Task arguments are stored as JSON: pass ids and plain values, not model
+instances.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+
+# Task name -> function
+_registry = {}
+
+
+def task(max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Register a function as a task; it stays directly callable"""
+    def register(func):
+        func.task_name = f'{func.__module__}.{func.__qualname__}'
+        func.max_attempts = max_attempts
+        _registry[func.task_name] = func
+        return func
+    return register
+
+
+def enqueue(func, *args, delay=None):
+    """Run ``func(*args)`` in the background once the current transaction commits"""
+    if settings.TASK_QUEUE_INLINE:
+        transaction.on_commit(lambda: _run_inline(func, args))
+        return None
+    return Task.objects.create(
+        name=func.task_name, args=list(args), max_attempts=func.max_attempts,
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+
+
+def _run_inline(func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Task %s failed', func.task_name)
+
+
+def retry_delay(attempts):
+    """Backoff before the next try after ``attempts`` failed ones"""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim(limit):
+    """
+    Mark up to ``limit`` due tasks running and return their ids.
+
+    PostgreSQL workers skip rows another worker has locked; SQLite
+    serializes the claiming transactions (IMMEDIATE mode, see
+    unity_circles.database).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        expired = Task.objects.filter(
+            status='running', locked_at__lt=now - timedelta(seconds=settings.TASK_LEASE_SECONDS),
+        )
+        expired.filter(attempts__gte=F('max_attempts')).update(
+            status='failed', last_error='Worker stopped before the task finished',
+        )
+        expired.update(status='queued', run_at=now)
+
+        due = Task.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:limit])
+        Task.objects.filter(pk__in=ids).update(status='running', locked_at=now, attempts=F('attempts') + 1)
+    return ids
+
+
+def execute(pk):
+    """Run one claimed task and record the outcome; True if it succeeded"""
+    queued = Task.objects.filter(pk=pk, status='running').first()
+    if queued is None:
+        return False
+    # Matches only while this claim holds; an expired lease re-claims with a new locked_at
+    claimed = Task.objects.filter(pk=pk, status='running', locked_at=queued.locked_at)
+    func = _registry.get(queued.name)
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task {queued.name}')
+        func(*queued.args)
+    except Exception:
+        logger.warning('Task %s (%s) failed, attempt %s', queued.name, pk, queued.attempts, exc_info=True)
+        update = {'last_error': traceback.format_exc(), 'locked_at': None}
+        if func is None or queued.attempts >= queued.max_attempts:
+            update['status'] = 'failed'
+        else:
+            update.update(status='queued', run_at=timezone.now() + retry_delay(queued.attempts))
+        if not claimed.update(**update):
+            logger.warning('Task %s (%s) outlived its lease; the outcome is left to the new claim', queued.name, pk)
+        return False
+    if not claimed.delete()[0]:
+        logger.warning('Task %s (%s) outlived its lease; the outcome is left to the new claim', queued.name, pk)
+    return True
+
+
+def execute_in_worker(pk):
+    """execute() on a pool thread, which needs its own connection"""
+    close_old_connections()
+    try:
+        return execute(pk)
+    except Exception:
+        logger.exception('Task %s could not be run', pk)
+        return False
+    finally:
+        connection.close()
+
+
+def run_pending(limit=100):
+    """Claim and run due tasks in this thread until none are left; returns (succeeded, failed)"""
+    succeeded = failed = 0
+    while ids := claim(limit):
+        for pk in ids:
+            if execute(pk):
+                succeeded += 1
+            else:
+                failed += 1
+    return succeeded, failed
@@ -0,0 +1,32 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+register = template.Library()
+
+# Width of the variant used as the plain src for browsers without srcset
+DEFAULT_SRC_WIDTH = 640
+
+
+@register.simple_tag
+def responsive_image(image, variants, sizes='100vw', **attrs):
+    """
+    ``<img>`` for an uploaded image, listing its WebP variants (see
+    core.images) in srcset so the browser downloads the size it needs.
+    Falls back to the original upload until variants of the current file
+    exist, so a replaced image never shows its predecessor's variants.
+    """
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    variants = variants or {}
+    widths = sorted(int(width) for width in variants.get('variants', {}))
+    if not widths or variants.get('source') != image.name:
+        return format_html('<img src="{}"{}>', image.url, flatatt(attrs))
+
+    urls = {width: default_storage.url(variants['variants'][str(width)]) for width in widths}
+    src_width = next((width for width in widths if width >= DEFAULT_SRC_WIDTH), widths[-1])
+    srcset = ', '.join(f'{urls[width]} {width}w' for width in widths)
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}"{}>', urls[src_width], srcset, sizes, flatatt(attrs),
+    )
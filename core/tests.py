@@ -1,3 +1,989 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.template import Context, Template
+from django.templatetags.static import static
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APITestCase
+
+from chat.conversations import mark_read
+from chat.models import DirectMessage
+from core.benchmarks import Scale, journey, seed
+from core.cache import get_or_compute, versioned_key
+from core.dashboard import DashboardSnapshot
+from core.instrumentation import request_log
+from core.models import Community, MediaBlob, Meeting, Post, PostComment, PostVote, Task
+from core.pagination import NESTED_PAGE_SIZE, InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from core.serializers import COMMUNITY_DESCRIPTION_PREVIEW_LENGTH, POST_EXCERPT_LENGTH
+from core.recommendations import recommended_communities, recompute_all
+from core.tasks import claim, enqueue, execute, run_pending, task
+from core.votes import DOWN, UP, cast_vote, post_votes_for
+
+
+class KeysetPaginationTests(APITestCase):
+    POSTS = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', 'reader@example.com', 'password123')
+        cls.outsider = User.objects.create_user('outsider', 'outsider@example.com', 'password123')
+        cls.community = Community.objects.create(name='Feed', description='Posts', category='tech', creator=cls.user)
+        cls.community.members.add(cls.user)
+        other = Community.objects.create(name='Elsewhere', description='Posts', category='tech', creator=cls.outsider)
+        other.members.add(cls.outsider)
+        posts = [
+            Post.objects.create(community=cls.community, author=cls.user, title=f'Post {i}', content='Body')
+            for i in range(cls.POSTS)
+        ]
+        Post.objects.create(community=other, author=cls.outsider, title='Not mine', content='Body')
+        # Three posts share a timestamp; the id breaks the tie
+        moment = timezone.now() - timedelta(hours=1)
+        Post.objects.filter(pk__in=[post.pk for post in posts[2:5]]).update(created_at=moment)
+        cls.expected = list(
+            Post.objects.filter(community=cls.community).order_by('-created_at', 'id').values_list('pk', flat=True)
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_walk_visits_every_post_once_in_order(self):
+        feed = Post.objects.filter(community=self.community)
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(feed, cursor, page_size=2)
+            seen.extend(post.pk for post in rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.expected)
+
+    def test_cursor_round_trips(self):
+        post = Post.objects.get(pk=self.expected[3])
+        self.assertEqual(decode_cursor(encode_cursor(post.created_at, post.pk)), (post.created_at, post.pk))
+        for garbage in ('not a cursor', encode_cursor(post.created_at, post.pk)[:-4], 'eHx5'):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(garbage)
+
+    def test_post_api_pages_the_members_feed(self):
+        seen, url = [], '/api/posts/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(self.client.get('/api/posts/', {'cursor': 'garbage'}).status_code, 404)
+
+    def test_post_api_is_read_only_and_members_only(self):
+        response = self.client.get(f'/api/posts/{self.expected[0]}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['content'], 'Body')
+        self.assertEqual(self.client.post('/api/posts/', {'title': 'New'}).status_code, 405)
+
+        self.client.force_authenticate(self.outsider)
+        response = self.client.get('/api/posts/')
+        self.assertEqual([post['title'] for post in response.data['results']], ['Not mine'])
+        self.assertEqual(self.client.get(f'/api/posts/{self.expected[0]}/').status_code, 404)
+
+    def test_bad_cursor_on_the_community_page_restarts_the_feed(self):
+        self.client.force_login(self.user)
+        response = self.client.get(f'/communities/{self.community.id}/', {'cursor': 'garbage'})
+        self.assertRedirects(response, f'/communities/{self.community.id}/')
+
+
+class DenormalizedCounterTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('counter', 'counter@example.com', None)
+        self.member = User.objects.create_user('joiner', 'joiner@example.com', None)
+        self.community = Community.objects.create(name='Counted', description='Counts', category='tech', creator=self.owner)
+        self.meeting = Meeting.objects.create(
+            title='Counted', mentor=self.owner, community=self.community, scheduled_time=timezone.now(),
+        )
+
+    def counts(self):
+        self.community.refresh_from_db()
+        self.meeting.refresh_from_db()
+        return self.community.members_count, self.community.posts_count, self.meeting.attendees_count
+
+    def test_signals_track_joins_posts_and_comments(self):
+        self.community.members.add(self.owner, self.member)
+        self.meeting.attendees.add(self.member)
+        post = Post.objects.create(community=self.community, author=self.member, title='Hi', content='Body')
+        comment = PostComment.objects.create(post=post, author=self.owner, content='Welcome')
+        self.assertEqual(self.counts(), (2, 1, 1))
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.member.communities.clear()
+        self.meeting.attendees.remove(self.member)
+        self.assertEqual(self.counts(), (1, 1, 0))
+
+    def test_counter_writes_leave_the_edit_time_alone(self):
+        edited = (self.community.updated_at, self.meeting.updated_at)
+        post = Post.objects.create(community=self.community, author=self.owner, title='Hi', content='Body')
+        post.refresh_from_db()
+        post_edited, post_counted = post.updated_at, post.counters_updated_at
+        meeting_counted = self.meeting.counters_updated_at
+
+        self.community.members.add(self.member)
+        self.meeting.attendees.add(self.member)
+        PostComment.objects.create(post=post, author=self.member, content='Welcome')
+        self.counts()
+        post.refresh_from_db()
+        self.assertEqual((self.community.updated_at, self.meeting.updated_at), edited)
+        self.assertEqual(post.updated_at, post_edited)
+        self.assertGreater(post.counters_updated_at, post_counted)
+        self.assertGreater(self.meeting.counters_updated_at, meeting_counted)
+
+    def test_cached_community_card_shows_new_counts(self):
+        cache.clear()
+        self.client.force_login(self.owner)
+        self.assertContains(self.client.get('/communities/'), '0 members')
+        self.community.members.add(self.member)
+        self.assertContains(self.client.get('/communities/'), '1 members')
+
+    def test_deleting_a_user_releases_their_memberships(self):
+        self.community.members.add(self.owner, self.member)
+        self.meeting.attendees.add(self.owner, self.member)
+        Post.objects.create(community=self.community, author=self.member, title='Bye', content='Body')
+        self.member.delete()
+        self.assertEqual(self.counts(), (1, 0, 1))
+
+    def test_recount_repairs_drift(self):
+        self.community.members.add(self.owner)
+        Community.objects.update(members_count=7, posts_count=3)
+        Meeting.objects.update(attendees_count=2)
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 0, 0))
+
+
+class VoteLedgerTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('voter', 'voter@example.com', 'password123')
+        cls.other = User.objects.create_user('second', 'second@example.com', 'password123')
+        cls.community = Community.objects.create(name='Votes', description='Ledger', category='tech', creator=cls.user)
+        cls.community.members.add(cls.user)
+
+    def setUp(self):
+        self.post = Post.objects.create(community=self.community, author=self.user, title='Vote', content='Body')
+
+    def counters(self, target=None):
+        target = target or self.post
+        target.refresh_from_db(fields=['upvotes', 'downvotes'])
+        return target.upvotes, target.downvotes
+
+    def test_votes_toggle_and_switch(self):
+        self.assertEqual(cast_vote(self.user, self.post, UP), UP)
+        self.assertEqual(cast_vote(self.other, self.post, UP), UP)
+        self.assertEqual(self.counters(), (2, 0))
+        self.assertEqual(cast_vote(self.user, self.post, DOWN), DOWN)
+        self.assertEqual(self.counters(), (1, 1))
+        self.assertEqual(cast_vote(self.user, self.post, DOWN), 0)
+        self.assertEqual(self.counters(), (1, 0))
+        self.assertEqual(post_votes_for(self.user, [self.post]), {})
+
+        comment = PostComment.objects.create(post=self.post, author=self.other, content='Reply')
+        cast_vote(self.user, comment, DOWN)
+        self.assertEqual(self.counters(comment), (0, 1))
+
+    def test_votes_do_not_mark_the_post_edited(self):
+        self.post.refresh_from_db()
+        edited, counted = self.post.updated_at, self.post.counters_updated_at
+        cast_vote(self.user, self.post, UP)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated_at, edited)
+        self.assertGreater(self.post.counters_updated_at, counted)
+
+        # The feed's page validator still sees the new counts
+        self.client.force_authenticate(self.user)
+        etag = self.client.get('/api/posts/')['ETag']
+        cast_vote(self.other, self.post, UP)
+        response = self.client.get('/api/posts/', headers={'if-none-match': etag})
+        self.assertEqual((response.status_code, response.data['results'][0]['upvotes']), (200, 2))
+
+    def test_vote_withdrawn_concurrently_is_cast_again(self):
+        create = PostVote.objects.create
+        calls = []
+
+        def racing_create(**kwargs):
+            # The first insert collides with a vote that is gone by the time it is read
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise IntegrityError('unique_post_vote')
+            return create(**kwargs)
+
+        with patch.object(PostVote.objects, 'create', side_effect=racing_create):
+            self.assertEqual(cast_vote(self.user, self.post, UP), UP)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.counters(), (1, 0))
+
+    def test_vote_api_reports_the_new_state(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(f'/api/posts/{self.post.id}/vote/', {'value': -1})
+        self.assertEqual(response.data, {'my_vote': -1, 'upvotes': 0, 'downvotes': 1})
+        self.assertEqual(self.client.post(f'/api/posts/{self.post.id}/vote/', {'value': 2}).status_code, 400)
+
+    def test_vote_links_are_post_only_and_redirect_within_the_site(self):
+        self.client.force_login(self.user)
+        url = f'/posts/{self.post.id}/upvote/'
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.counters(), (0, 0))
+
+        response = self.client.post(url, {'next': f'/communities/{self.community.id}/'})
+        self.assertRedirects(response, f'/communities/{self.community.id}/', fetch_redirect_response=False)
+        self.assertEqual(self.counters(), (1, 0))
+        response = self.client.post(url, {'next': 'https://evil.example.com/'})
+        self.assertRedirects(response, f'/posts/{self.post.id}/', fetch_redirect_response=False)
+        self.assertEqual(self.counters(), (0, 0))
+
+    def test_vote_forms_require_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        self.assertEqual(client.post(f'/posts/{self.post.id}/downvote/').status_code, 403)
+        self.assertEqual(self.counters(), (0, 0))
+
+
+class ConditionalListTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('poller', 'poller@example.com', None)
+        cls.community = Community.objects.create(name='Polled', description='Lists', category='tech', creator=cls.user)
+        cls.meeting = Meeting.objects.create(
+            title='Standup', mentor=cls.user, community=cls.community, scheduled_time=timezone.now(),
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_matching_validator_gets_304_without_fetching_rows(self):
+        response = self.client.get('/api/meetings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get('/api/meetings/', headers={'if-none-match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        # Only the version aggregate
+        self.assertEqual(len(queries), 1)
+
+        cached = self.client.get('/api/meetings/', headers={'if-modified-since': response['Last-Modified']})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_writes_change_the_validator(self):
+        etag = self.client.get('/api/meetings/')['ETag']
+        Meeting.objects.filter(pk=self.meeting.pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+        response = self.client.get('/api/meetings/', headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        Meeting.objects.create(title='Retro', mentor=self.user, scheduled_time=timezone.now())
+        response = self.client.get('/api/meetings/', headers={'if-none-match': etag})
+        self.assertEqual((response.status_code, len(response.data)), (200, 2))
+
+        # Counter writes move counters_updated_at, which is part of the version
+        etag = response['ETag']
+        self.meeting.attendees.add(User.objects.create_user('attendee', 'attendee@example.com', None))
+        response = self.client.get('/api/meetings/', headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_deletions_are_caught_by_the_etag_not_the_timestamp(self):
+        Meeting.objects.create(
+            title='Old', mentor=self.user, scheduled_time=timezone.now(),
+        )
+        Meeting.objects.filter(title='Old').update(updated_at=timezone.now() - timedelta(days=1))
+        response = self.client.get('/api/meetings/')
+        Meeting.objects.filter(title='Old').delete()
+        headers = {'if-none-match': response['ETag'], 'if-modified-since': response['Last-Modified']}
+        # The newest timestamp did not move, but a sent ETag takes precedence
+        self.assertEqual(self.client.get('/api/meetings/', headers=headers).status_code, 200)
+
+    def test_validators_are_per_user(self):
+        etag = self.client.get('/api/meetings/')['ETag']
+        self.client.force_authenticate(User.objects.create_user('neighbour', 'neighbour@example.com', None))
+        self.assertEqual(self.client.get('/api/meetings/', headers={'if-none-match': etag}).status_code, 200)
+
+    def test_paginated_feed_is_validated_by_the_served_page(self):
+        self.community.members.add(self.user)
+        for i in range(3):
+            Post.objects.create(community=self.community, author=self.user, title=f'Post {i}', content='Body')
+        response = self.client.get('/api/posts/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get('/api/posts/', {'page_size': 2}, headers={'if-none-match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        # The page and the viewer's votes on it; nothing aggregates the whole feed
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+        # A newer post shifts the first page
+        Post.objects.create(community=self.community, author=self.user, title='Newest', content='Body')
+        fresh = self.client.get('/api/posts/', {'page_size': 2}, headers={'if-none-match': response['ETag']})
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.data['results'][0]['title'], 'Newest')
+
+
+class ResponseShapeTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('shaper', 'shaper@example.com', None)
+        members = [User.objects.create_user(f'shape{i}', f'shape{i}@example.com', None) for i in range(NESTED_PAGE_SIZE + 4)]
+        cls.community = Community.objects.create(
+            name='Shapes', description='x' * 500, category='tech', creator=cls.user,
+        )
+        cls.community.members.add(cls.user, *members)
+        cls.post = Post.objects.create(community=cls.community, author=cls.user, title='Shape', content='y' * 500)
+        PostComment.objects.bulk_create([
+            PostComment(post=cls.post, author=members[i], content=f'Comment {i}') for i in range(NESTED_PAGE_SIZE + 2)
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_list_entries_are_previews(self):
+        [post] = self.client.get('/api/posts/').data['results']
+        self.assertEqual(set(post), {
+            'id', 'community', 'author', 'title', 'excerpt', 'image', 'upvotes', 'downvotes', 'my_vote',
+            'comments_count', 'created_at', 'updated_at',
+        })
+        self.assertNotIn('content', post)
+        self.assertEqual(len(post['excerpt']), POST_EXCERPT_LENGTH)
+        self.assertEqual(set(post['author']), {'id', 'username', 'first_name', 'last_name'})
+
+        [community] = self.client.get('/api/communities/').data
+        self.assertEqual(set(community), {
+            'id', 'name', 'description', 'category', 'members_count', 'creator', 'image', 'posts_count',
+            'created_at', 'updated_at',
+        })
+        self.assertNotIn('members', community)
+        self.assertEqual(len(community['description']), COMMUNITY_DESCRIPTION_PREVIEW_LENGTH)
+
+    def test_details_embed_the_first_page_of_children(self):
+        post = self.client.get(f'/api/posts/{self.post.id}/').data
+        self.assertEqual(set(post), {
+            'id', 'community', 'author', 'title', 'content', 'image', 'upvotes', 'downvotes', 'my_vote',
+            'comments_count', 'comments', 'created_at', 'updated_at',
+        })
+        self.assertEqual(len(post['content']), 500)
+        self.assertEqual(len(post['comments']), NESTED_PAGE_SIZE)
+        self.assertEqual(post['comments'][0]['content'], 'Comment 0')
+
+        community = self.client.get(f'/api/communities/{self.community.id}/').data
+        self.assertEqual(set(community), {
+            'id', 'name', 'description', 'category', 'members', 'members_count', 'creator', 'image',
+            'posts_count', 'created_at', 'updated_at',
+        })
+        self.assertEqual(len(community['description']), 500)
+        self.assertEqual(len(community['members']), NESTED_PAGE_SIZE)
+        self.assertEqual(community['members_count'], NESTED_PAGE_SIZE + 5)
+
+    def test_child_endpoints_page_by_number(self):
+        response = self.client.get(f'/api/communities/{self.community.id}/members/', {'page': 2})
+        self.assertEqual(set(response.data), {'count', 'next', 'previous', 'results'})
+        self.assertEqual((response.data['count'], len(response.data['results'])), (NESTED_PAGE_SIZE + 5, 5))
+        self.assertIsNone(response.data['next'])
+
+        self.client.force_authenticate(User.objects.create_user('visitor', 'visitor@example.com', None))
+        response = self.client.get(f'/api/communities/{self.community.id}/members/')
+        self.assertEqual(response.status_code, 403)
+        community = self.client.get(f'/api/communities/{self.community.id}/').data
+        self.assertEqual((community['members'], community['members_count']), (None, NESTED_PAGE_SIZE + 5))
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(f'/api/posts/{self.post.id}/comments/', {'page_size': 5})
+        self.assertEqual([comment['content'] for comment in response.data['results']], [f'Comment {i}' for i in range(5)])
+        self.assertIn('page=2', response.data['next'])
+
+
+class MeetingQueryCountTests(APITestCase):
+    """Serializing meetings must not issue queries per meeting"""
+    MEETINGS = 100
+    ATTENDEES = 3
+    # list: version aggregate + meetings (with mentor) + attendees prefetch
+    MAX_LIST_QUERIES = 3
+    # community meetings: community + membership check + meetings + attendees prefetch
+    MAX_COMMUNITY_QUERIES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('host', 'host@example.com', 'password123')
+        attendees = [
+            User.objects.create_user(f'attendee{i}', f'attendee{i}@example.com', 'password123')
+            for i in range(cls.ATTENDEES)
+        ]
+        cls.community = Community.objects.create(
+            name='Query Budget', description='Meetings query count', category='tech', creator=cls.user
+        )
+        cls.community.members.add(cls.user)
+        start = timezone.now()
+        for i in range(cls.MEETINGS):
+            meeting = Meeting.objects.create(
+                title=f'Meeting {i}',
+                mentor=cls.user,
+                community=cls.community,
+                scheduled_time=start + timedelta(hours=i),
+            )
+            meeting.attendees.set(attendees)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_meeting_list_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/meetings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), self.MEETINGS)
+        self.assertEqual(response.data[0]['attendees_count'], self.ATTENDEES)
+        self.assertLessEqual(len(queries), self.MAX_LIST_QUERIES)
+
+    def test_community_meetings_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/communities/{self.community.id}/meetings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), self.MEETINGS)
+        self.assertLessEqual(len(queries), self.MAX_COMMUNITY_QUERIES)
+
+
+class CommunityRecommendationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            User.objects.create_user(f'member{i}', f'member{i}@example.com', 'password123')
+            for i in range(4)
+        ]
+        cls.user = users[0]
+        cls.python, cls.django, cls.rust, cls.poetry = [
+            Community.objects.create(name=name, description=name, category='tech', creator=users[0])
+            for name in ('Python', 'Django', 'Rust', 'Poetry')
+        ]
+        cls.python.members.add(users[0], users[1], users[2])
+        cls.django.members.add(users[1], users[2])
+        cls.rust.members.add(users[2])
+        cls.poetry.members.add(users[3])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_co_members_drive_recommendations(self):
+        recompute_all()
+        response = self.client.get('/api/communities/recommended/')
+        self.assertEqual(response.status_code, 200)
+        names = [entry['community']['name'] for entry in response.data]
+        # Django shares two Python members, Rust one; Poetry shares none
+        self.assertEqual(names, ['Django', 'Rust'])
+
+    def test_joined_communities_are_hidden_until_the_next_run(self):
+        recompute_all()
+        self.django.members.add(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            names = [entry.community.name for entry in recommended_communities(self.user)]
+        self.assertEqual(names, ['Rust'])
+        self.assertEqual(len(queries), 1)
+
+
+class DashboardSnapshotTests(TestCase):
+    # stats + communities + mentor and community suggestions
+    MAX_MISS_QUERIES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('dash', 'dash@example.com', 'password123')
+        cls.other = User.objects.create_user('friend', 'friend@example.com', 'password123')
+        cls.community = Community.objects.create(
+            name='Snapshots', description='Dashboard cache', category='tech', creator=cls.other
+        )
+        Meeting.objects.create(
+            title='Sync', mentor=cls.other, community=cls.community,
+            scheduled_time=timezone.now() + timedelta(days=1),
+        ).attendees.add(cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_snapshot_is_cached_after_the_first_load(self):
+        with CaptureQueriesContext(connection) as queries:
+            snapshot = DashboardSnapshot.for_user(self.user)
+        self.assertLessEqual(len(queries), self.MAX_MISS_QUERIES)
+        self.assertEqual(snapshot.stats['meetings_count'], 1)
+        with CaptureQueriesContext(connection) as queries:
+            DashboardSnapshot.for_user(self.user)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(DashboardSnapshot.cache_stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_writes_invalidate_the_snapshot(self):
+        self.assertEqual(self.client.get('/dashboard/').context['stats']['communities_count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.community.members.add(self.user)
+        self.assertEqual(self.client.get('/dashboard/').context['stats']['communities_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DirectMessage.objects.create(sender=self.other, receiver=self.user, content='Hi!')
+        self.assertEqual(self.client.get('/dashboard/').context['stats']['messages_count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_read(self.user, self.other)
+        self.assertEqual(self.client.get('/dashboard/').context['stats']['messages_count'], 0)
+
+
+class ProjectCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_model_writes_retire_versioned_keys(self):
+        user = User.objects.create_user('cacher', 'cacher@example.com', 'password123')
+        before = versioned_key('communities', 'page', 1, models=[Community])
+        self.assertEqual(before, versioned_key('communities', 'page', 1, models=[Community]))
+        with self.captureOnCommitCallbacks(execute=True):
+            Community.objects.create(name='Cached', description='x', category='tech', creator=user)
+        self.assertNotEqual(before, versioned_key('communities', 'page', 1, models=[Community]))
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        threads = [threading.Thread(target=get_or_compute, args=('single-flight', compute)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.get('single-flight'), 'value')
+
+
+class CommunityDirectoryRenderTests(TestCase):
+    COMMUNITIES = 30
+    MEMBERS = 5
+    # session + user + all communities + the user's communities
+    MAX_QUERIES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('browser', 'browser@example.com', 'password123')
+        members = [
+            User.objects.create_user(f'regular{i}', f'regular{i}@example.com', 'password123')
+            for i in range(cls.MEMBERS)
+        ]
+        communities = [
+            Community.objects.create(name=f'Circle {i}', description='Directory', category='tech', creator=cls.user)
+            for i in range(cls.COMMUNITIES)
+        ]
+        for community in communities[:10]:
+            community.members.add(cls.user, *members)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_membership_state_does_not_query_per_card(self):
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/communities/')
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(queries), self.MAX_QUERIES)
+        self.assertContains(response, 'View Community', count=10)
+        self.assertContains(response, 'Join Community', count=self.COMMUNITIES - 10)
+
+
+class HotQueryIndexTests(TestCase):
+    def test_hot_queries_avoid_full_scans(self):
+        owner = User.objects.create_user('indexed', 'indexed@example.com', None)
+        Community.objects.create(name='Indexed', description='Plans', category='tech', creator=owner)
+        out = StringIO()
+        call_command('explain_hot_queries', fail_on_scan=True, stdout=out)
+        self.assertNotIn('FULL SCAN', out.getvalue())
+
+
+@override_settings(REQUEST_METRICS_SERVER_TIMING=True)
+class RequestMetricsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('measured', 'measured@example.com', None)
+        cls.staff = User.objects.create_user('operator', 'operator@example.com', None, is_staff=True)
+        community = Community.objects.create(name='Metrics', description='Timed', category='tech', creator=cls.user)
+        Meeting.objects.create(title='Timed meeting', mentor=cls.user, community=community, scheduled_time=timezone.now())
+
+    def setUp(self):
+        request_log.clear()
+
+    def test_records_queries_serializer_time_and_size_per_view(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/meetings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        [record] = request_log.records()
+        self.assertEqual(record['view'], 'meeting-list')
+        self.assertEqual(record['queries'], len(queries))
+        self.assertGreater(record['serializer_ms'], 0)
+        self.assertEqual(record['response_bytes'], len(response.content))
+
+    def test_serializer_time_only_for_timed_views(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/metrics/requests/')
+        self.assertNotIn('ser;', response['Server-Timing'])
+        [record] = request_log.records()
+        self.assertIsNone(record['serializer_ms'])
+        # DRF itself is left alone, so commands and tests serialize untimed
+        self.assertFalse(hasattr(BaseSerializer, '_metrics_instrumented'))
+
+    def test_serializer_time_excludes_sql(self):
+        self.client.force_authenticate(self.user)
+        self.client.get('/api/meetings/')
+        [record] = request_log.records()
+        self.assertLessEqual(record['serializer_ms'] + record['sql_ms'], record['duration_ms'])
+
+    def test_report_is_staff_only(self):
+        self.client.force_authenticate(self.user)
+        self.client.get('/api/meetings/')
+        self.assertEqual(self.client.get('/api/metrics/requests/').status_code, 403)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/metrics/requests/', {'view': 'meeting-list'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['views']), ['meeting-list'])
+        summary = response.data['views']['meeting-list']
+        self.assertEqual(summary['requests'], 1)
+        self.assertEqual(set(summary['duration_ms']), {'p50', 'p95', 'p99', 'max'})
+
+
+class BenchmarkJourneyTests(TestCase):
+    def test_seeded_journey_gets_expected_responses(self):
+        data = seed(Scale(users=6, communities=2, posts=2, comments=1, messages=10, meetings=2))
+        user_id = sorted(data.usernames)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            steps = list(journey(Client(), data, user_id, random.Random(0)))
+        self.assertIn('dashboard', [endpoint for endpoint, _, _ in steps])
+        for endpoint, response, expected in steps:
+            self.assertEqual(response.status_code, expected, endpoint)
+
+
+def jpeg_bytes(width, height, color=(40, 120, 200)):
+    buffer = BytesIO()
+    PILImage.new('RGB', (width, height), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class TempMediaRootMixin:
+    """Points MEDIA_ROOT at a fresh directory, removed after each test"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+@override_settings(TASK_QUEUE_INLINE=True)
+class ImagePipelineTests(TempMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('photographer', 'photographer@example.com', None)
+        self.community = Community.objects.create(name='Photos', description='Uploads', category='arts', creator=self.user)
+
+    def upload(self, width=800, height=600):
+        return SimpleUploadedFile('photo.jpg', jpeg_bytes(width, height), content_type='image/jpeg')
+
+    def create_post(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(community=self.community, author=self.user, title='Photo', content='Look', image=image)
+        post.refresh_from_db()
+        return post
+
+    def test_variants_are_webp_capped_at_source_width_and_shared_by_hash(self):
+        image = self.upload()
+        first = self.create_post(image)
+        variants = first.image_variants['variants']
+        self.assertEqual(sorted(variants, key=int), ['160', '320', '640', '800'])
+        with default_storage.open(variants['320']) as file:
+            resized = PILImage.open(file)
+            self.assertEqual((resized.format, resized.size), ('WEBP', (320, 240)))
+
+        image.seek(0)
+        second = self.create_post(image)
+        self.assertEqual(second.image_variants['variants'], variants)
+
+    def test_card_serves_srcset_once_variants_exist(self):
+        post = self.create_post(self.upload())
+        html = Template('{% load images %}{% responsive_image post.image post.image_variants sizes="50vw" %}').render(
+            Context({'post': post})
+        )
+        self.assertIn('640.webp 640w', html)
+        self.assertIn('sizes="50vw"', html)
+
+        post.image_variants = {}
+        html = Template('{% load images %}{% responsive_image post.image post.image_variants %}').render(
+            Context({'post': post})
+        )
+        self.assertIn(f'src="{post.image.url}"', html)
+        self.assertNotIn('srcset', html)
+
+    def test_variants_of_a_replaced_image_are_not_served(self):
+        post = self.create_post(self.upload())
+        # Variants still describing the previous upload, before the task reruns
+        post.image_variants['source'] = 'post_images/previous.jpg'
+        html = Template('{% load images %}{% responsive_image post.image post.image_variants %}').render(
+            Context({'post': post})
+        )
+        self.assertIn(f'src="{post.image.url}"', html)
+        self.assertNotIn('srcset', html)
+
+
+@override_settings(TASK_QUEUE_INLINE=True)
+class ContentAddressedStorageTests(TempMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('reposter', 'reposter@example.com', None)
+        self.community = Community.objects.create(name='Reposts', description='Same photo', category='arts', creator=self.user)
+
+    def post_with(self, content, filename='photo.jpg'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(
+                community=self.community, author=self.user, title='Repost', content='Again',
+                image=SimpleUploadedFile(filename, content, content_type='image/jpeg'),
+            )
+
+    def delete(self, obj):
+        with self.captureOnCommitCallbacks(execute=True):
+            obj.delete()
+
+    def test_identical_uploads_share_one_blob_until_unreferenced(self):
+        content = jpeg_bytes(400, 300)
+        first = self.post_with(content, 'one.jpg')
+        second = self.post_with(content, 'two.JPG')
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(first.image.name, f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        self.assertEqual(second.image.name, first.image.name)
+        blob = MediaBlob.objects.get(name=first.image.name)
+        self.assertEqual((blob.ref_count, blob.size), (2, len(content)))
+
+        self.delete(first)
+        call_command('gc_media', grace_minutes=0, stdout=StringIO())
+        self.assertTrue(default_storage.exists(second.image.name))
+
+        self.delete(second)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 0)
+        call_command('gc_media', grace_minutes=0, stdout=StringIO())
+        self.assertFalse(MediaBlob.objects.filter(pk=blob.pk).exists())
+        self.assertFalse(default_storage.exists(second.image.name))
+
+    def test_replacing_an_upload_releases_the_old_blob_and_gc_recounts(self):
+        post = self.post_with(jpeg_bytes(40, 30))
+        old_name = post.image.name
+        post.image = SimpleUploadedFile('new.jpg', jpeg_bytes(40, 30, color=(0, 0, 0)), content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        self.assertEqual(MediaBlob.objects.get(name=old_name).ref_count, 0)
+
+        MediaBlob.objects.filter(name=post.image.name).update(ref_count=7)
+        call_command('gc_media', grace_minutes=0, stdout=StringIO())
+        self.assertEqual(MediaBlob.objects.get(name=post.image.name).ref_count, 1)
+        self.assertFalse(MediaBlob.objects.filter(name=old_name).exists())
+
+
+    def test_gc_removes_the_variants_of_replaced_and_deleted_uploads(self):
+        post = self.post_with(jpeg_bytes(400, 300))
+        post.refresh_from_db()
+        old_variant = post.image_variants['variants']['320']
+        post.image = SimpleUploadedFile('new.jpg', jpeg_bytes(400, 300, color=(0, 0, 0)), content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save()
+        post.refresh_from_db()
+        new_variant = post.image_variants['variants']['320']
+
+        output = StringIO()
+        call_command('gc_media', grace_minutes=0, stdout=output)
+        self.assertIn('Removed 1 unused image variant sets', output.getvalue())
+        self.assertFalse(default_storage.exists(old_variant))
+        self.assertTrue(default_storage.exists(new_variant))
+
+        self.delete(post)
+        call_command('gc_media', grace_minutes=0, dry_run=True, stdout=StringIO())
+        self.assertTrue(default_storage.exists(new_variant))
+        call_command('gc_media', grace_minutes=0, stdout=StringIO())
+        self.assertFalse(default_storage.exists(new_variant))
+
+class MediaServingTests(TempMediaRootMixin, TestCase):
+    CONTENT = b'0123456789abcdef'
+
+    def setUp(self):
+        super().setUp()
+        for name in ('blobs/ab/cd/abcd.txt', 'community_images/legacy.txt'):
+            default_storage.save(name, ContentFile(self.CONTENT))
+
+    def get(self, path, **headers):
+        response = self.client.get(f'/media/{path}', headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_content_addressed_files_stream_as_immutable(self):
+        response, body = self.get('blobs/ab/cd/abcd.txt')
+        self.assertEqual((response.status_code, body), (200, self.CONTENT))
+        self.assertTrue(response.streaming)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        legacy, _ = self.get('community_images/legacy.txt')
+        self.assertNotIn('immutable', legacy['Cache-Control'])
+
+        revalidated, _ = self.get('blobs/ab/cd/abcd.txt', if_none_match=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_byte_ranges(self):
+        response, body = self.get('blobs/ab/cd/abcd.txt', range='bytes=2-5')
+        self.assertEqual((response.status_code, body), (206, b'2345'))
+        self.assertEqual(response['Content-Range'], f'bytes 2-5/{len(self.CONTENT)}')
+
+        response, body = self.get('blobs/ab/cd/abcd.txt', range='bytes=-3')
+        self.assertEqual((response.status_code, body), (206, b'def'))
+
+        response, _ = self.get('blobs/ab/cd/abcd.txt', range='bytes=99-')
+        self.assertEqual(response.status_code, 416)
+
+        # A stale If-Range validator gets the whole file
+        response, body = self.get('blobs/ab/cd/abcd.txt', range='bytes=2-5', if_range='"stale"')
+        self.assertEqual((response.status_code, body), (200, self.CONTENT))
+
+    def test_paths_outside_media_root_are_not_found(self):
+        response, _ = self.get('../settings.py')
+        self.assertEqual(response.status_code, 404)
+        response, _ = self.get('blobs/ab/')
+        self.assertEqual(response.status_code, 404)
+
+
+class StaticPipelineTests(TestCase):
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        collected = self.settings(STATIC_ROOT=static_root)
+        collected.enable()
+        self.addCleanup(collected.disable)
+
+    def get(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        return response, b''.join(response.streaming_content)
+
+    def test_collected_assets_are_hashed_and_served_precompressed(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        url = static('css/base.css')
+        self.assertRegex(url, r'^/static/css/base\.[0-9a-f]{12}\.css$')
+        with staticfiles_storage.open('css/base.css') as file:
+            original = file.read()
+
+        response, body = self.get(url, accept_encoding='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(gzip.decompress(body), original)
+        self.assertLess(len(body), len(original))
+
+        response, body = self.get(url, accept_encoding='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(body, original)
+
+    def test_uncollected_assets_fall_back_to_plain_names(self):
+        self.assertEqual(static('css/base.css'), '/static/css/base.css')
+
+
+@task(max_attempts=2)
+def flaky_task(marker):
+    raise RuntimeError(f'{marker} is not ready')
+
+
+@task()
+def outlives_lease_task():
+    # Another worker takes the task over while this run is still going
+    Task.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+    outlives_lease_task.reclaimed = claim(10)
+
+
+@override_settings(TASK_QUEUE_INLINE=False)
+class TaskQueueTests(TempMediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('organizer', 'organizer@example.com', None)
+
+    def test_side_effects_are_queued_and_run_by_the_worker(self):
+        upload = SimpleUploadedFile('cover.jpg', jpeg_bytes(400, 300), content_type='image/jpeg')
+        community = Community.objects.create(
+            name='Queued', description='Resized later', category='arts', creator=self.user, image=upload,
+        )
+        queued = Task.objects.get(name='core.images.process_image')
+        self.assertEqual(queued.args, ['core.community', community.pk])
+        self.assertEqual(community.image_variants, {})
+
+        self.assertEqual(run_pending(), (1, 0))
+        community.refresh_from_db()
+        self.assertEqual(sorted(community.image_variants['variants'], key=int), ['160', '320', '400'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_rolled_back_work_queues_nothing(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            enqueue(flaky_task, 'rolled back')
+            raise RuntimeError
+        self.assertFalse(Task.objects.exists())
+
+    def test_failures_back_off_then_stop_after_max_attempts(self):
+        queued = enqueue(flaky_task, 'calendar')
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertEqual(run_pending(), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('queued', 1))
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertIn('calendar is not ready', queued.last_error)
+        # Not due yet
+        self.assertEqual(run_pending(), (0, 0))
+
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertEqual(run_pending(), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('failed', 2))
+
+    def test_expired_claims_are_handed_out_again(self):
+        queued = enqueue(flaky_task, 'lost')
+        Task.objects.update(status='running', attempts=1, locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(claim(10), [queued.pk])
+        self.assertEqual(Task.objects.get().attempts, 2)
+
+    def test_a_run_that_outlived_its_lease_leaves_the_task_to_the_new_claim(self):
+        queued = enqueue(outlives_lease_task)
+        [pk] = claim(10)
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertTrue(execute(pk))
+        self.assertEqual(outlives_lease_task.reclaimed, [queued.pk])
+        task_row = Task.objects.get()
+        # Still held by the new claim rather than deleted by the stale one
+        self.assertEqual((task_row.status, task_row.attempts), ('running', 2))
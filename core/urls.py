@@ -5,13 +5,17 @@ from core.views import (
     profile_view, dashboard_view, communities_view,
     community_detail, create_community, join_community, leave_community,
     create_post, post_detail, upvote_post, downvote_post, add_comment,
+    upvote_comment, downvote_comment,
     meetings_view, create_meeting, join_meeting, leave_meeting,
-    MeetingViewSet, get_users_for_meeting, get_community_meetings
+    MeetingViewSet, CommunityViewSet, PostViewSet, get_users_for_meeting, get_community_meetings,
+    dashboard_cache_stats, request_metrics
 )
 
 # API Router
 router = DefaultRouter()
 router.register(r'meetings', MeetingViewSet, basename='meeting')
+router.register(r'posts', PostViewSet, basename='post')
+router.register(r'communities', CommunityViewSet, basename='community')
 
 urlpatterns = [
     # Authentication
@@ -38,6 +42,8 @@ urlpatterns = [
     path('posts/<int:post_id>/upvote/', upvote_post, name='upvote_post'),
     path('posts/<int:post_id>/downvote/', downvote_post, name='downvote_post'),
     path('posts/<int:post_id>/comment/', add_comment, name='add_comment'),
+    path('comments/<int:comment_id>/upvote/', upvote_comment, name='upvote_comment'),
+    path('comments/<int:comment_id>/downvote/', downvote_comment, name='downvote_comment'),
     
     # Meetings - Simple (No API)
     path('meetings/', meetings_view, name='meetings'),
@@ -49,6 +55,8 @@ urlpatterns = [
     path('api/', include(router.urls)),
     path('api/auth/users/', get_users_for_meeting, name='get_users_for_meeting'),
     path('api/communities/<int:community_id>/meetings/', get_community_meetings, name='get_community_meetings'),
+    path('api/dashboard/cache-stats/', dashboard_cache_stats, name='dashboard_cache_stats'),
+    path('api/metrics/requests/', request_metrics, name='request_metrics'),
     
     # Landing
     path('', page, {'page_name': 'landing'}, name='landing'),
@@ -4,13 +4,26 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from accounts.models import StudentProfile
+from core.conditional import ConditionalListMixin
+from core.dashboard import DashboardSnapshot
+from core.instrumentation import SerializerTimingMixin, report as request_metrics_report
 from core.models import Community, Post, PostComment, Meeting
-from core.serializers import MeetingSerializer, UserMinimalSerializer
+from core.votes import DOWN, UP, attach_votes, cast_vote, post_votes_for
+from core.pagination import InvalidCursor, KeysetPagination, NestedPagePagination, keyset_page
+from core.recommendations import recommended_communities
+from core.serializers import (
+    CommunityDetailSerializer, CommunityListSerializer, CommunityRecommendationSerializer, MeetingSerializer,
+    PostCommentSerializer, PostDetailSerializer, PostListSerializer, UserMinimalSerializer,
+)
+
+COMMUNITY_SEARCH_LIMIT = 50
 
 ALLOWED_PAGES = [
     'landing',
@@ -105,59 +118,59 @@ def profile_view(request):
 # Dashboard View
 @login_required
 def dashboard_view(request):
-    from mentorship.models import MentorProfile
-    from chat.models import DirectMessage
-    
-    profile, created = StudentProfile.objects.get_or_create(user=request.user)
-    my_communities = Community.objects.filter(members=request.user)
-    recent_posts = Post.objects.filter(community__in=my_communities).order_by('-created_at')[:5]
-    
-    # Get stats
-    mentors_count = MentorProfile.objects.count()
-    communities_count = my_communities.count()
-    messages_count = DirectMessage.objects.filter(receiver=request.user).count()
-    
-    from django.db.models import Q
-    meetings_count = Meeting.objects.filter(
-        Q(mentor=request.user) | Q(attendees=request.user)
-    ).filter(status='scheduled').count()
-    
-    # Get recommended mentors
-    recommended_mentors = User.objects.filter(mentor_profile__isnull=False)[:3]
-    
+    snapshot = DashboardSnapshot.for_user(request.user)
     return render(request, 'dashboard.html', {
-        'profile': profile,
-        'my_communities': my_communities,
-        'recent_posts': recent_posts,
-        'stats': {
-            'mentors_count': mentors_count,
-            'communities_count': communities_count,
-            'messages_count': messages_count,
-            'meetings_count': meetings_count,
-        },
-        'recommended_mentors': recommended_mentors,
+        'my_communities': snapshot.communities,
+        'stats': snapshot.stats,
+        'recommended_mentors': snapshot.recommended_mentors,
+        'suggested_communities': snapshot.suggested_communities,
     })
 
 # Communities Views
 @login_required
 def communities_view(request):
-    communities = Community.objects.all().order_by('-created_at')
-    my_communities = Community.objects.filter(members=request.user)
+    query = request.GET.get('q', '').strip()
+    if query:
+        # Ranked full-text matches, best first
+        from search.backends import search
+        hits = search(query, request.user, kinds=['community'], limit=COMMUNITY_SEARCH_LIMIT)
+        ranked_ids = [hit.document.object_id for hit in hits]
+        found = Community.objects.in_bulk(ranked_ids)
+        communities = [found[pk] for pk in ranked_ids if pk in found]
+    else:
+        communities = Community.objects.all().order_by('-created_at')
+    my_communities = list(Community.objects.filter(members=request.user))
     
     return render(request, 'communities.html', {
         'communities': communities,
         'my_communities': my_communities,
+        # Membership check for every card without touching community.members
+        'member_of': {community.id for community in my_communities},
+        'query': query,
     })
 
 @login_required
 def community_detail(request, community_id):
     community = get_object_or_404(Community, id=community_id)
-    posts = Post.objects.filter(community=community).order_by('-created_at')
     is_member = community.members.filter(id=request.user.id).exists()
     
+    # Posts and meetings are members-only; fetch a single keyset page of the feed
+    posts, next_cursor, meetings = [], None, []
+    if is_member:
+        meetings = list(community.meetings.select_related('mentor'))
+        feed = Post.objects.filter(community=community).select_related('author')
+        try:
+            posts, next_cursor = keyset_page(feed, request.GET.get('cursor'))
+        except InvalidCursor:
+            return redirect(f'/communities/{community.id}/')
+        attach_votes(request.user, posts)
+    
     return render(request, 'community_detail.html', {
         'community': community,
         'posts': posts,
+        'next_cursor': next_cursor,
+        'meetings': meetings,
+        'is_cursor_page': bool(request.GET.get('cursor')),
         'is_member': is_member,
     })
 
@@ -234,28 +247,61 @@ def create_post(request, community_id):
 @login_required
 def post_detail(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    comments = PostComment.objects.filter(post=post).order_by('created_at')
+    comments = PostComment.objects.filter(post=post).select_related('author').order_by('created_at')
+    
+    attach_votes(request.user, [post])
+    comments = attach_votes(request.user, comments)
     
     return render(request, 'post_detail.html', {
         'post': post,
         'comments': comments,
     })
 
+def _vote_message(vote):
+    if vote == UP:
+        return 'Upvoted!'
+    if vote == DOWN:
+        return 'Downvoted.'
+    return 'Vote removed.'
+
+def _next_url(request, fallback):
+    """The ``next`` parameter if it points back into this site, else ``fallback``"""
+    url = request.POST.get('next') or request.GET.get('next')
+    if url and url_has_allowed_host_and_scheme(url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        return url
+    return fallback
+
 @login_required
+@require_POST
 def upvote_post(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    post.upvotes += 1
-    post.save()
-    messages.success(request, 'Post upvoted!')
-    return redirect(f'/posts/{post_id}/')
+    vote = cast_vote(request.user, post, UP)
+    messages.success(request, _vote_message(vote))
+    return redirect(_next_url(request, f'/posts/{post_id}/'))
 
 @login_required
+@require_POST
 def downvote_post(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    post.downvotes += 1
-    post.save()
-    messages.success(request, 'Post downvoted.')
-    return redirect(f'/posts/{post_id}/')
+    vote = cast_vote(request.user, post, DOWN)
+    messages.success(request, _vote_message(vote))
+    return redirect(_next_url(request, f'/posts/{post_id}/'))
+
+@login_required
+@require_POST
+def upvote_comment(request, comment_id):
+    comment = get_object_or_404(PostComment, id=comment_id)
+    vote = cast_vote(request.user, comment, UP)
+    messages.success(request, _vote_message(vote))
+    return redirect(f'/posts/{comment.post_id}/')
+
+@login_required
+@require_POST
+def downvote_comment(request, comment_id):
+    comment = get_object_or_404(PostComment, id=comment_id)
+    vote = cast_vote(request.user, comment, DOWN)
+    messages.success(request, _vote_message(vote))
+    return redirect(f'/posts/{comment.post_id}/')
 
 @login_required
 def add_comment(request, post_id):
@@ -286,7 +332,7 @@ def meetings_view(request):
     # Get meetings where user is mentor or attendee
     my_meetings = Meeting.objects.filter(
         Q(mentor=request.user) | Q(attendees=request.user)
-    ).distinct().order_by('-scheduled_time')
+    ).distinct().select_related('mentor', 'community').prefetch_related('attendees').order_by('-scheduled_time')
     
     return render(request, 'meetings_simple.html', {
         'meetings': my_meetings
@@ -351,16 +397,17 @@ def leave_meeting(request, meeting_id):
 
 
 # Meeting API ViewSet
-class MeetingViewSet(viewsets.ModelViewSet):
+class MeetingViewSet(SerializerTimingMixin, ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = MeetingSerializer
     permission_classes = [IsAuthenticated]
+    version_fields = ('updated_at', 'counters_updated_at')
 
     def get_queryset(self):
         """Get meetings where user is mentor or attendee"""
         from django.db.models import Q
         return Meeting.objects.filter(
             Q(mentor=self.request.user) | Q(attendees=self.request.user)
-        ).distinct().order_by('-scheduled_time')
+        ).distinct().select_related('mentor').prefetch_related('attendees').order_by('-scheduled_time')
 
     def perform_create(self, serializer):
         """Automatically set the mentor to the current user"""
@@ -390,6 +437,98 @@ class MeetingViewSet(viewsets.ModelViewSet):
         return Response({'status': 'left'}, status=status.HTTP_200_OK)
 
 
+def _paginated_children(view, request, queryset, serializer_class):
+    """Page a child list (members, comments) with NestedPagePagination"""
+    paginator = NestedPagePagination()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    serializer = serializer_class(page, many=True, context=view.get_serializer_context())
+    return paginator.get_paginated_response(serializer.data)
+
+
+# Community API ViewSet
+class CommunityViewSet(SerializerTimingMixin, viewsets.ReadOnlyModelViewSet):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Community.objects.select_related('creator').order_by('-created_at')
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return CommunityDetailSerializer
+        return CommunityListSerializer
+
+    @action(detail=True, methods=['get'])
+    def members(self, request, pk=None):
+        """Paginated member list, visible to members only like the community page"""
+        community = self.get_object()
+        if not community.members.filter(id=request.user.id).exists():
+            return Response({'error': 'You must be a member to view members'}, status=status.HTTP_403_FORBIDDEN)
+        return _paginated_children(self, request, community.members.order_by('id'), UserMinimalSerializer)
+
+    @action(detail=False, methods=['get'])
+    def recommended(self, request):
+        """Precomputed "communities you may like" for the current user"""
+        recommendations = recommended_communities(request.user)
+        return Response(CommunityRecommendationSerializer(recommendations, many=True).data)
+
+
+# Post API ViewSet
+class PostViewSet(SerializerTimingMixin, ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    version_fields = ('updated_at', 'counters_updated_at')
+
+    def get_queryset(self):
+        """Posts from the user's communities, optionally narrowed by ?community="""
+        queryset = Post.objects.filter(
+            community__members=self.request.user
+        ).select_related('author')
+        community_id = self.request.query_params.get('community')
+        if community_id and community_id.isdigit():
+            queryset = queryset.filter(community_id=community_id)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return PostDetailSerializer
+        return PostListSerializer
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        # One query for the viewer's votes on the whole page
+        self.my_votes = post_votes_for(self.request.user, page)
+        return page
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if hasattr(self, 'my_votes'):
+            context['my_votes'] = self.my_votes
+        return context
+
+    @action(detail=True, methods=['get'])
+    def comments(self, request, pk=None):
+        """Paginated comments, oldest first"""
+        post = self.get_object()
+        comments = post.comments.select_related('author').order_by('created_at', 'id')
+        return _paginated_children(self, request, comments, PostCommentSerializer)
+
+    @action(detail=True, methods=['post'])
+    def vote(self, request, pk=None):
+        """Toggle or switch the user's vote; body: {"value": 1 | -1}"""
+        post = self.get_object()
+        try:
+            value = int(request.data.get('value'))
+            vote = cast_vote(request.user, post, value)
+        except (TypeError, ValueError):
+            return Response({'error': 'value must be 1 or -1'}, status=status.HTTP_400_BAD_REQUEST)
+        post.refresh_from_db(fields=['upvotes', 'downvotes'])
+        return Response({
+            'my_vote': vote,
+            'upvotes': post.upvotes,
+            'downvotes': post.downvotes,
+        })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_users_for_meeting(request):
@@ -409,6 +548,22 @@ def get_community_meetings(request, community_id):
     if not community.members.filter(id=request.user.id).exists():
         return Response({'error': 'You must be a member to view meetings'}, status=status.HTTP_403_FORBIDDEN)
     
-    meetings = Meeting.objects.filter(community=community).order_by('-scheduled_time')
+    meetings = Meeting.objects.filter(community=community).select_related(
+        'mentor'
+    ).prefetch_related('attendees').order_by('-scheduled_time')
     serializer = MeetingSerializer(meetings, many=True)
     return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def dashboard_cache_stats(request):
+    """Dashboard snapshot cache hits, misses and hit ratio (staff only)"""
+    return Response(DashboardSnapshot.cache_stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def request_metrics(request):
+    """Per-view query count, SQL/serializer time and size percentiles (staff only)"""
+    return Response(request_metrics_report(request.query_params.get('view')))
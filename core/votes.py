@@ -0,0 +1,105 @@
+"""
+Vote engine for posts and comments.
+
+Every vote is a row in a per-user ledger (PostVote / CommentVote) with a
+unique (user, target) constraint, so a user holds at most one vote per
+target. The upvotes/downvotes columns on the target are only ever moved
+with F() expressions in the same transaction as the ledger write, which
+keeps them consistent under concurrent clicks.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from core.models import CommentVote, Post, PostComment, PostVote
+
+UP = 1
+DOWN = -1
+
+COUNTER_FIELDS = {
+    UP: 'upvotes',
+    DOWN: 'downvotes',
+}
+
+
+def _ledger(target):
+    """Return (vote model, foreign key name) for a vote target"""
+    if isinstance(target, Post):
+        return PostVote, 'post'
+    if isinstance(target, PostComment):
+        return CommentVote, 'comment'
+    raise TypeError(f'Cannot vote on {type(target).__name__}')
+
+
+def _record_vote(vote_model, lookup, value):
+    """Write the ledger row; returns (counter deltas, resulting vote)"""
+    while True:
+        try:
+            with transaction.atomic():
+                vote_model.objects.create(value=value, **lookup)
+            return {COUNTER_FIELDS[value]: 1}, value
+        except IntegrityError:
+            vote = vote_model.objects.select_for_update().filter(**lookup).first()
+        if vote is None:
+            # A concurrent request withdrew the vote in between; cast it afresh
+            continue
+        if vote.value == value:
+            vote.delete()
+            return {COUNTER_FIELDS[value]: -1}, 0
+        vote.value = value
+        vote.save(update_fields=['value'])
+        return {COUNTER_FIELDS[value]: 1, COUNTER_FIELDS[-value]: -1}, value
+
+
+def cast_vote(user, target, value):
+    """
+    Record ``user``'s vote on a post or comment.
+
+    Voting the same way twice withdraws the vote; voting the other way
+    switches it. Returns the user's resulting vote: 1, -1 or 0.
+    """
+    if value not in COUNTER_FIELDS:
+        raise ValueError('value must be 1 or -1')
+    vote_model, fk_name = _ledger(target)
+    lookup = {'user': user, fk_name: target}
+
+    with transaction.atomic():
+        deltas, result = _record_vote(vote_model, lookup, value)
+        # Not updated_at: a vote is not an edit (see core.counters)
+        type(target).objects.filter(pk=target.pk).update(
+            counters_updated_at=Now(),
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+    return result
+
+
+def post_votes_for(user, posts):
+    """Map post id -> the user's vote for a batch of posts, in one query"""
+    return _votes_for(PostVote, 'post_id', user, posts)
+
+
+def comment_votes_for(user, comments):
+    """Map comment id -> the user's vote for a batch of comments, in one query"""
+    return _votes_for(CommentVote, 'comment_id', user, comments)
+
+
+def _votes_for(vote_model, fk_field, user, targets):
+    ids = [target.pk for target in targets]
+    if not ids or not user.is_authenticated:
+        return {}
+    return dict(
+        vote_model.objects.filter(user=user, **{f'{fk_field}__in': ids})
+        .values_list(fk_field, 'value')
+    )
+
+
+def attach_votes(user, targets):
+    """Set ``my_vote`` on each post or comment so templates can show vote state"""
+    targets = list(targets)
+    if not targets:
+        return targets
+    vote_model, fk_name = _ledger(targets[0])
+    votes = _votes_for(vote_model, f'{fk_name}_id', user, targets)
+    for target in targets:
+        target.my_vote = votes.get(target.pk, 0)
+    return targets
@@ -2,3 +2,6 @@ from django.apps import AppConfig
 
 class MentorshipConfig(AppConfig):
     name = 'mentorship'
+
+    def ready(self):
+        from mentorship import signals  # noqa: F401
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from mentorship.tokens import rebuild_mentor_index, rebuild_student_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the keyword indexes of mentors (directory search) and student interests'
+
+    def handle(self, *args, **options):
+        count = rebuild_mentor_index()
+        student_count = rebuild_student_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} mentor tokens and {student_count} student tokens'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from mentorship.recommendations import recompute_all
+
+
+class Command(BaseCommand):
+    help = 'Recompute precomputed mentor recommendations for every student'
+
+    def handle(self, *args, **options):
+        count = recompute_all()
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} mentor recommendations'))
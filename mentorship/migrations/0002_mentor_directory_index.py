@@ -0,0 +1,91 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:18
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copies of mentorship.models.normalize_field and
+# mentorship.tokens.token_weights as of this migration, so later changes to
+# the app code cannot change what the backfill writes.
+MAX_TOKEN_LENGTH = 64
+COLUMN_WEIGHTS = (
+    ('field', 3),
+    ('expertise', 2),
+    ('bio', 1),
+)
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have i in is it its me my of on or '
+    'so that the their this to was we with you your'.split()
+)
+
+
+def normalize_field(value):
+    return ' '.join(value.lower().split())
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TOKEN_LENGTH] for token in re.findall(r'\w+', text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def token_weights(profile):
+    weights = {}
+    for column, weight in COLUMN_WEIGHTS:
+        for token in tokenize(getattr(profile, column)):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def backfill_index(apps, schema_editor):
+    MentorProfile = apps.get_model('mentorship', 'MentorProfile')
+    MentorToken = apps.get_model('mentorship', 'MentorToken')
+    tokens = []
+    for profile in MentorProfile.objects.iterator():
+        MentorProfile.objects.filter(pk=profile.pk).update(field_key=normalize_field(profile.field))
+        tokens.extend(
+            MentorToken(mentor=profile, token=token, weight=min(weight, 32767))
+            for token, weight in token_weights(profile).items()
+        )
+    MentorToken.objects.bulk_create(tokens, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentorship', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentorToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='field_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='mentorprofile',
+            index=models.Index(fields=['field_key', 'id'], name='mentor_field_idx'),
+        ),
+        migrations.AddField(
+            model_name='mentortoken',
+            name='mentor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='mentorship.mentorprofile'),
+        ),
+        migrations.AddConstraint(
+            model_name='mentortoken',
+            constraint=models.UniqueConstraint(fields=('token', 'mentor'), name='unique_mentor_token'),
+        ),
+        migrations.RunPython(backfill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentorship', '0002_mentor_directory_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentorRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('mentor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_to', to='mentorship.mentorprofile')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentor_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['student', 'rank'],
+                'indexes': [models.Index(fields=['student', 'rank'], name='mentor_rec_student_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'mentor'), name='unique_mentor_recommendation')],
+            },
+        ),
+    ]
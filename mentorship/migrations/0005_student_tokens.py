@@ -0,0 +1,59 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:11
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of mentorship.tokens.tokenize as of this migration
+MAX_TOKEN_LENGTH = 64
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have i in is it its me my of on or '
+    'so that the their this to was we with you your'.split()
+)
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TOKEN_LENGTH] for token in re.findall(r'\w+', text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def backfill_student_tokens(apps, schema_editor):
+    StudentProfile = apps.get_model('accounts', 'StudentProfile')
+    StudentToken = apps.get_model('mentorship', 'StudentToken')
+    students = StudentProfile.objects.exclude(interests='').values_list('user_id', 'interests')
+    StudentToken.objects.bulk_create(
+        (
+            StudentToken(student_id=student_id, token=token)
+            for student_id, interests in students.iterator()
+            for token in set(tokenize(interests))
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_content_addressed_uploads'),
+        ('mentorship', '0004_mentorprofile_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interest_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('token', 'student'), name='unique_student_token')],
+            },
+        ),
+        migrations.RunPython(backfill_student_tokens, migrations.RunPython.noop),
+    ]
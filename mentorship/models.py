@@ -1,6 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+
+def normalize_field(value):
+    """Case- and whitespace-insensitive key used to filter mentors by field"""
+    return ' '.join(value.lower().split())
+
+
 class MentorProfile(models.Model):
     user = models.OneToOneField(
         User,
@@ -8,8 +14,90 @@ class MentorProfile(models.Model):
         related_name="mentor_profile"
     )
     field = models.CharField(max_length=100)
+    # normalize_field(field), kept in sync on save so the filter can use an index
+    field_key = models.CharField(max_length=100, editable=False, default='')
     expertise = models.TextField()
     bio = models.TextField(blank=True)
+    # Version of the profile for cached mentor cards
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['field_key', 'id'], name='mentor_field_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.field_key = normalize_field(self.field)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # Partial saves still move the card version
+            update_fields = set(update_fields) | {'updated_at'}
+            if 'field' in update_fields:
+                update_fields.add('field_key')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.user.username
+
+
+class MentorToken(models.Model):
+    """
+    One searchable word of a mentor's field, expertise or bio.
+
+    Rebuilt whenever the profile is saved; ``weight`` is the summed
+    occurrence weight of the token across those columns.
+    """
+    mentor = models.ForeignKey(MentorProfile, on_delete=models.CASCADE, related_name='tokens')
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'mentor'], name='unique_mentor_token'),
+        ]
+
+    def __str__(self):
+        return f'{self.token} ({self.mentor_id})'
+
+
+class StudentToken(models.Model):
+    """
+    One word of a student's interests, rebuilt whenever the profile's
+    interests are saved. Lets a mentor's changed terms be matched to the
+    students sharing them without reading every profile.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='interest_tokens')
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'student'], name='unique_student_token'),
+        ]
+
+    def __str__(self):
+        return f'{self.token} ({self.student_id})'
+
+
+class MentorRecommendation(models.Model):
+    """
+    A precomputed mentor match for a student, written by
+    mentorship.recommendations; ``rank`` 1 is the best match.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mentor_recommendations')
+    mentor = models.ForeignKey(MentorProfile, on_delete=models.CASCADE, related_name='recommended_to')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['student', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'mentor'], name='unique_mentor_recommendation'),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'rank'], name='mentor_rec_student_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.student} -> {self.mentor} ({self.score:.3f})'
@@ -0,0 +1,188 @@
+"""
+Mentor recommendations: TF-IDF cosine similarity between a student's
+interests and each mentor's field, expertise and bio.
+
+Mentor term weights come from the MentorToken index. MentorVectors keeps
+one array-backed posting list per term (mentor positions and normalised
+weights), so scoring a student only touches mentors sharing at least one
+term with them. The best matches are stored in MentorRecommendation, which
+the dashboard reads in a single query.
+"""
+import heapq
+import math
+from array import array
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max
+
+from accounts.models import StudentProfile
+from core.dashboard import DashboardSnapshot
+from core.tasks import task
+
+from .models import MentorRecommendation, MentorToken, StudentToken
+from .tokens import tokenize
+
+RECOMMENDATIONS_PER_STUDENT = 10
+# Cosine scores below this are noise (a shared stopword-like term)
+MIN_SCORE = 0.01
+
+# (index version, MentorVectors) shared by every request in this process
+_cached_vectors = (None, None)
+
+
+def _tf(count):
+    """Sublinear term frequency so repeated words do not dominate"""
+    return 1.0 + math.log(count)
+
+
+class MentorVectors:
+    """Sparse, L2-normalised TF-IDF vectors of every indexed mentor"""
+
+    def __init__(self, rows):
+        # rows: (mentor_id, mentor_user_id, token, weight)
+        terms_by_mentor = defaultdict(list)
+        user_by_mentor = {}
+        document_frequency = Counter()
+        for mentor_id, user_id, token, weight in rows:
+            terms_by_mentor[mentor_id].append((token, weight))
+            user_by_mentor[mentor_id] = user_id
+            document_frequency[token] += 1
+
+        self.mentor_ids = array('q', sorted(terms_by_mentor))
+        self.mentor_user_ids = array('q', [user_by_mentor[pk] for pk in self.mentor_ids])
+        self.vocabulary = {token: index for index, token in enumerate(sorted(document_frequency))}
+
+        mentors = len(self.mentor_ids)
+        self.idf = array('d', bytes(8 * len(self.vocabulary)))
+        for token, index in self.vocabulary.items():
+            self.idf[index] = math.log((1 + mentors) / (1 + document_frequency[token])) + 1.0
+
+        self.postings = [(array('l'), array('d')) for _ in self.vocabulary]
+        for position, mentor_id in enumerate(self.mentor_ids):
+            vector = [
+                (self.vocabulary[token], _tf(weight) * self.idf[self.vocabulary[token]])
+                for token, weight in terms_by_mentor[mentor_id]
+            ]
+            norm = math.sqrt(sum(value * value for _, value in vector))
+            for index, value in vector:
+                positions, weights = self.postings[index]
+                positions.append(position)
+                weights.append(value / norm)
+
+    @classmethod
+    def load(cls):
+        rows = MentorToken.objects.values_list('mentor_id', 'mentor__user_id', 'token', 'weight')
+        return cls(rows.iterator(chunk_size=2000))
+
+    @classmethod
+    def current(cls):
+        """
+        Process-wide vectors, reloaded only when the token index changed.
+
+        index_mentor() replaces a mentor's rows, so any edit moves the
+        (row count, highest id) pair.
+        """
+        global _cached_vectors
+        version = MentorToken.objects.aggregate(rows=Count('id'), newest=Max('id'))
+        version = (version['rows'], version['newest'])
+        cached_version, vectors = _cached_vectors
+        if vectors is None or cached_version != version:
+            vectors = cls.load()
+            _cached_vectors = (version, vectors)
+        return vectors
+
+    def student_vector(self, interests):
+        """Normalised {term index: weight} for a student's interests text"""
+        counts = Counter(token for token in tokenize(interests) if token in self.vocabulary)
+        vector = {
+            self.vocabulary[token]: _tf(count) * self.idf[self.vocabulary[token]]
+            for token, count in counts.items()
+        }
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {index: value / norm for index, value in vector.items()} if norm else {}
+
+    def top_matches(self, student_id, interests, k=RECOMMENDATIONS_PER_STUDENT):
+        """[(mentor_id, score)] best first, never recommending the student to themselves"""
+        scores = defaultdict(float)
+        for index, value in self.student_vector(interests).items():
+            positions, weights = self.postings[index]
+            for position, weight in zip(positions, weights):
+                scores[position] += value * weight
+
+        candidates = (
+            (score, position) for position, score in scores.items()
+            if score >= MIN_SCORE and self.mentor_user_ids[position] != student_id
+        )
+        # Ties go to the longest-standing mentor (lowest id)
+        best = heapq.nlargest(k, candidates, key=lambda item: (item[0], -item[1]))
+        return [(self.mentor_ids[position], score) for score, position in best]
+
+
+def _recommendation_rows(vectors, student_id, interests):
+    return [
+        MentorRecommendation(student_id=student_id, mentor_id=mentor_id, score=score, rank=rank)
+        for rank, (mentor_id, score) in enumerate(vectors.top_matches(student_id, interests), start=1)
+    ]
+
+
+@task()
+def recompute_students(student_ids, vectors=None):
+    """Replace the stored recommendations of the given students"""
+    student_ids = list(student_ids)
+    if not student_ids:
+        return 0
+    vectors = vectors or MentorVectors.current()
+    interests = dict(
+        StudentProfile.objects.filter(user_id__in=student_ids).values_list('user_id', 'interests')
+    )
+    rows = []
+    for student_id in student_ids:
+        rows.extend(_recommendation_rows(vectors, student_id, interests.get(student_id, '')))
+    with transaction.atomic():
+        MentorRecommendation.objects.filter(student_id__in=student_ids).delete()
+        MentorRecommendation.objects.bulk_create(rows)
+        transaction.on_commit(lambda: DashboardSnapshot.invalidate(*student_ids))
+    return len(rows)
+
+
+def recompute_all(batch_size=500):
+    """Batch job: rebuild recommendations for every student; returns the row count"""
+    vectors = MentorVectors.load()
+    count = 0
+    with transaction.atomic():
+        MentorRecommendation.objects.all().delete()
+        batch = []
+        students = StudentProfile.objects.exclude(interests='').values_list('user_id', 'interests')
+        for student_id, interests in students.iterator(chunk_size=batch_size):
+            batch.extend(_recommendation_rows(vectors, student_id, interests))
+            if len(batch) >= batch_size:
+                MentorRecommendation.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        MentorRecommendation.objects.bulk_create(batch)
+        count += len(batch)
+        transaction.on_commit(DashboardSnapshot.invalidate_all)
+    return count
+
+
+def affected_students(mentor_id, tokens):
+    """
+    Students whose recommendations may change when a mentor's terms change:
+    those currently recommended the mentor plus those sharing any of
+    ``tokens``, found through the StudentToken index.
+    """
+    student_ids = set(
+        MentorRecommendation.objects.filter(mentor_id=mentor_id).values_list('student_id', flat=True)
+    )
+    if tokens:
+        student_ids.update(
+            StudentToken.objects.filter(token__in=set(tokens)).values_list('student_id', flat=True)
+        )
+    return student_ids
+
+
+@task()
+def refresh_mentor_students(mentor_id, tokens):
+    """Recompute the students a mentor's term change may affect"""
+    return recompute_students(affected_students(mentor_id, tokens))
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import MentorshipRequest, Mentorship, MentorProfile
+from .models import MentorProfile
 
 class UserMinimalSerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,24 +10,9 @@ class UserMinimalSerializer(serializers.ModelSerializer):
 
 class MentorProfileSerializer(serializers.ModelSerializer):
     user = UserMinimalSerializer(read_only=True)
+    # Relevance of a keyword search; null when listing without ?q=
+    score = serializers.IntegerField(read_only=True, default=None)
 
     class Meta:
         model = MentorProfile
-        fields = ['id', 'user', 'field', 'expertise', 'bio', 'is_active']
-
-
-class MentorshipRequestSerializer(serializers.ModelSerializer):
-    student = UserMinimalSerializer(read_only=True)
-    mentor = UserMinimalSerializer(read_only=True)
-
-    class Meta:
-        model = MentorshipRequest
-        fields = ['id', 'student', 'mentor', 'subject', 'description', 'status', 'created_at', 'updated_at']
-
-
-class MentorshipSerializer(serializers.ModelSerializer):
-    request = MentorshipRequestSerializer(read_only=True)
-
-    class Meta:
-        model = Mentorship
-        fields = ['id', 'request', 'start_date', 'end_date', 'goals', 'progress']
+        fields = ['id', 'user', 'field', 'expertise', 'bio', 'score']
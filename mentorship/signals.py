@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from accounts.models import StudentProfile
+from core.cache import invalidate_model_on_commit
+from core.tasks import enqueue
+
+from .models import MentorProfile, StudentToken
+from .recommendations import affected_students, recompute_students, refresh_mentor_students
+from .tokens import index_mentor, index_student, token_weights
+
+
+@receiver(post_save, sender=MentorProfile)
+def mentor_saved(sender, instance, created, **kwargs):
+    old_tokens = set() if created else set(instance.tokens.values_list('token', flat=True))
+    index_mentor(instance)
+    invalidate_model_on_commit(MentorProfile)
+    # Students matching the old or the new terms may gain or lose this mentor
+    enqueue(refresh_mentor_students, instance.pk, sorted(old_tokens | set(token_weights(instance))))
+
+
+@receiver(pre_delete, sender=MentorProfile)
+def mentor_deleted(sender, instance, **kwargs):
+    # Resolve the students now; their rows for this mentor cascade away with it
+    student_ids = affected_students(instance.pk, ())
+    enqueue(recompute_students, list(student_ids))
+    invalidate_model_on_commit(MentorProfile)
+
+
+@receiver(post_save, sender=StudentProfile)
+def student_profile_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'interests' not in update_fields:
+        return
+    index_student(instance.user_id, instance.interests)
+    enqueue(recompute_students, [instance.user_id])
+
+
+@receiver(post_delete, sender=StudentProfile)
+def student_profile_deleted(sender, instance, **kwargs):
+    StudentToken.objects.filter(student_id=instance.user_id).delete()
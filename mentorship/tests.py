@@ -1 +1,138 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from accounts.models import StudentProfile
+from mentorship.models import MentorProfile, MentorRecommendation, MentorToken, StudentToken
+from mentorship.recommendations import affected_students, recompute_all
+from mentorship.tokens import rebuild_student_index
+
+
+class MentorDirectoryTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user('viewer', 'viewer@example.com', 'password123')
+        profiles = [
+            ('Computer Science', 'Python and machine learning', 'Kaggle grandmaster'),
+            ('computer  science', 'Distributed systems', 'Loves teaching python'),
+            ('Design', 'Product design and Figma', ''),
+        ]
+        for i, (field, expertise, bio) in enumerate(profiles):
+            user = User.objects.create_user(f'mentor{i}', f'mentor{i}@example.com', 'password123')
+            MentorProfile.objects.create(user=user, field=field, expertise=expertise, bio=bio)
+
+    def setUp(self):
+        self.client.force_authenticate(self.viewer)
+
+    def directory(self, **params):
+        response = self.client.get('/api/mentorship/directory/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_field_filter_ignores_case_and_spacing(self):
+        data = self.directory(field='COMPUTER SCIENCE')
+        self.assertEqual(data['count'], 2)
+
+    def test_keyword_search_requires_every_term_and_ranks_expertise_first(self):
+        data = self.directory(q='python')
+        self.assertEqual([mentor['user']['username'] for mentor in data['results']], ['mentor0', 'mentor1'])
+        self.assertEqual(self.directory(q='python figma')['count'], 0)
+
+    def test_tokens_follow_profile_edits(self):
+        profile = MentorProfile.objects.get(user__username='mentor2')
+        profile.expertise = 'Typography'
+        profile.save()
+        self.assertFalse(MentorToken.objects.filter(mentor=profile, token='figma').exists())
+        self.assertEqual(self.directory(q='typography')['count'], 1)
+
+    def test_migration_backfill_matches_the_live_index(self):
+        indexed = set(MentorToken.objects.values_list('mentor_id', 'token', 'weight'))
+        keys = set(MentorProfile.objects.values_list('id', 'field_key'))
+        MentorToken.objects.all().delete()
+        MentorProfile.objects.update(field_key='')
+        migration = import_module('mentorship.migrations.0002_mentor_directory_index')
+        migration.backfill_index(apps, None)
+        self.assertEqual(set(MentorToken.objects.values_list('mentor_id', 'token', 'weight')), indexed)
+        self.assertEqual(set(MentorProfile.objects.values_list('id', 'field_key')), keys)
+
+
+class MentorRecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password123')
+        mentors = [
+            ('Computer Science', 'Machine learning and Python', ''),
+            ('Design', 'Product design, Figma and user research', ''),
+            ('Biology', 'Genetics research', 'Python for bioinformatics'),
+        ]
+        cls.mentors = []
+        for i, (field, expertise, bio) in enumerate(mentors):
+            user = User.objects.create_user(f'mentor{i}', f'mentor{i}@example.com', 'password123')
+            cls.mentors.append(MentorProfile.objects.create(user=user, field=field, expertise=expertise, bio=bio))
+
+    def recommended(self):
+        return list(
+            MentorRecommendation.objects.filter(student=self.student)
+            .order_by('rank').values_list('mentor__user__username', flat=True)
+        )
+
+    def test_interests_are_matched_against_mentor_terms(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentProfile.objects.create(user=self.student, interests='machine learning, python')
+        self.assertEqual(self.recommended(), ['mentor0', 'mentor2'])
+
+    def test_mentor_edits_update_recommendations_incrementally(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentProfile.objects.create(user=self.student, interests='figma')
+        self.assertEqual(self.recommended(), ['mentor1'])
+
+        mentor = self.mentors[1]
+        mentor.expertise = 'Illustration'
+        with self.captureOnCommitCallbacks(execute=True):
+            mentor.save()
+        self.assertEqual(self.recommended(), [])
+
+    def test_batch_job_skips_the_students_own_profile(self):
+        StudentProfile.objects.create(user=self.mentors[0].user, interests='python')
+        recompute_all()
+        usernames = MentorRecommendation.objects.filter(
+            student=self.mentors[0].user
+        ).values_list('mentor__user__username', flat=True)
+        self.assertEqual(list(usernames), ['mentor2'])
+
+    def test_affected_students_are_found_through_the_token_index(self):
+        others = [
+            User.objects.create_user(f'other{i}', f'other{i}@example.com', 'password123') for i in range(3)
+        ]
+        StudentProfile.objects.create(user=self.student, interests='Genetics and chess')
+        StudentProfile.objects.create(user=others[0], interests='figma, genetics')
+        StudentProfile.objects.create(user=others[1], interests='Pottery')
+        profile = StudentProfile.objects.create(user=others[2], interests='genetics')
+
+        with CaptureQueriesContext(connection) as queries:
+            students = affected_students(self.mentors[2].pk, ['genetics', 'research'])
+        self.assertEqual(students, {self.student.id, others[0].id, others[2].id})
+        self.assertEqual(len(queries), 2)
+
+        profile.interests = 'pottery'
+        profile.save()
+        self.assertEqual(affected_students(self.mentors[2].pk, ['genetics']), {self.student.id, others[0].id})
+        profile.delete()
+        self.assertFalse(StudentToken.objects.filter(student=others[2]).exists())
+
+    def test_student_index_rebuild_and_backfill_match_the_signals(self):
+        StudentProfile.objects.create(user=self.student, interests='Python, python and data science')
+        indexed = set(StudentToken.objects.values_list('student_id', 'token'))
+        self.assertEqual(indexed, {(self.student.id, token) for token in ('python', 'data', 'science')})
+        self.assertEqual(rebuild_student_index(), 3)
+        self.assertEqual(set(StudentToken.objects.values_list('student_id', 'token')), indexed)
+
+        StudentToken.objects.all().delete()
+        migration = import_module('mentorship.migrations.0005_student_tokens')
+        migration.backfill_student_tokens(apps, None)
+        self.assertEqual(set(StudentToken.objects.values_list('student_id', 'token')), indexed)
@@ -0,0 +1,126 @@
+"""
+Precomputed keyword index for the mentor directory.
+
+Each MentorProfile's field, expertise and bio are split into lowercase word
+tokens stored in MentorToken, so a keyword query is an indexed lookup on
+(token, mentor) instead of a substring scan over every profile's text.
+Students' interests get the same treatment in StudentToken, so the
+students sharing a mentor's terms are found by token as well.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from accounts.models import StudentProfile
+
+from .models import MentorProfile, MentorToken, StudentToken
+
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TERMS = 8
+# Matches in the field or expertise outrank matches in the bio
+COLUMN_WEIGHTS = (
+    ('field', 3),
+    ('expertise', 2),
+    ('bio', 1),
+)
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have i in is it its me my of on or '
+    'so that the their this to was we with you your'.split()
+)
+
+
+def tokenize(text):
+    """Lowercase word tokens of ``text`` without stopwords or one-letter words"""
+    return [
+        token[:MAX_TOKEN_LENGTH] for token in re.findall(r'\w+', text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def query_terms(query):
+    """Distinct tokens of a user query, capped so queries stay cheap"""
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def token_weights(profile):
+    """Map each token of ``profile`` to its summed column weight"""
+    weights = {}
+    for column, weight in COLUMN_WEIGHTS:
+        for token in tokenize(getattr(profile, column)):
+            weights[token] = weights.get(token, 0) + weight
+    return weights
+
+
+def _token_rows(profile):
+    return [
+        MentorToken(mentor=profile, token=token, weight=min(weight, 32767))
+        for token, weight in token_weights(profile).items()
+    ]
+
+
+def index_mentor(profile):
+    """Replace the stored tokens of one mentor"""
+    with transaction.atomic():
+        MentorToken.objects.filter(mentor=profile).delete()
+        MentorToken.objects.bulk_create(_token_rows(profile))
+
+
+def rebuild_mentor_index(batch_size=500):
+    """Recreate every MentorToken from the profiles; returns the token count"""
+    count = 0
+    with transaction.atomic():
+        MentorToken.objects.all().delete()
+        batch = []
+        for profile in MentorProfile.objects.iterator(chunk_size=batch_size):
+            batch.extend(_token_rows(profile))
+            if len(batch) >= batch_size:
+                MentorToken.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        MentorToken.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def search_mentors(queryset, query):
+    """
+    Narrow ``queryset`` to mentors matching every keyword of ``query``.
+
+    Results carry a ``score`` annotation (summed token weights) and are
+    ordered best match first. A query without usable terms returns no rows.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none()
+    return queryset.filter(tokens__token__in=terms).annotate(
+        matched_terms=Count('tokens', distinct=True),
+        score=Sum('tokens__weight'),
+    ).filter(matched_terms=len(terms)).order_by('-score', 'id')
+
+
+def index_student(student_id, interests):
+    """Replace the stored interest tokens of one student"""
+    with transaction.atomic():
+        StudentToken.objects.filter(student_id=student_id).delete()
+        StudentToken.objects.bulk_create(
+            StudentToken(student_id=student_id, token=token) for token in set(tokenize(interests))
+        )
+
+
+def rebuild_student_index(batch_size=500):
+    """Recreate every StudentToken from the profiles; returns the token count"""
+    count = 0
+    with transaction.atomic():
+        StudentToken.objects.all().delete()
+        batch = []
+        students = StudentProfile.objects.exclude(interests='').values_list('user_id', 'interests')
+        for student_id, interests in students.iterator(chunk_size=batch_size):
+            batch.extend(StudentToken(student_id=student_id, token=token) for token in set(tokenize(interests)))
+            if len(batch) >= batch_size:
+                StudentToken.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        StudentToken.objects.bulk_create(batch)
+        count += len(batch)
+    return count
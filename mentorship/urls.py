@@ -1,7 +1,12 @@
-from django.urls import path
-from .views import mentors_view, register_mentor
+from django.urls import path, include
+from rest_framework.routers import SimpleRouter
+from .views import mentors_view, register_mentor, MentorViewSet
+
+router = SimpleRouter()
+router.register(r'directory', MentorViewSet, basename='mentor')
 
 urlpatterns = [
     path('', mentors_view, name='mentors'),
     path('register/', register_mentor, name='register_mentor'),
+    path('', include(router.urls)),
 ]
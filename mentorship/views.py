@@ -1,12 +1,54 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import MentorProfile
+from django.core.paginator import Paginator
+from django.db.models import Count, Min
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from core.cache import cached
+from core.instrumentation import SerializerTimingMixin
+from .models import MentorProfile, normalize_field
+from .serializers import MentorProfileSerializer
+from .tokens import search_mentors
+
+MENTOR_PAGE_SIZE = 24
+MAX_MENTOR_PAGE_SIZE = 100
+
+
+def mentor_directory(field='', query=''):
+    """Mentors filtered by field and keyword query, best matches first"""
+    mentors = MentorProfile.objects.select_related("user")
+    field_key = normalize_field(field)
+    if field_key:
+        mentors = mentors.filter(field_key=field_key)
+    if query.strip():
+        return search_mentors(mentors, query)
+    return mentors.order_by("id")
+
+
+@cached("mentor-fields", models=[MentorProfile])
+def mentor_fields():
+    """Distinct mentor fields with their mentor counts, for filter menus"""
+    return list(
+        MentorProfile.objects.values("field_key")
+        .annotate(field=Min("field"), mentors=Count("id"))
+        .order_by("field_key")
+    )
+
 
 def mentors_view(request):
-    mentors = MentorProfile.objects.select_related("user").all()
+    field = request.GET.get("field", "")
+    query = request.GET.get("q", "")
+    page = Paginator(mentor_directory(field, query), MENTOR_PAGE_SIZE).get_page(request.GET.get("page"))
     return render(request, "mentors.html", {
-        "mentors": mentors
+        "mentors": page,
+        "page": page,
+        "fields": mentor_fields(),
+        "field_key": normalize_field(field),
+        "query": query,
     })
 
 @login_required
@@ -34,3 +76,27 @@ def register_mentor(request):
             messages.error(request, 'Please fill in all required fields.')
     
     return render(request, 'register_mentor.html')
+
+
+class MentorDirectoryPagination(PageNumberPagination):
+    page_size = MENTOR_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = MAX_MENTOR_PAGE_SIZE
+
+
+class MentorViewSet(SerializerTimingMixin, viewsets.ReadOnlyModelViewSet):
+    """Mentor directory: ?field= narrows to one field, ?q= searches expertise and bio"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = MentorProfileSerializer
+    pagination_class = MentorDirectoryPagination
+
+    def get_queryset(self):
+        if self.action != "list":
+            return MentorProfile.objects.select_related("user")
+        params = self.request.query_params
+        return mentor_directory(params.get("field", ""), params.get("q", ""))
+
+    @action(detail=False, methods=["get"])
+    def fields(self, request):
+        """Distinct fields with mentor counts"""
+        return Response(mentor_fields())
@@ -2,11 +2,13 @@ from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from core.conditional import ConditionalListMixin
+from core.instrumentation import SerializerTimingMixin
 from .models import OnboardingStep
 from .serializers import OnboardingStepSerializer
 
 
-class OnboardingStepViewSet(viewsets.ModelViewSet):
+class OnboardingStepViewSet(SerializerTimingMixin, ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = OnboardingStepSerializer
     permission_classes = [IsAuthenticated]
     
@@ -0,0 +1,159 @@
+"""
+Ranked full-text search over SearchDocument.
+
+The backend follows the default database: SQLite uses the FTS5 table
+``search_fts`` (bm25 ranking), PostgreSQL uses a GIN-indexed tsvector
+(ts_rank). Any other database, or SQLite built without FTS5, falls back to
+unranked substring matching so search keeps working everywhere.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import SearchDocument
+
+# Title matches count five times as much as body matches
+TITLE_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+MAX_QUERY_TERMS = 8
+SNIPPET_WORDS = 16
+
+# Must stay identical to the expression indexed in 0002_fulltext_index
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(d.title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(d.body, '')), 'B')"
+)
+
+
+def query_terms(query):
+    """Word tokens of a user query, capped so queries stay cheap"""
+    return re.findall(r'\w+', query.lower())[:MAX_QUERY_TERMS]
+
+
+class SearchHit:
+    def __init__(self, document, score, snippet):
+        self.document = document
+        self.score = score
+        self.snippet = snippet
+
+
+def _visibility_sql(user):
+    """WHERE fragment hiding posts/comments of communities the user is not in"""
+    sql = (
+        "(d.kind = 'community' OR d.community_id IN "
+        "(SELECT community_id FROM core_community_members WHERE user_id = %s))"
+    )
+    return sql, [user.pk]
+
+
+def _kinds_sql(kinds):
+    if not kinds:
+        return '', []
+    placeholders = ', '.join(['%s'] * len(kinds))
+    return f' AND d.kind IN ({placeholders})', list(kinds)
+
+
+def _load_hits(rows):
+    """Turn (id, score, snippet) rows into SearchHits, keeping rank order"""
+    documents = SearchDocument.objects.in_bulk([row[0] for row in rows])
+    return [SearchHit(documents[pk], score, snippet) for pk, score, snippet in rows if pk in documents]
+
+
+class SQLiteFTSBackend:
+    name = 'sqlite-fts5'
+
+    def match_expression(self, terms):
+        # Quote every term so FTS5 operators in user input are inert; the
+        # last term is a prefix match for search-as-you-type
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search(self, query, user, kinds=None, offset=0, limit=20):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        visibility, visibility_params = _visibility_sql(user)
+        kinds_clause, kinds_params = _kinds_sql(kinds)
+        sql = (
+            "SELECT d.id, bm25(search_fts, %s, %s) AS score, "
+            "snippet(search_fts, 1, '', '', '...', %s) "
+            "FROM search_fts JOIN search_searchdocument d ON d.id = search_fts.rowid "
+            f"WHERE search_fts MATCH %s AND {visibility}{kinds_clause} "
+            "ORDER BY score LIMIT %s OFFSET %s"
+        )
+        params = [TITLE_WEIGHT, BODY_WEIGHT, SNIPPET_WORDS, self.match_expression(terms)]
+        params += visibility_params + kinds_params + [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            # bm25() is lower-is-better; flip it so higher scores rank first
+            rows = [(pk, -score, snippet) for pk, score, snippet in cursor.fetchall()]
+        return _load_hits(rows)
+
+
+class PostgresBackend:
+    name = 'postgres'
+
+    def search(self, query, user, kinds=None, offset=0, limit=20):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        visibility, visibility_params = _visibility_sql(user)
+        kinds_clause, kinds_params = _kinds_sql(kinds)
+        # Prefix-match every term, all terms required
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        sql = (
+            f"SELECT d.id, ts_rank({POSTGRES_VECTOR}, q) AS score, "
+            "ts_headline('english', d.body, q, %s) "
+            "FROM search_searchdocument d, to_tsquery('english', %s) q "
+            f"WHERE {POSTGRES_VECTOR} @@ q AND {visibility}{kinds_clause} "
+            "ORDER BY score DESC LIMIT %s OFFSET %s"
+        )
+        headline_options = f'StartSel="",StopSel="",MaxWords={SNIPPET_WORDS},MinWords=5'
+        params = [headline_options, tsquery] + visibility_params + kinds_params + [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return _load_hits(rows)
+
+
+class BasicBackend:
+    """Substring matching for databases without a full-text engine"""
+    name = 'basic'
+
+    def search(self, query, user, kinds=None, offset=0, limit=20):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        documents = SearchDocument.objects.filter(
+            Q(kind='community') | Q(community_id__in=user.communities.values('id'))
+        )
+        if kinds:
+            documents = documents.filter(kind__in=kinds)
+        for term in terms:
+            documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        documents = documents.order_by('-updated_at')[offset:offset + limit]
+        return [SearchHit(document, 0.0, document.body[:200]) for document in documents]
+
+
+def _fts5_table_exists():
+    # Cached per connection; the table only appears or disappears via migrate
+    if not hasattr(connection, '_search_fts5_table'):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_fts'")
+            connection._search_fts5_table = cursor.fetchone() is not None
+    return connection._search_fts5_table
+
+
+def get_backend():
+    """Pick the search backend for the default database"""
+    if connection.vendor == 'sqlite' and _fts5_table_exists():
+        return SQLiteFTSBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresBackend()
+    return BasicBackend()
+
+
+def search(query, user, kinds=None, offset=0, limit=20):
+    return get_backend().search(query, user, kinds=kinds, offset=offset, limit=limit)
@@ -0,0 +1,85 @@
+"""
+Building and syncing SearchDocument rows from the core models.
+"""
+from django.db import transaction
+from django.db.models.functions import Now
+
+from core.models import Community, Post, PostComment
+
+from .models import SearchDocument
+
+
+def _community_document(community):
+    return {
+        'community_id': community.id,
+        'title': community.name,
+        'body': community.description,
+        'url': f'/communities/{community.id}/',
+    }
+
+
+def _post_document(post):
+    return {
+        'community_id': post.community_id,
+        'title': post.title,
+        'body': post.content,
+        'url': f'/posts/{post.id}/',
+    }
+
+
+def _comment_document(comment):
+    return {
+        'community_id': comment.post.community_id,
+        'title': comment.post.title,
+        'body': comment.content,
+        'url': f'/posts/{comment.post_id}/',
+    }
+
+
+DOCUMENT_BUILDERS = {
+    Community: ('community', _community_document),
+    Post: ('post', _post_document),
+    PostComment: ('comment', _comment_document),
+}
+
+
+def index_object(obj):
+    """Create or refresh the SearchDocument for a saved object"""
+    kind, build = DOCUMENT_BUILDERS[type(obj)]
+    SearchDocument.objects.update_or_create(kind=kind, object_id=obj.pk, defaults=build(obj))
+
+
+def reindex_post_comments(post):
+    """Carry a post's title into its comments' documents, which repeat it"""
+    SearchDocument.objects.filter(
+        kind='comment', object_id__in=PostComment.objects.filter(post=post).values('id'),
+    ).exclude(title=post.title).update(title=post.title, updated_at=Now())
+
+
+def unindex_object(obj):
+    kind, _ = DOCUMENT_BUILDERS[type(obj)]
+    SearchDocument.objects.filter(kind=kind, object_id=obj.pk).delete()
+
+
+def rebuild_index(batch_size=500):
+    """Recreate every SearchDocument from the source tables"""
+    sources = [
+        Community.objects.all(),
+        Post.objects.all(),
+        PostComment.objects.select_related('post'),
+    ]
+    count = 0
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for queryset in sources:
+            kind, build = DOCUMENT_BUILDERS[queryset.model]
+            batch = []
+            for obj in queryset.iterator(chunk_size=batch_size):
+                batch.append(SearchDocument(kind=kind, object_id=obj.pk, **build(obj)))
+                if len(batch) >= batch_size:
+                    SearchDocument.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            SearchDocument.objects.bulk_create(batch)
+            count += len(batch)
+    return count
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from search.indexing import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild search documents for all communities, posts and comments'
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} documents'))
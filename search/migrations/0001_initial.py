@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('community', 'Community'), ('post', 'Post'), ('comment', 'Comment')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('community_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('title', models.CharField(blank=True, max_length=500)),
+                ('body', models.TextField(blank=True)),
+                ('url', models.CharField(max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['community_id', 'kind'], name='search_doc_community_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+    ]
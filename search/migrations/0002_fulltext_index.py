@@ -0,0 +1,102 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+SQLITE_FORWARD = [
+    # External-content FTS5 table over search_searchdocument, kept in sync by triggers
+    """CREATE VIRTUAL TABLE search_fts USING fts5(
+        title, body,
+        content='search_searchdocument', content_rowid='id',
+        tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER search_fts_ai AFTER INSERT ON search_searchdocument BEGIN
+        INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER search_fts_ad AFTER DELETE ON search_searchdocument BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER search_fts_au AFTER UPDATE ON search_searchdocument BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS search_fts_au",
+    "DROP TRIGGER IF EXISTS search_fts_ad",
+    "DROP TRIGGER IF EXISTS search_fts_ai",
+    "DROP TABLE IF EXISTS search_fts",
+]
+
+# Must match search.backends.POSTGRES_VECTOR (with the "d." alias removed)
+POSTGRES_FORWARD = [
+    """CREATE INDEX search_document_fts_idx ON search_searchdocument USING GIN ((
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ))""",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS search_document_fts_idx",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            _run(schema_editor, SQLITE_FORWARD[:1])
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to substring matching
+            return
+        _run(schema_editor, SQLITE_FORWARD[1:])
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_REVERSE)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_REVERSE)
+
+
+def backfill_documents(apps, schema_editor):
+    Community = apps.get_model('core', 'Community')
+    Post = apps.get_model('core', 'Post')
+    PostComment = apps.get_model('core', 'PostComment')
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    documents = [
+        SearchDocument(kind='community', object_id=c.id, community_id=c.id,
+                       title=c.name, body=c.description, url=f'/communities/{c.id}/')
+        for c in Community.objects.iterator()
+    ]
+    documents += [
+        SearchDocument(kind='post', object_id=p.id, community_id=p.community_id,
+                       title=p.title, body=p.content, url=f'/posts/{p.id}/')
+        for p in Post.objects.iterator()
+    ]
+    documents += [
+        SearchDocument(kind='comment', object_id=c.id, community_id=c.post.community_id,
+                       title=c.post.title, body=c.content, url=f'/posts/{c.post_id}/')
+        for c in PostComment.objects.select_related('post').iterator()
+    ]
+    SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('core', '0008_vote_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of one Community, Post or PostComment.
+
+    Rows are kept in sync by search.signals; the full-text index over them
+    (SQLite FTS5 or a PostgreSQL GIN index) is created by the migrations
+    and maintained by the database.
+    """
+    KIND_CHOICES = [
+        ('community', 'Community'),
+        ('post', 'Post'),
+        ('comment', 'Comment'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    # Owning community, used to hide posts/comments from non-members
+    community_id = models.PositiveBigIntegerField(null=True, blank=True)
+    title = models.CharField(max_length=500, blank=True)
+    body = models.TextField(blank=True)
+    url = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+        indexes = [
+            models.Index(fields=['community_id', 'kind'], name='search_doc_community_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
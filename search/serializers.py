@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+
+class SearchHitSerializer(serializers.Serializer):
+    type = serializers.CharField(source='document.kind')
+    id = serializers.IntegerField(source='document.object_id')
+    community_id = serializers.IntegerField(source='document.community_id')
+    title = serializers.CharField(source='document.title')
+    snippet = serializers.CharField()
+    url = serializers.CharField(source='document.url')
+    score = serializers.FloatField()
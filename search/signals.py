@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Community, Post, PostComment
+
+from .indexing import index_object, reindex_post_comments, unindex_object
+
+
+@receiver(post_save, sender=Community)
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=PostComment)
+def object_saved(sender, instance, update_fields=None, **kwargs):
+    index_object(instance)
+    if sender is Post and (update_fields is None or 'title' in update_fields):
+        reindex_post_comments(instance)
+
+
+@receiver(post_delete, sender=Community)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=PostComment)
+def object_deleted(sender, instance, **kwargs):
+    unindex_object(instance)
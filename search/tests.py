@@ -0,0 +1,102 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from core.models import Community, Post, PostComment
+
+from .backends import BasicBackend, get_backend, search
+from .indexing import rebuild_index
+from .models import SearchDocument
+
+
+def found(hits):
+    return [(hit.document.kind, hit.document.title) for hit in hits]
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = User.objects.create_user('member', 'member@example.com', None)
+        cls.stranger = User.objects.create_user('stranger', 'stranger@example.com', None)
+        cls.garden = Community.objects.create(
+            name='Gardening', description='Growing tomatoes and herbs', category='other', creator=cls.member,
+        )
+        cls.garden.members.add(cls.member)
+        cls.post = Post.objects.create(
+            community=cls.garden, author=cls.member, title='Tomato blight', content='Leaves turn brown',
+        )
+        cls.comment = PostComment.objects.create(post=cls.post, author=cls.member, content='Copper spray helped')
+
+    def test_sqlite_uses_fts5(self):
+        self.assertEqual(get_backend().name, 'sqlite-fts5')
+
+    def test_title_matches_rank_above_body_matches(self):
+        Post.objects.create(
+            community=self.garden, author=self.member, title='Weekly thread', content='Anyone else growing tomato plants?',
+        )
+        hits = search('tomato', self.member, kinds=['post'])
+        self.assertEqual(found(hits), [('post', 'Tomato blight'), ('post', 'Weekly thread')])
+        self.assertGreater(hits[0].score, hits[1].score)
+        # The last term is a prefix match
+        self.assertEqual(found(search('blig', self.member, kinds=['post'])), [('post', 'Tomato blight')])
+
+    def test_posts_and_comments_are_members_only(self):
+        self.assertEqual(
+            sorted(found(search('copper', self.member))), [('comment', 'Tomato blight')],
+        )
+        for backend in (get_backend(), BasicBackend()):
+            self.assertEqual(found(backend.search('tomato', self.stranger)), [('community', 'Gardening')])
+            self.assertEqual(found(backend.search('copper', self.stranger)), [])
+
+    def test_edits_and_deletes_reach_the_index(self):
+        self.post.content = 'Mildew on the leaves'
+        self.post.save()
+        self.assertEqual(found(search('mildew', self.member)), [('post', 'Tomato blight')])
+        self.assertEqual(found(search('brown', self.member)), [])
+
+        self.comment.delete()
+        self.assertEqual(found(search('copper', self.member)), [])
+        self.post.delete()
+        self.assertEqual(found(search('mildew', self.member)), [])
+
+    def test_renaming_a_post_retitles_its_comment_hits(self):
+        self.post.title = 'Late blight on tomatoes'
+        self.post.save()
+        [hit] = search('copper', self.member)
+        self.assertEqual(hit.document.title, 'Late blight on tomatoes')
+        self.assertEqual(found(search('late', self.member, kinds=['comment'])), [('comment', 'Late blight on tomatoes')])
+
+    def test_rebuild_matches_the_signal_maintained_index(self):
+        documents = set(SearchDocument.objects.values_list('kind', 'object_id', 'community_id', 'title', 'body', 'url'))
+        self.assertEqual(rebuild_index(), 3)
+        self.assertEqual(
+            set(SearchDocument.objects.values_list('kind', 'object_id', 'community_id', 'title', 'body', 'url')), documents,
+        )
+        self.assertEqual(found(search('copper', self.member)), [('comment', 'Tomato blight')])
+
+
+class SearchAPITests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('searcher', 'searcher@example.com', None)
+        for i in range(3):
+            Community.objects.create(name=f'Chess club {i}', description='Openings', category='other', creator=cls.user)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_results_are_paged_and_filtered_by_type(self):
+        response = self.client.get('/api/search/', {'q': 'chess', 'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(set(response.data['results'][0]), {'type', 'id', 'community_id', 'title', 'snippet', 'url', 'score'})
+        response = self.client.get(response.data['next'])
+        self.assertEqual((len(response.data['results']), response.data['next']), (1, None))
+
+        response = self.client.get('/api/search/', {'q': 'chess', 'type': 'post'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get('/api/search/', {'q': '  '}).status_code, 400)
+        # FTS5 syntax in user input is treated as plain words
+        self.assertEqual(self.client.get('/api/search/', {'q': 'chess" OR NEAR('}).status_code, 200)
@@ -0,0 +1,55 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .backends import get_backend
+from .models import SearchDocument
+from .serializers import SearchHitSerializer
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 50
+MAX_SEARCH_PAGE = 50
+SEARCH_KINDS = [kind for kind, _ in SearchDocument.KIND_CHOICES]
+
+
+def _positive_int(value, default, maximum):
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_api(request):
+    """
+    Ranked search over communities, posts and comments.
+
+    Query params: q (required), type (community, post or comment; repeatable),
+    page, page_size. Posts and comments only match in the user's communities.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    kinds = [kind for kind in request.query_params.getlist('type') if kind in SEARCH_KINDS]
+    page = _positive_int(request.query_params.get('page'), 1, MAX_SEARCH_PAGE)
+    page_size = _positive_int(request.query_params.get('page_size'), SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE)
+
+    backend = get_backend()
+    # Fetch one extra hit to learn whether another page exists
+    hits = backend.search(query, request.user, kinds=kinds, offset=(page - 1) * page_size, limit=page_size + 1)
+    has_next = len(hits) > page_size and page < MAX_SEARCH_PAGE
+    hits = hits[:page_size]
+
+    url = request.build_absolute_uri()
+    return Response({
+        'query': query,
+        'backend': backend.name,
+        'page': page,
+        'next': replace_query_param(url, 'page', page + 1) if has_next else None,
+        'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+        'results': SearchHitSerializer(hits, many=True).data,
+    })
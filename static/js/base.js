@@ -0,0 +1,13 @@
+// Auto-dismiss messages after 5 seconds
+setTimeout(() => {
+    const messages = document.querySelectorAll('.message');
+    messages.forEach(msg => {
+        msg.style.animation = 'slideOut 0.3s ease-out';
+        setTimeout(() => msg.remove(), 300);
+    });
+}, 5000);
+
+// Initialize Lucide icons
+if (typeof lucide !== 'undefined') {
+    lucide.createIcons();
+}
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from unity_circles.database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -50,10 +53,12 @@ INSTALLED_APPS = [
     'onboarding',    
     'mentorship',    
     'chat',          
+    'search',
 ]
 
 MIDDLEWARE = [
     'python314_fix.Python314CompatibilityMiddleware',  # FIX for Python 3.14
+    'core.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -88,14 +93,65 @@ WSGI_APPLICATION = 'unity_circles.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# SQLite by default; set DATABASE_URL for PostgreSQL (see unity_circles/database.py)
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Per-process local memory by default; LocMemCache evicts least recently used
+# entries once MAX_ENTRIES is reached. Set REDIS_URL (needs the redis package)
+# to share one cache between worker processes. See core.cache for key helpers.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'unity',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unity-circles',
+            'KEY_PREFIX': 'unity',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+                'CULL_FREQUENCY': 4,
+            },
+        }
+    }
+
+
+# Request metrics (core.instrumentation)
+# The last REQUEST_METRICS_BUFFER_SIZE requests of each process are kept for
+# the staff report at /api/metrics/requests/; Server-Timing headers expose
+# per-request SQL and serializer time to browser dev tools.
+
+REQUEST_METRICS_BUFFER_SIZE = 5000
+REQUEST_METRICS_SERVER_TIMING = DEBUG
+
+
+# Background tasks (core.tasks)
+# Queued tasks are run by `manage.py run_tasks` with TASK_QUEUE_WORKERS
+# threads; a claim not finished within TASK_LEASE_SECONDS is retried. With
+# TASK_QUEUE_INLINE they run in-process after the enqueuing transaction
+# commits instead, so development needs no worker.
+
+TASK_QUEUE_INLINE = os.environ.get('TASK_QUEUE_INLINE', str(DEBUG)).lower() in ('1', 'true')
+TASK_QUEUE_WORKERS = 4
+TASK_LEASE_SECONDS = 600
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -165,7 +221,21 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Behind nginx, set to an internal location (e.g. '/protected-media/') that
+# aliases MEDIA_ROOT to let the proxy send uploads via X-Accel-Redirect
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT')
 
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
-]
\ No newline at end of file
+]
+
+# collectstatic writes content-hashed names plus precompressed .gz/.br
+# copies (core.staticfiles); core.media.serve_static picks the variant
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
\ No newline at end of file
@@ -1,9 +1,12 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.views.generic import RedirectView
 
+from core.media import serve_media, serve_static
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -14,6 +17,7 @@ urlpatterns = [
     path('api/auth/', include('accounts.urls')),
     path('api/onboarding/', include('onboarding.urls')),
     path('api/mentorship/', include('mentorship.urls')),
+    path('api/search/', include('search.urls')),
 
     # App URLs
     path('chat/', include('chat.urls')),
@@ -23,6 +27,9 @@ urlpatterns = [
     path('', include('core.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+# Uploads and collected static files, streamed with caching and Range
+# support (see core.media)
+urlpatterns += [
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.STATIC_URL.lstrip('/')), serve_static, name='static'),
+]